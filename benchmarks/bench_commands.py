@@ -0,0 +1,474 @@
+# 指令端到端延迟基准：用桩 AstrMessageEvent / Context 驱动 CalculatorPlugin 的全部指令，
+# 无需运行 AstrBot。统计每条指令的 p50 / p99 延迟与吞吐量，并与保存的基线比较。
+#
+# 不同机器的绝对耗时差别很大，所以同一进程里穿插测量一段固定的纯 Python 校准负载，
+# 比较时用 "指令耗时 / 校准耗时" 的比值，而不是微秒数：基线在别的机器上录制也能直接比较。
+# 比值只能抵消机器整体快慢，抵消不了 Python 版本差异 (不同版本各部分的相对速度不同)，
+# 升级解释器后应重新录制基线。经线程池执行的重指令 (如对阵表) 还包含线程切换的等待，
+# 这部分随系统调度变化而不随校准负载变化，在繁忙的机器上波动较大。
+#
+# 用法:
+#   python benchmarks/bench_commands.py                  # 运行并与基线比较，退化超过阈值时返回 1
+#   python benchmarks/bench_commands.py --save-baseline  # 运行并写入新的基线
+#   python benchmarks/bench_commands.py --cold           # 每次调用前清空报告缓存和解析缓存
+#   python benchmarks/bench_commands.py --runs 5         # 完整跑 5 轮 (默认 5 轮)，每轮一个独立进程，每条指令取各项指标最好的一轮，减少机器抖动的影响
+#   python benchmarks/bench_commands.py --min-delta-us 5 # 换算后比基线慢不足 5us 的不算退化 (默认 5)，避免极快的指令被噪声误判
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import math
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+PACKAGE_NAME = "roco_calculator"
+
+# 桩装饰器登记的指令处理函数名，用来确认每条指令都有测试语料
+REGISTERED_HANDLERS: set[str] = set()
+
+
+# --- AstrBot 桩 ---
+
+class StubResult:
+    def __init__(self, text=None, chain=None):
+        self.text = text
+        self.chain = chain
+
+
+class StubEvent:
+    """最小化的 AstrMessageEvent：只提供插件用到的接口"""
+
+    def __init__(self, message_str: str, sender_id: str = "bench-user"):
+        self.message_str = message_str
+        self._sender_id = sender_id
+
+    def get_sender_id(self) -> str:
+        return self._sender_id
+
+    def plain_result(self, text: str) -> StubResult:
+        return StubResult(text=text)
+
+    def chain_result(self, chain) -> StubResult:
+        return StubResult(chain=chain)
+
+
+class StubContext:
+    pass
+
+
+class StubStarTools:
+    """插件数据目录放在临时目录，基准运行不写入真实数据"""
+    _data_dir = Path(tempfile.mkdtemp(prefix="roco-calculator-bench-"))
+
+    @classmethod
+    def get_data_dir(cls, plugin_name: str | None = None) -> Path:
+        return cls._data_dir
+
+
+class StubStar:
+    def __init__(self, context, *args, **kwargs):
+        self.context = context
+
+
+def _register_handler(*args, **kwargs):
+    def decorator(func):
+        REGISTERED_HANDLERS.add(func.__name__)
+        return func
+    return decorator
+
+
+def _command_group(*args, **kwargs):
+    def decorator(func):
+        func.command = _register_handler
+        func.group = _command_group
+        return func
+    return decorator
+
+
+def _passthrough(*args, **kwargs):
+    return lambda func: func
+
+
+def install_astrbot_stubs():
+    """在 sys.modules 中注册 astrbot.api 的桩模块"""
+    astrbot = types.ModuleType("astrbot")
+    api = types.ModuleType("astrbot.api")
+    event = types.ModuleType("astrbot.api.event")
+    star = types.ModuleType("astrbot.api.star")
+    components = types.ModuleType("astrbot.api.message_components")
+
+    api.logger = logging.getLogger("astrbot-bench")
+    api.logger.addHandler(logging.NullHandler())
+    api.logger.propagate = False
+    api.AstrBotConfig = dict
+
+    event.filter = types.SimpleNamespace(
+        command=_register_handler,
+        command_group=_command_group,
+        permission_type=_passthrough,
+        PermissionType=types.SimpleNamespace(ADMIN="admin", MEMBER="member"),
+    )
+    event.AstrMessageEvent = StubEvent
+    star.Context = StubContext
+    star.Star = StubStar
+    star.StarTools = StubStarTools
+    star.register = _passthrough
+    components.Plain = lambda text: ("Plain", text)
+    components.File = lambda name, file: ("File", name, file)
+
+    astrbot.api = api
+    api.event = event
+    api.star = star
+    api.message_components = components
+    sys.modules.update({"astrbot": astrbot, "astrbot.api": api, "astrbot.api.event": event,
+                        "astrbot.api.star": star, "astrbot.api.message_components": components})
+
+
+def load_plugin_module():
+    """以包的形式导入插件目录，使 main.py 中的相对导入可用"""
+    install_astrbot_stubs()
+    package = types.ModuleType(PACKAGE_NAME)
+    package.__path__ = [str(ROOT)]
+    sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f"{PACKAGE_NAME}.main")
+
+
+# --- 语料: 指令处理函数名 -> [(场景, 消息, 额外参数)] ---
+
+CORPORA = {
+    "hp_calculator": [
+        ("智能", "计算器 精力计算 150+性格+个体10", ()),
+        ("智能", "计算器 精力计算 128+个体", ()),
+        ("错误", "计算器 精力计算 150+个体11", ()),
+        ("帮助", "计算器 精力计算", ()),
+    ],
+    "stat_calculator": [
+        ("智能", "计算器 能力值计算 186+性格+个体10", ()),
+        ("智能", "计算器 能力值计算 120", ()),
+        ("错误", "计算器 能力值计算 性格", ()),
+        ("帮助", "计算器 能力值计算", ()),
+    ],
+    "damage_calculator": [
+        ("快速", "计算器 伤害计算 300 200 75", (300, 200, 75)),
+        ("快速", "计算器 伤害计算 348 181 120", (348, 181, 120)),
+        ("错误", "计算器 伤害计算 300 0 75", (300, 0, 75)),
+    ],
+    "batch_calculator": [
+        ("智能", "计算器 批量\n迪莫, 186+性格+个体10\n150+个体\n伤害 300 200 75\n186xg8\n120+性格", ()),
+        ("错误", "计算器 批量\nabc\n186+个体11", ()),
+        ("帮助", "计算器 批量", ()),
+    ],
+    "speed_tiers": [
+        ("智能", "计算器 速度线 130+性格+个体10", ()),
+        ("快速", "计算器 速度线 130xg8", ()),
+        ("智能", "计算器 速度线 130+性格 对方120", ()),
+        ("区间", "计算器 速度线 250-260", ()),
+        ("错误", "计算器 速度线 性格", ()),
+        ("帮助", "计算器 速度线", ()),
+    ],
+    "ko_calculator": [
+        ("快速", "计算器 斩杀 186xg8 75 100 80", ()),
+        ("智能", "计算器 斩杀 我方186+性格 威力75 对方精力100 防御80", ()),
+        ("智能", "计算器 斩杀 威力120 精力150 防御120 我方130+个体", ()),
+        ("修正", "计算器 斩杀 186xg8 75 100 80 克制 本系 攻击等级+1", ()),
+        ("错误", "计算器 斩杀 我方186+性格 威力75 对方精力100", ()),
+        ("帮助", "计算器 斩杀", ()),
+    ],
+    "matchup_table": [
+        ("3v3", "计算器 对阵 威力75 120\n我方 100/186/80/100/90/130+性格+个体10, 120/150/90/110/100/120+个体\n"
+                "对方 100/120/80/90/85/110+性格速度+个体, 90/100/100/80/80/140", ()),
+        ("6v6", "计算器 对阵 威力60 75 90 120 魔法\n"
+                "我方 " + ", ".join(f"{80 + 10 * i}/{100 + 10 * i}/{110 + 5 * i}/90/95/{100 + 8 * i}+个体" for i in range(6)) + "\n"
+                "对方 " + ", ".join(f"{90 + 8 * i}/{95 + 10 * i}/{120 - 5 * i}/100/85/{96 + 9 * i}+性格速度" for i in range(6)), ()),
+        ("错误", "计算器 对阵 威力75\n我方 100/186/80/100/90/130", ()),
+        ("帮助", "计算器 对阵", ()),
+    ],
+    "build_optimizer": [
+        ("先手", "计算器 最低养成 速度130 超过260", ()),
+        ("先手", "计算器 最低养成 速度130 超过120+性格+个体10", ()),
+        ("击倒", "计算器 最低养成 攻击186 威力75 精力100 防御80 2次", ()),
+        ("错误", "计算器 最低养成 速度130", ()),
+        ("帮助", "计算器 最低养成", ()),
+    ],
+    "common_builds": [
+        ("智能", "计算器 常见养成 80 防御", ()),
+        ("智能", "计算器 常见养成 128", ()),
+        ("错误", "计算器 常见养成 防御", ()),
+        ("帮助", "计算器 常见养成", ()),
+    ],
+    "species_lookup": [
+        ("智能", "计算器 图鉴 迪莫", ()),
+        ("帮助", "计算器 图鉴", ()),
+    ],
+    "more_pages": [
+        ("无内容", "计算器 更多", ()),
+    ],
+    "metrics_report": [
+        ("统计", "计算器 统计", ()),
+    ],
+    "reload_constants": [
+        ("无变化", "计算器 重载常数", ()),
+    ],
+    "reverse_main_help": [
+        ("帮助", "反推", ()),
+    ],
+    "reverse_hp_analysis": [
+        ("快速", "精力反推 128 20 102", ()),
+        ("快速", "精力反推 96 35.5 140", ()),
+        ("智能", "精力反推 对方128 掉血20% 伤害102", ()),
+        ("智能", "精力反推 伤害102 对方128 掉血20", ()),
+        ("错误", "精力反推 128 0 102", ()),
+        ("帮助", "精力反推 帮助", ()),
+    ],
+    "reverse_joint_analysis": [
+        ("快速", "联合反推 186xg8 75 100 80 33% 112", ()),
+        ("智能", "联合反推 我方186+性格 威力75 精力100 防御80 掉血35", ()),
+        ("智能", "联合反推 我方186+性格 威力75 精力100 防御80 掉血35.2% 克制", ()),
+        ("错误", "联合反推 我方186+性格 威力75 精力100 掉血35", ()),
+        ("帮助", "联合反推 帮助", ()),
+    ],
+    "reverse_analysis": [
+        ("快速", "反推防御 186xg8 80 75 130", ()),
+        ("快速", "反推防御 186 80 75 116 90 140", ()),
+        ("智能", "反推防御 我方186+性格 对方80 威力75 130伤害", ()),
+        ("智能", "反推防御 我方186+性格+个体10 对方120 威力90 伤害120 威力120 伤害160", ()),
+        ("修正", "反推防御 186xg8 80 75 260 克制", ()),
+        ("错误", "反推防御 我方186 对方80 威力75", ()),
+        ("帮助", "反推防御 帮助", ()),
+    ],
+    "reverse_attack_analysis": [
+        ("快速", "反推攻击 100xg8 186 75 130", ()),
+        ("智能", "反推攻击 我方100+性格 对方186 威力75 130伤害", ()),
+        ("智能", "反推攻击 对方150 我方120+个体 威力100 伤害88", ()),
+        ("修正", "反推攻击 100xg8 186 75 195 本系 暴击", ()),
+        ("错误", "反推攻击 100xz 186 75 130", ()),
+        ("帮助", "反推攻击 帮助", ()),
+    ],
+}
+
+
+async def _drive(plugin, handler_name: str, message: str, args: tuple) -> float:
+    """执行一次指令并耗尽其异步生成器，返回耗时 (秒)"""
+    handler = getattr(plugin, handler_name)
+    start = time.perf_counter()
+    async for _ in handler(StubEvent(message), *args):
+        pass
+    return time.perf_counter() - start
+
+
+def _percentile(sorted_samples: list[float], q: float) -> float:
+    index = min(len(sorted_samples) - 1, max(0, round(q * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+_CALIBRATION_RE = re.compile(r"(\d+)\+(性格)?")
+
+
+class _CalibrationRow:
+    __slots__ = ("base", "value")
+
+    def __init__(self, base: int, value: int):
+        self.base = base
+        self.value = value
+
+    def render(self) -> str:
+        return f"> {self.base:<6}{self.value:>6}"
+
+
+def _calibration_rows(count: int):
+    for i in range(count):
+        match = _CALIBRATION_RE.match(f"{100 + i}+性格")
+        base = int(match.group(1))
+        yield _CalibrationRow(base, math.floor((base / (i + 50)) * 0.9 * 75))
+
+
+def _calibration_workload() -> int:
+    """
+    固定的纯 Python 负载，构成与指令处理相近：正则匹配、浮点取整、字符串格式化，
+    以及生成器、对象创建和方法调用这类函数调用开销
+    """
+    lookup = {row.base: row for row in _calibration_rows(20)}
+    return len("\n".join(row.render() for row in lookup.values()))
+
+
+def calibrate(repeat: int = 20) -> list[float]:
+    """校准负载的若干次耗时 (微秒)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _calibration_workload()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+async def run_benchmark(plugin, iterations: int, cold: bool, input_parser) -> tuple[dict[str, dict[str, float]], float]:
+    """
+    返回 (逐条指令的统计, 校准耗时)。校准在每条指令前后各测一组，与指令测量穿插进行：
+    每条指令记录紧挨着它的校准耗时 (calibration_us)，整轮的校准耗时取全部样本的中位数
+    """
+    results = {}
+    calibration_samples = []
+    for handler_name, corpus in CORPORA.items():
+        adjacent = calibrate()
+        samples = []
+        per_entry = [[] for _ in corpus]
+        for message, args in [(m, a) for _, m, a in corpus]:
+            await _drive(plugin, handler_name, message, args)  # 预热
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for entry_samples, (_, message, args) in zip(per_entry, corpus):
+                if cold:
+                    plugin._report_cache.invalidate()
+                    for fn in (input_parser._parse_stat_spec, input_parser._parse_quick_spec,
+                               input_parser._parse_reverse, input_parser._parse_hp_reverse,
+                               input_parser._parse_speed_query, input_parser._parse_ko,
+                               input_parser._parse_optimize, input_parser._parse_joint,
+                               input_parser._extract_damage_modifiers):
+                        fn.cache_clear()
+                elapsed = await _drive(plugin, handler_name, message, args)
+                samples.append(elapsed)
+                entry_samples.append(elapsed)
+        wall = time.perf_counter() - started
+        adjacent += calibrate()
+        calibration_samples += adjacent
+        adjacent.sort()
+        samples.sort()
+        # 同一指令的各条语料耗时差别很大 (帮助、错误、完整计算)，合在一起的中位数会落在两档之间来回跳；
+        # p50 取每条语料各自中位数的平均值
+        entry_medians = [_percentile(sorted(entry), 0.50) for entry in per_entry]
+        results[handler_name] = {
+            "calls": len(samples),
+            "p50_us": sum(entry_medians) / len(entry_medians) * 1e6,
+            "p99_us": _percentile(samples, 0.99) * 1e6,
+            "throughput_per_s": len(samples) / wall,
+            "calibration_us": _percentile(adjacent, 0.50),
+        }
+    calibration_samples.sort()
+    return results, _percentile(calibration_samples, 0.50)
+
+
+def best_of_runs(runs: list[tuple[dict[str, dict[str, float]], float]]) -> tuple[dict[str, dict[str, float]], float]:
+    """
+    多轮结果逐条指令取最好的一轮：延迟取最小值，吞吐量取最大值。
+    单核机器上某一轮被其他进程抢占时，p99 会成倍变高，取最好值可以排除这类干扰。
+    机器快慢在一轮之内也会变化，所以每条指令先按紧挨着它测得的校准耗时折算到同一速度
+    (各轮整体校准耗时的最小值) 再比较，避免把快时段的指令耗时和慢时段的校准耗时配在一起
+    """
+    calibration = min(c for _, c in runs)
+    runs = [r for r, _ in runs]
+    best = {}
+    for handler_name, first in runs[0].items():
+        samples = [(run[handler_name], calibration / run[handler_name]["calibration_us"]) for run in runs]
+        best[handler_name] = {
+            "calls": first["calls"],
+            "p50_us": min(r["p50_us"] * factor for r, factor in samples),
+            "p99_us": min(r["p99_us"] * factor for r, factor in samples),
+            "throughput_per_s": max(r["throughput_per_s"] / factor for r, factor in samples),
+            "calibration_us": calibration,
+        }
+    return best, calibration
+
+
+def compare_with_baseline(results: dict, calibration: float, baseline: dict, threshold: float,
+                          min_delta_us: float) -> list[str]:
+    """
+    先按校准耗时把本次结果折算到基线机器的速度，再比较：p50 比基线慢超过 threshold (比例)，
+    或 p99 慢超过 2 倍 threshold 的指令视为退化。只有几微秒的指令受调用开销的抖动影响大，
+    折算后的差值不到 min_delta_us 时不算退化。基线里没有的指令同样算作失败，新增指令时需要一并更新基线
+    """
+    scale = baseline["calibration_us"] / calibration
+    regressions = []
+    for handler_name, current in results.items():
+        base = baseline["handlers"].get(handler_name)
+        if not base:
+            regressions.append(f"{handler_name}: 基线中没有这条指令，使用 --save-baseline 重新生成")
+            continue
+        # 微秒级调用的 p99 受调度抖动影响大，放宽一倍
+        for metric, allowed in (("p50_us", threshold), ("p99_us", 2 * threshold)):
+            scaled = current[metric] * scale
+            if scaled > base[metric] * (1 + allowed) and scaled - base[metric] > min_delta_us:
+                regressions.append(f"{handler_name}.{metric}: {base[metric]:.1f}us -> {current[metric]:.1f}us "
+                                   f"(折算到基线机器为 {scaled:.1f}us)")
+    return regressions
+
+
+def run_worker(iterations: int, cold: bool) -> int:
+    """子进程：完整运行一轮，把结果以 JSON 写到标准输出"""
+    main_module = load_plugin_module()
+    input_parser = sys.modules[f"{PACKAGE_NAME}.input_parser"]
+    plugin = main_module.CalculatorPlugin(StubContext())
+    results, calibration = asyncio.run(run_benchmark(plugin, iterations, cold, input_parser))
+    print(json.dumps({"results": results, "calibration_us": calibration}))
+    return 0
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description="指令端到端延迟基准")
+    arg_parser.add_argument("--iterations", type=int, default=300, help="每条语料的重复次数")
+    arg_parser.add_argument("--threshold", type=float, default=0.5, help="相对基线允许的变慢比例")
+    arg_parser.add_argument("--min-delta-us", type=float, default=5.0, help="折算后比基线慢不到这么多微秒时不算退化")
+    arg_parser.add_argument("--save-baseline", action="store_true", help="把本次结果写入基线文件")
+    arg_parser.add_argument("--cold", action="store_true", help="每次调用前清空报告缓存和解析缓存")
+    arg_parser.add_argument("--runs", type=int, default=5, help="完整运行的轮数 (每轮一个独立进程)，各项指标取最好的一轮")
+    arg_parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.worker:
+        return run_worker(args.iterations, args.cold)
+
+    load_plugin_module()
+    missing = REGISTERED_HANDLERS - CORPORA.keys()
+    if missing:
+        print(f"以下指令没有基准语料: {', '.join(sorted(missing))}")
+        return 1
+
+    # 每轮在独立的解释器进程中运行：同一台机器上不同进程的整体快慢也会不同，分进程取最好的一轮才能排除
+    worker = [sys.executable, __file__, "--worker", "--iterations", str(args.iterations)] + (["--cold"] if args.cold else [])
+    runs = []
+    for _ in range(max(args.runs, 1)):
+        output = json.loads(subprocess.run(worker, check=True, capture_output=True, text=True, encoding="utf-8").stdout)
+        runs.append((output["results"], output["calibration_us"]))
+    results, calibration = best_of_runs(runs)
+
+    print(f"{'指令':<26}{'调用':>8}{'p50(us)':>10}{'p99(us)':>10}{'次/秒':>12}")
+    for handler_name, r in results.items():
+        print(f"{handler_name:<26}{r['calls']:>8}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}{r['throughput_per_s']:>12,.0f}")
+
+    print(f"\n校准负载: {calibration:.1f}us")
+
+    mode = "cold" if args.cold else "warm"
+    baseline = json.loads(BASELINE_FILE.read_text(encoding="utf-8")) if BASELINE_FILE.exists() else {}
+    if args.save_baseline:
+        baseline[mode] = {"calibration_us": calibration, "handlers": results}
+        BASELINE_FILE.write_text(json.dumps(baseline, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\n基线已写入 {BASELINE_FILE.name} ({mode})")
+        return 0
+
+    if mode not in baseline:
+        print(f"\n没有 {mode} 模式的基线，使用 --save-baseline 生成。")
+        return 0
+    if "calibration_us" not in baseline[mode]:
+        print(f"\n{mode} 模式的基线没有校准耗时，无法跨机器比较，使用 --save-baseline 重新生成。")
+        return 1
+    print(f"基线校准负载: {baseline[mode]['calibration_us']:.1f}us (本机相对基线机器 "
+          f"{baseline[mode]['calibration_us'] / calibration:.2f} 倍速)")
+    regressions = compare_with_baseline(results, calibration, baseline[mode], args.threshold, args.min_delta_us)
+    if regressions:
+        print(f"\n性能退化超过 {args.threshold:.0%} 或缺少基线:")
+        print("\n".join(f"  {r}" for r in regressions))
+        return 1
+    print(f"\n与基线相比没有超过 {args.threshold:.0%} 的退化。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# 输入解析微基准：对比旧版逐条 str.replace / 未编译正则的解析与 input_parser 的吞吐量
+# 用法: python benchmarks/bench_parser.py [--rounds N]
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import input_parser  # noqa: E402
+
+FULL_IV = 60
+
+# 群聊里常见的输入形态
+CORPUS = {
+    "reverse": [
+        "186xg8 80 75 130",
+        "186 80 75 130",
+        "186x 120 90 156",
+        "我方186+性格 对方80 威力75 130伤害",
+        "我方186+性格+个体10 对方80 威力75 伤害130",
+        "对方80 我方186+个体8 威力 75 伤害 130",
+        "威力75 130伤害 我方150 对方95",
+        "我方100+性格 对方186 威力75 130伤害",
+        "186 80 威力120 伤害210",
+        "我方 186 + 性格 对方 80 威力90 伤害156",
+    ],
+    "stat": [
+        "186+性格+个体10",
+        "150+性格+个体",
+        "120",
+        "我方186+个体8",
+        "对方95+性格",
+        "200+个体54",
+    ],
+    "hp": [
+        "128 20 102",
+        "对方128 掉血20% 伤害102",
+        "伤害102 对方128 掉血20",
+        "96 35.5 140",
+    ],
+}
+
+
+# --- 旧版解析 (拷贝自重构前的 main.py，仅用于对比) ---
+
+def legacy_parse_stat_input(input_str):
+    clean_str = input_str.replace("我方", "").replace("对方", "").strip()
+    base_race_match = re.match(r"^\s*(\d+)", clean_str)
+    if not base_race_match: raise ValueError("格式错误，必须以种族值数字开头。")
+    base_race_value = int(base_race_match.group(1))
+    has_personality = "性格" in clean_str
+    final_iv = 0
+    iv_match = re.search(r"个体(\d+)", clean_str)
+    if iv_match:
+        iv_num = int(iv_match.group(1))
+        allowed_points = {7, 8, 9, 10}
+        allowed_totals = {42, 48, 54, 60}
+        if iv_num not in allowed_points and iv_num not in allowed_totals:
+            raise ValueError("个体值不合法")
+        final_iv = iv_num * 6 if iv_num in allowed_points else iv_num
+    elif "个体" in clean_str:
+        final_iv = FULL_IV
+    return (base_race_value, has_personality, final_iv)
+
+
+def legacy_parse_quick_mode_attacker(input_str):
+    base_race_match = re.match(r'^(\d+)', input_str)
+    if not base_race_match:
+        raise ValueError("快速模式格式错误")
+    base_race = int(base_race_match.group(1))
+    suffixes = input_str[len(base_race_match.group(1)):]
+    if suffixes.count('g') > 1 or suffixes.count('x') > 1:
+        raise ValueError("快速模式格式错误")
+    temp_suffixes = suffixes.replace('x', '')
+    g_match_validation = re.search(r'g(\d+)?', temp_suffixes)
+    if g_match_validation:
+        temp_suffixes = temp_suffixes.replace(g_match_validation.group(0), '')
+    if temp_suffixes:
+        raise ValueError("快速模式格式错误")
+    has_pers = 'x' not in suffixes
+    final_iv = FULL_IV
+    g_match = re.search(r'g(\d+)?', suffixes)
+    if g_match:
+        iv_num_str = g_match.group(1)
+        if iv_num_str:
+            final_iv = int(iv_num_str) * 6
+        else:
+            final_iv = 0
+    return base_race, has_pers, final_iv
+
+
+def legacy_parse_reverse(params_str_full):
+    parts = params_str_full.split()
+    intelligent_mode_markers = ['+', '我方', '对方', '威力', '伤害', '性格', '个体']
+    contains_markers = any(marker in params_str_full for marker in intelligent_mode_markers)
+    if len(parts) == 4 and not contains_markers:
+        return legacy_parse_quick_mode_attacker(parts[0]), int(parts[1]), int(parts[2]), int(parts[3])
+    fixed_pattern = r"(威力|伤害)\s*(\d+)|(\d+)\s*(威力|伤害)"
+    fixed_matches = re.findall(fixed_pattern, params_str_full)
+    params = {}
+    remaining_str = params_str_full
+    for key1, val1, val2, key2 in fixed_matches:
+        key = key1 or key2
+        val = int(val1 or val2)
+        params[key] = val
+        remaining_str = re.sub(fr"{key}\s*{val}|{val}\s*{key}", "", remaining_str, 1)
+    stat_pattern = r"((?:我方|对方)?\s*\d+(?:\s*\+\s*性格|\s*\+\s*个体(?:\d+)?)?)"
+    stat_blocks = [s.strip() for s in re.findall(stat_pattern, remaining_str) if s.strip()]
+    if len(stat_blocks) != 2 or "威力" not in params or "伤害" not in params:
+        return None
+
+    def get_block_type(block_str):
+        if any(kw in block_str for kw in ['我方', '性格', '个体']): return 'player'
+        if '对方' in block_str: return 'opponent'
+        return 'neutral'
+
+    b1, b2 = stat_blocks
+    player, opponent = (b2, b1) if get_block_type(b1) == 'opponent' or get_block_type(b2) == 'player' else (b1, b2)
+    opponent_race = int(re.search(r"\d+", opponent).group(0))
+    return legacy_parse_stat_input(player), opponent_race, params.get("威力"), params.get("伤害")
+
+
+def legacy_parse_hp(params_str):
+    original = params_str
+    opponent_race, lost_hp_percent, actual_damage = None, None, None
+    percent_match = re.search(r'掉血\s*(\d+\.?\d*)\s*%?', params_str)
+    if percent_match:
+        lost_hp_percent = float(percent_match.group(1))
+        params_str = params_str.replace(percent_match.group(0), "", 1)
+    damage_match = re.search(r'伤害\s*(\d+)', params_str)
+    if damage_match:
+        actual_damage = int(damage_match.group(1))
+        params_str = params_str.replace(damage_match.group(0), "", 1)
+    race_match = re.search(r'\d+', params_str)
+    if race_match:
+        opponent_race = int(race_match.group(0))
+    if None in [opponent_race, lost_hp_percent, actual_damage]:
+        parts = re.findall(r'\d+\.?\d*', original)
+        opponent_race, lost_hp_percent, actual_damage = int(float(parts[0])), float(parts[1]), int(float(parts[2]))
+    return opponent_race, lost_hp_percent, actual_damage
+
+
+# --- 新版解析 ---
+
+def new_parse_reverse_uncached(text):
+    return input_parser._parse_reverse.__wrapped__(input_parser.normalize(text), FULL_IV, input_parser.IV_POINTS)
+
+
+def new_parse_stat_uncached(text):
+    return input_parser._parse_stat_spec.__wrapped__(input_parser.normalize(text), FULL_IV, input_parser.IV_POINTS)
+
+
+def new_parse_hp_uncached(text):
+    return input_parser._parse_hp_reverse.__wrapped__(input_parser.normalize(text))
+
+
+CASES = [
+    ("reverse", "旧版", legacy_parse_reverse),
+    ("reverse", "新版(无缓存)", new_parse_reverse_uncached),
+    ("reverse", "新版(LRU)", lambda t: input_parser.parse_reverse(t, FULL_IV)),
+    ("stat", "旧版", legacy_parse_stat_input),
+    ("stat", "新版(无缓存)", new_parse_stat_uncached),
+    ("stat", "新版(LRU)", lambda t: input_parser.parse_stat_spec(t, FULL_IV)),
+    ("hp", "旧版", legacy_parse_hp),
+    ("hp", "新版(无缓存)", new_parse_hp_uncached),
+    ("hp", "新版(LRU)", input_parser.parse_hp_reverse),
+]
+
+
+def bench(fn, corpus, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in corpus:
+            fn(text)
+    elapsed = time.perf_counter() - start
+    return rounds * len(corpus) / elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="输入解析微基准")
+    arg_parser.add_argument("--rounds", type=int, default=2000)
+    args = arg_parser.parse_args()
+
+    baseline = {}
+    print(f"{'语法':<8}{'实现':<12}{'次/秒':>12}{'相对旧版':>10}")
+    for grammar, name, fn in CASES:
+        ops = bench(fn, CORPUS[grammar], args.rounds)
+        if name == "旧版":
+            baseline[grammar] = ops
+        print(f"{grammar:<8}{name:<12}{ops:>12,.0f}{ops / baseline[grammar]:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
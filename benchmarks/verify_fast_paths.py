@@ -0,0 +1,272 @@
+# 快速路径差分校验：查找表、共享映射表、批量查表、伤害修正管线、反推区间求解和速度线索引，
+# 逐项与重构前 main.py 中的参考公式比对，必须逐位一致 (包括 math.ceil / math.floor 的边界)。
+# 游戏内的取值范围全部穷举，范围之外用固定种子的随机用例覆盖。发现不一致时列出确切输入并返回 1。
+#
+# 用法:
+#   python benchmarks/verify_fast_paths.py                        # 穷举 + 默认数量的随机用例
+#   python benchmarks/verify_fast_paths.py --fuzz 200000 --seed 7 # 更多随机用例 / 换一个种子
+
+import argparse
+import importlib
+import math
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_commands import PACKAGE_NAME, load_plugin_module  # noqa: E402
+
+# 常用技能威力，加上 0 和极端值
+POWERS = (0, 1, 40, 60, 75, 90, 120, 150, 250)
+# 只列出前几条不一致，足够定位问题
+MAX_REPORTED = 5
+
+
+# --- 参考实现 (拷贝自重构前的 main.py，只用于比对) ---
+
+def legacy_calculate_stat(base_race_value, personality, individual_value, level, effort_value, personality_multiplier):
+    personality_to_use = personality_multiplier if personality else 1.0
+    l_coefficient = (base_race_value + individual_value / 2) / 100
+    initial_stat = l_coefficient * (level + 50) + 10
+    final_stat = initial_stat * personality_to_use + effort_value
+    return math.ceil(final_stat)
+
+
+def legacy_calculate_hp(base_race_value, personality, individual_value, level, effort_value, personality_multiplier):
+    personality_to_use = personality_multiplier if personality else 1.0
+    l_coefficient = (base_race_value + individual_value / 2) / 100
+    initial_hp = (2 * l_coefficient + 1) * level + 50 * l_coefficient + 10
+    final_hp = initial_hp * personality_to_use + effort_value
+    return math.ceil(final_hp)
+
+
+def legacy_calculate_damage(attack, defense, skill_power):
+    if defense <= 0: return 9999
+    damage = (attack / defense) * 0.9 * skill_power
+    return math.floor(damage)
+
+
+# --- 比对框架 ---
+
+def compare(name: str, cases: list[tuple], reference, fast) -> dict:
+    """分别计时参考实现和快速路径在同一组输入上的结果，记录全部不一致"""
+    started = time.perf_counter()
+    expected = [reference(*case) for case in cases]
+    reference_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    actual = [fast(*case) for case in cases]
+    fast_seconds = time.perf_counter() - started
+    mismatches = [(case, e, a) for case, e, a in zip(cases, expected, actual) if e != a]
+    return {"name": name, "cases": len(cases), "mismatches": mismatches,
+            "reference": reference_seconds, "fast": fast_seconds}
+
+
+def check_tables(modules, rng: random.Random, fuzz: int) -> list[dict]:
+    """能力值 / 精力查找表：表内穷举、表外随机，进程内表和共享映射表都要比对"""
+    game_config, stat_engine, table_store = modules["game_config"], modules["stat_engine"], modules["table_store"]
+    constant_sets = [
+        game_config.GameConstants(),
+        game_config.GameConstants(level=50, personality_multiplier=1.1),
+        game_config.GameConstants(level=100, effort_value=0, personality_multiplier=1.25, iv_points=(5, 6, 7, 8, 9, 10)),
+    ]
+    results = []
+    table_dir = Path(tempfile.mkdtemp(prefix="roco-calculator-verify-"))
+    for constants in constant_sets:
+        label = f"L{constants.level}/E{constants.effort_value}/x{constants.personality_multiplier}"
+        params = (constants.level, constants.effort_value, constants.personality_multiplier)
+        tables = {
+            "内存表": stat_engine.StatTable(*params, iv_totals=constants.iv_totals),
+            "映射表": table_store.load_stat_table(table_dir, *params, constants.iv_totals),
+        }
+        if tables["映射表"].mapped_from is None:
+            raise RuntimeError(f"共享查找表没有写入 {table_dir}")
+        domain = [(base, pers, iv) for base in range(stat_engine.BASE_RACE_MIN, stat_engine.BASE_RACE_MAX + 1)
+                  for pers in (False, True) for iv in constants.iv_totals]
+        # 表外输入回退到公式：超出范围的种族值和不合法的个体值
+        outside = [(rng.randint(-50, 1000), rng.random() < 0.5, rng.randint(0, 120)) for _ in range(fuzz)]
+        reference_stat = lambda b, p, i: legacy_calculate_stat(b, p, i, *params)
+        reference_hp = lambda b, p, i: legacy_calculate_hp(b, p, i, *params)
+        for table_name, table in tables.items():
+            results.append(compare(f"能力值 {table_name} {label}", domain, reference_stat, table.stat))
+            results.append(compare(f"精力 {table_name} {label}", domain, reference_hp, table.hp))
+        table = tables["内存表"]
+        results.append(compare(f"能力值 表外 {label}", outside, reference_stat, table.stat))
+        results.append(compare(f"精力 表外 {label}", outside, reference_hp, table.hp))
+
+        # 批量查表：每 64 条一批；表内整列取值，含表外输入的批次逐项回退到公式，分开统计
+        for scope, specs_all in (("表内", domain), ("表外", outside)):
+            batches = [(specs_all[i:i + 64],) for i in range(0, len(specs_all), 64)]
+            for kind, reference in (("stat", reference_stat), ("hp", reference_hp)):
+                results.append(compare(
+                    f"批量查表 {kind} {scope} {label}", batches,
+                    lambda specs, reference=reference: [reference(*spec) for spec in specs],
+                    lambda specs, kind=kind: list(table.lookup_many(specs, kind=kind))))
+    return results
+
+
+def check_damage(modules, table, rng: random.Random, fuzz: int) -> list[dict]:
+    """伤害：无修正的管线与参考公式在游戏内全部能力值组合上穷举，之外随机；整列的 many() 无论有无修正都与逐项一致"""
+    damage = modules["damage"]
+    pipeline = damage.DamagePipeline()
+    values = sorted(set(table.columns[0]))
+    grid = [(a, d, p) for a in values[::3] for d in values for p in POWERS]
+    edges = [(a, d, p) for a in (0, 1, values[-1]) for d in (-5, -1, 0, 1, 2) for p in POWERS]
+    randoms = [(rng.randint(0, 5000), rng.randint(-10, 5000), rng.randint(0, 500)) for _ in range(fuzz)]
+    results = [
+        compare("伤害 管线 能力值网格", grid + edges, legacy_calculate_damage, pipeline),
+        compare("伤害 管线 随机", randoms, legacy_calculate_damage, pipeline),
+    ]
+    columns = [(a, values, p) for a in values[::7] for p in POWERS]
+    results.append(compare(
+        "伤害 管线 many()", columns,
+        lambda a, ds, p: [legacy_calculate_damage(a, d, p) for d in ds],
+        pipeline.many))
+
+    # 带修正阶段时，整列的 many() 与逐项调用一致：防御列 (斩杀) 和攻击列 (反推攻击) 两种形状
+    modifier_sets = [
+        damage.DamageModifiers(effectiveness="克制", same_type=True),
+        damage.DamageModifiers(effectiveness="抵抗", crit=True, extra=(1.3,)),
+        damage.DamageModifiers(attack_stage=2, defense_stage=-1, same_type=True),
+        damage.DamageModifiers(attack_stage=-1, defense_stage=3, effectiveness="克制"),
+    ]
+    for rounding in ("none", "floor"):
+        for number, modifiers in enumerate(modifier_sets, 1):
+            staged = damage.build_pipeline(modifiers, rounding=rounding)
+            cases = [(a, values, p) for a in values[::29] for p in POWERS[::2]]
+            cases += [(values, d, p) for d in values[::29] for p in POWERS[::2]]
+            results.append(compare(
+                f"伤害 修正{number} many() {rounding}", cases,
+                lambda a, d, p, staged=staged: [staged(x, y, p) for x, y in
+                                                zip(a if isinstance(a, list) else [a] * len(d),
+                                                    d if isinstance(d, list) else [d] * len(a))],
+                staged.many))
+    return results
+
+
+def check_solver(modules, table, rng: random.Random, fuzz: int) -> list[dict]:
+    """
+    反推：吻合养成与逐个养成试算的结果一致；闭式区间和单调二分区间都与逐点扫描得到的区间一致。
+    逐点扫描只覆盖到表内最大能力值的两倍，区间上界超出时两边都截断比较。
+    """
+    solver, damage = modules["solver"], modules["damage"]
+    pipeline = damage.DamagePipeline()
+    values = sorted(set(table.columns[0]))
+    scan_limit = values[-1] * 2
+
+    cases = set()
+    for my_stat in values[::11]:
+        for power in POWERS[2:]:
+            for base in range(0, 256, 9):
+                for pers, iv in table.builds:
+                    dealt = legacy_calculate_damage(my_stat, table.stat(base, pers, iv), power)
+                    cases.add((my_stat, power, base, dealt))
+    cases = sorted(cases)
+
+    def brute_matches(my_stat, power, base, dealt):
+        return sorted(build for build in table.builds
+                      if legacy_calculate_damage(my_stat, legacy_calculate_stat(base, *build, 60, 50, 1.2), power) == dealt)
+
+    def fast_matches(my_stat, power, base, dealt):
+        _, matches, _ = solver.observation_matches(table, base, my_stat, power, dealt, pipeline, "defense")
+        return sorted(build for _, build in matches)
+
+    def clip(stat_range):
+        if stat_range is None or stat_range[0] >= scan_limit:
+            return None
+        return stat_range[0], min(stat_range[1], scan_limit - 1)
+
+    def brute_range(fits):
+        found = [v for v in range(0, scan_limit) if fits(v)]
+        return (found[0], found[-1]) if found else None
+
+    sampled = rng.sample(cases, min(len(cases), max(fuzz // 100, 50)))
+    defense_cases = [(a, p, d) for a, p, _, d in sampled]
+    attack_cases = [(rng.choice(values), p, d) for _, p, _, d in sampled]
+    brute_defense = lambda a, p, d: brute_range(lambda v: v >= 1 and legacy_calculate_damage(a, v, p) == d)
+    brute_attack = lambda df, p, d: brute_range(lambda v: legacy_calculate_damage(v, df, p) == d)
+    return [
+        compare("反推 吻合养成", cases, brute_matches, fast_matches),
+        compare("反推 防御区间 闭式解", defense_cases, brute_defense,
+                lambda a, p, d: clip(solver.defense_range(a, p, d, pipeline))),
+        compare("反推 防御区间 单调二分", defense_cases, brute_defense,
+                lambda a, p, d: clip(solver.monotone_range(lambda v: pipeline(a, v, p), d, 1, decreasing=True))),
+        compare("反推 攻击区间 闭式解", attack_cases, brute_attack,
+                lambda df, p, d: clip(solver.attack_range(df, p, d, pipeline))),
+        compare("反推 攻击区间 单调二分", attack_cases, brute_attack,
+                lambda df, p, d: clip(solver.monotone_range(lambda v: pipeline(v, df, p), d, 0, decreasing=False))),
+    ]
+
+
+def check_speed_index(modules, table, rng: random.Random) -> list[dict]:
+    """速度线：各养成的先后手分界、速度区间查询与逐个种族值比较的结果一致"""
+    speed_tiers = modules["speed_tiers"]
+    index = speed_tiers.SpeedTierIndex(table)
+    bases = range(table.base_min, table.base_max + 1)
+    values = sorted(set(table.columns[0]))
+
+    def brute_compare(speed):
+        tiers = []
+        for build in table.builds:
+            faster = [b for b in bases if table.stat(b, *build) < speed]
+            tie = [b for b in bases if table.stat(b, *build) == speed]
+            slower = [b for b in bases if table.stat(b, *build) > speed]
+            tiers.append(speed_tiers.SpeedTier(
+                build, faster[-1] if faster else None, (tie[0], tie[-1]) if tie else None, slower[0] if slower else None))
+        return tiers
+
+    def brute_in_range(low, high):
+        return sorted((table.stat(b, *build), b, build) for b in bases for build in table.builds
+                      if low <= table.stat(b, *build) <= high)
+
+    speeds = [(s,) for s in range(values[0] - 1, values[-1] + 2, 4)]
+    ranges = [tuple(sorted((rng.randint(values[0] - 5, values[-1] + 5), rng.randint(values[0] - 5, values[-1] + 5))))
+              for _ in range(40)]
+    return [
+        compare("速度线 先后手分界", speeds, brute_compare, index.compare),
+        compare("速度线 区间查询", ranges, brute_in_range,
+                lambda low, high: sorted(index.in_range(low, high))),
+    ]
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description="快速路径与参考公式的差分校验")
+    arg_parser.add_argument("--fuzz", type=int, default=20000, help="每类随机用例的数量")
+    arg_parser.add_argument("--seed", type=int, default=0, help="随机用例的种子")
+    args = arg_parser.parse_args()
+
+    load_plugin_module()
+    modules = {name: importlib.import_module(f"{PACKAGE_NAME}.{name}")
+               for name in ("game_config", "stat_engine", "table_store", "damage", "solver", "speed_tiers")}
+    rng = random.Random(args.seed)
+    # 伤害、反推和速度线在默认常数的查找表上比对 (check_solver 的参考实现也按这组常数计算)
+    table = modules["stat_engine"].StatTable(60, 50, 1.2)
+
+    started = time.perf_counter()
+    results = (check_tables(modules, rng, args.fuzz) + check_damage(modules, table, rng, args.fuzz)
+               + check_solver(modules, table, rng, args.fuzz) + check_speed_index(modules, table, rng))
+    elapsed = time.perf_counter() - started
+
+    failed = 0
+    print(f"{'路径':<34}{'用例':>9}{'不一致':>7}{'参考(ms)':>11}{'快速(ms)':>11}{'加速':>8}")
+    for r in results:
+        speedup = r["reference"] / r["fast"] if r["fast"] else float("inf")
+        print(f"{r['name']:<34}{r['cases']:>9}{len(r['mismatches']):>7}"
+              f"{r['reference'] * 1e3:>11.1f}{r['fast'] * 1e3:>11.1f}{speedup:>7.1f}x")
+        failed += bool(r["mismatches"])
+    for r in results:
+        for case, expected, actual in r["mismatches"][:MAX_REPORTED]:
+            print(f"[{r['name']}] 输入 {case}: 参考 {expected!r}, 快速路径 {actual!r}")
+        if len(r["mismatches"]) > MAX_REPORTED:
+            print(f"[{r['name']}] ... 共 {len(r['mismatches'])} 处不一致")
+
+    total = sum(r["cases"] for r in results)
+    print(f"\n共 {total:,} 组用例，耗时 {elapsed:.1f} 秒 (种子 {args.seed})，"
+          + (f"{failed} 条路径存在不一致。" if failed else "全部一致。"))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# 洛克王国数值计算器 —— 报告缓存
+# 热门查询 (常见种族值、标准养成、常用技能威力) 反复出现，
+# 按解析后的规范参数缓存最终报告，命中时直接返回。
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class ReportCache:
+    """LRU + TTL 的报告缓存，同时限制条目数和总字符数，并统计命中率"""
+
+    def __init__(self, max_entries: int = 512, max_chars: int = 2_000_000, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, tuple[float, int, Any]] = OrderedDict()
+        self._chars = 0
+        # 重请求会在线程池中读写缓存
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _size(cls, value: Any) -> int:
+        """按报告文本的字符数计：Report 的摘要和每行详细内容，嵌在元组中的 Report 同样计入"""
+        if isinstance(value, str):
+            return len(value)
+        if isinstance(value, tuple):
+            return sum(cls._size(v) for v in value if isinstance(v, (str, tuple)))
+        return 0
+
+    def _drop(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._chars -= size
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._put(key, value)
+
+    def _put(self, key: Hashable, value: Any):
+        if key in self._entries:
+            self._drop(key)
+        size = self._size(value)
+        if size > self.max_chars:
+            return
+        self._entries[key] = (time.monotonic(), size, value)
+        self._chars += size
+        while len(self._entries) > self.max_entries or self._chars > self.max_chars:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self):
+        """游戏常数变化后清空全部缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+    def stats(self) -> dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "chars": self._chars,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,133 @@
+# 洛克王国数值计算器 —— 伤害修正
+# 基础伤害 floor((攻击/防御) * 0.9 * 威力) 之上叠加可组合的修正阶段：克制 / 抵抗、本系加成、
+# 能力等级、暴击、天气场地等额外倍率。每个阶段明确写出作用对象和取整方式，最终伤害统一向下取整。
+# 没有任何修正阶段时与 CalculatorPlugin._calculate_damage 的结果完全一致。
+
+import math
+from itertools import repeat
+from typing import Iterable, NamedTuple, Sequence
+
+from .input_parser import DamageModifiers
+
+# 阶段取整方式；"none" 表示保留小数交给下一阶段
+ROUNDING = {
+    "none": lambda x: x,
+    "floor": math.floor,
+    "ceil": math.ceil,
+    "round": round,
+}
+
+# 修正倍率的默认值，可在插件配置的 damage 段覆盖；请以当前游戏版本为准核对
+DEFAULT_MULTIPLIERS = {
+    "type_advantage": 2.0,  # 克制
+    "type_resist": 0.5,  # 抵抗 (微弱)
+    "same_type_bonus": 1.5,  # 本系
+    "crit": 1.5,  # 暴击
+    "stat_stage_step": 0.5,  # 能力等级每级的变化量：+n 级为 1 + n*step，-n 级为 1 / (1 + n*step)
+}
+
+
+class Stage(NamedTuple):
+    """修正阶段：target 为 attack / defense / damage，先乘倍率再按 rounding 取整"""
+    name: str
+    multiplier: float
+    target: str = "damage"
+    rounding: str = "none"
+
+
+def stat_stage_multiplier(stage: int, step: float) -> float:
+    return 1 + stage * step if stage >= 0 else 1 / (1 - stage * step)
+
+
+class DamagePipeline:
+    """按顺序执行的伤害修正阶段，可直接当作 damage_fn(攻击, 防御, 威力) 使用"""
+
+    def __init__(self, stages: Iterable[Stage] = ()):
+        self.stages = tuple(stages)
+        self._attack_stages = [s for s in self.stages if s.target == "attack"]
+        self._defense_stages = [s for s in self.stages if s.target == "defense"]
+        self._damage_stages = [s for s in self.stages if s.target == "damage"]
+
+    @property
+    def identity(self) -> bool:
+        """没有修正阶段，结果与基础公式相同，反推可以使用闭式解"""
+        return not self.stages
+
+    def __call__(self, attack: float, defense: float, skill_power: float) -> int:
+        for stage in self._attack_stages:
+            attack = ROUNDING[stage.rounding](attack * stage.multiplier)
+        for stage in self._defense_stages:
+            defense = ROUNDING[stage.rounding](defense * stage.multiplier)
+        if defense <= 0: return 9999
+        damage = (attack / defense) * 0.9 * skill_power
+        for stage in self._damage_stages:
+            damage = ROUNDING[stage.rounding](damage * stage.multiplier)
+        return math.floor(damage)
+
+    @staticmethod
+    def _column(stages: list[Stage], arg: float | Sequence[float], length: int) -> Iterable[float]:
+        """对一个参数依次应用修正阶段；标量只算一次再扩展到 length 项"""
+        if isinstance(arg, (int, float)):
+            for stage in stages:
+                arg = ROUNDING[stage.rounding](arg * stage.multiplier)
+            return repeat(arg, length)
+        for stage in stages:
+            rounding, multiplier = ROUNDING[stage.rounding], stage.multiplier
+            arg = [rounding(v * multiplier) for v in arg]
+        return arg
+
+    def many(self, attacks: float | Sequence[float], defenses: float | Sequence[float],
+             skill_powers: float | Sequence[float]) -> list[int]:
+        """
+        按整列计算，标量参数自动扩展到序列长度。作用于标量参数的修正阶段只算一次，
+        其余阶段逐阶段整列处理；运算顺序与逐项调用相同，结果完全一致。
+        """
+        length = 1
+        for arg in (attacks, defenses, skill_powers):
+            if not isinstance(arg, (int, float)):
+                length = len(arg)
+        attack_column = self._column(self._attack_stages, attacks, length)
+        defense_column = self._column(self._defense_stages, defenses, length)
+        power_column = repeat(skill_powers, length) if isinstance(skill_powers, (int, float)) else skill_powers
+        floor = math.floor
+        if not self._damage_stages:
+            return [floor((a / d) * 0.9 * p) if d > 0 else 9999
+                    for a, d, p in zip(attack_column, defense_column, power_column)]
+        damages = [(a / d) * 0.9 * p if d > 0 else None for a, d, p in zip(attack_column, defense_column, power_column)]
+        for stage in self._damage_stages:
+            rounding, multiplier = ROUNDING[stage.rounding], stage.multiplier
+            damages = [rounding(v * multiplier) if v is not None else None for v in damages]
+        return [floor(v) if v is not None else 9999 for v in damages]
+
+    def describe(self) -> str:
+        return "、".join(f"{s.name}×{s.multiplier:g}" for s in self.stages)
+
+
+# 没有任何修正时共用的管线，不必每次读取配置重新组装
+IDENTITY_PIPELINE = DamagePipeline()
+
+
+def build_pipeline(modifiers: DamageModifiers, multipliers: dict | None = None, rounding: str = "none") -> DamagePipeline:
+    """
+    按固定顺序组装修正阶段：能力等级 (作用于攻击 / 防御) -> 克制 -> 本系 -> 暴击 -> 额外倍率。
+    rounding 为伤害阶段的取整方式；能力等级阶段对能力值向下取整。
+    """
+    m = {**DEFAULT_MULTIPLIERS, **(multipliers or {})}
+    stages = []
+    if modifiers.attack_stage:
+        stages.append(Stage(f"攻击等级{modifiers.attack_stage:+d}",
+                            stat_stage_multiplier(modifiers.attack_stage, m["stat_stage_step"]), "attack", "floor"))
+    if modifiers.defense_stage:
+        stages.append(Stage(f"防御等级{modifiers.defense_stage:+d}",
+                            stat_stage_multiplier(modifiers.defense_stage, m["stat_stage_step"]), "defense", "floor"))
+    if modifiers.effectiveness == "克制":
+        stages.append(Stage("克制", m["type_advantage"], rounding=rounding))
+    elif modifiers.effectiveness == "抵抗":
+        stages.append(Stage("抵抗", m["type_resist"], rounding=rounding))
+    if modifiers.same_type:
+        stages.append(Stage("本系", m["same_type_bonus"], rounding=rounding))
+    if modifiers.crit:
+        stages.append(Stage("暴击", m["crit"], rounding=rounding))
+    for multiplier in modifiers.extra:
+        stages.append(Stage("额外倍率", multiplier, rounding=rounding))
+    return DamagePipeline(stages)
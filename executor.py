@@ -0,0 +1,72 @@
+# 洛克王国数值计算器 —— 重计算卸载
+# 批量、斩杀网格、对阵表、多次观测反推这类较重的请求放进线程池执行，避免长时间占用 AstrBot 的事件循环；
+# 估算开销低于阈值的请求仍在事件循环内直接执行，不增加任何延迟。
+# 开销按计算量估算，单位大致相当于普通机器上的 1 微秒：批量每行 8，斩杀网格 100，反推每次观测 40 (4 × 养成数，默认阈值下 3 次及以上观测才会卸载)。
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+
+
+class JobRejected(Exception):
+    """排队过多或等待超时，异常信息可以直接回复给用户"""
+
+
+class BoundedExecutor:
+    """
+    带并发上限和按用户排队的线程池执行器。
+    同一用户的重请求依次执行，不同用户之间最多 max_concurrent 个同时占用线程池。
+    """
+
+    def __init__(self, cost_threshold: int = 100, max_workers: int = 2, max_concurrent: int = 2,
+                 max_queue_per_user: int = 3, timeout: float = 5.0):
+        self.cost_threshold = cost_threshold
+        self.max_queue_per_user = max_queue_per_user
+        self.timeout = timeout
+        self.offloaded = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="roco-calculator")
+        # 同时提交的任务超过线程数也只会在线程池内部排队，还会先占着超时时间，所以不超过线程数
+        self._semaphore = asyncio.Semaphore(max(1, min(max_concurrent, max_workers)))
+        self._user_locks: dict[Hashable, asyncio.Lock] = {}
+        self._user_waiting: dict[Hashable, int] = {}
+
+    async def run(self, user: Hashable, cost: int, fn: Callable[..., Any], *args) -> Any:
+        """开销低于阈值时直接调用 fn，否则排队后在线程池中执行，超时抛出 JobRejected"""
+        if cost < self.cost_threshold:
+            return fn(*args)
+        waiting = self._user_waiting.get(user, 0)
+        if waiting >= self.max_queue_per_user:
+            self.rejected += 1
+            raise JobRejected(f"你还有 {waiting} 个计算在排队，请等前面的结果出来后再发送。")
+
+        self._user_waiting[user] = waiting + 1
+        lock = self._user_locks.setdefault(user, asyncio.Lock())
+        try:
+            return await asyncio.wait_for(self._run_queued(lock, fn, args), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise JobRejected(f"计算超过 {self.timeout:g} 秒仍未完成，机器人当前较忙，请稍后再试或缩小查询范围。")
+        finally:
+            self._user_waiting[user] -= 1
+            if not self._user_waiting[user]:
+                # 没有排队的请求时释放该用户的锁，用户表不会无限增长
+                del self._user_waiting[user]
+                del self._user_locks[user]
+
+    async def _run_queued(self, lock: asyncio.Lock, fn: Callable[..., Any], args: tuple) -> Any:
+        async with lock, self._semaphore:
+            self.offloaded += 1
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "offloaded": self.offloaded,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "queued_users": len(self._user_waiting),
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,75 @@
+# 洛克王国数值计算器 —— 游戏常数
+# 等级、努力值、性格倍率和合法个体点数来自插件配置，可以热更新。
+# 由常数推导出的查找表打包成一个不可变对象，更新时在后台整体重建，再一次性替换。
+
+from pathlib import Path
+from typing import NamedTuple
+
+from .speed_tiers import SpeedTierIndex
+from .stat_engine import StatTable
+from .table_store import load_stat_table
+
+
+class GameConstants(NamedTuple):
+    level: int = 60
+    effort_value: int = 50
+    full_iv: int = 60  # 只写 "个体" 不带点数时的个体总值
+    personality_multiplier: float = 1.2
+    iv_points: tuple[int, ...] = (7, 8, 9, 10)  # 合法个体点数，每点 6
+
+    @property
+    def iv_totals(self) -> tuple[int, ...]:
+        return (0,) + tuple(point * 6 for point in self.iv_points)
+
+    @property
+    def table_key(self) -> tuple:
+        """查找表只取决于这几项，其余常数变化时可以沿用旧表"""
+        return (self.level, self.effort_value, self.personality_multiplier, self.iv_points)
+
+    @classmethod
+    def from_config(cls, conf: dict) -> "GameConstants":
+        """从配置的 game 段读取常数，缺省项取默认值，不合法时抛出 ValueError"""
+        defaults = cls()
+        try:
+            iv_points = tuple(sorted({int(p) for p in conf.get("iv_points", defaults.iv_points)}))
+            constants = cls(
+                level=int(conf.get("level", defaults.level)),
+                effort_value=int(conf.get("effort_value", defaults.effort_value)),
+                full_iv=int(conf.get("full_iv", defaults.full_iv)),
+                personality_multiplier=float(conf.get("personality_multiplier", defaults.personality_multiplier)),
+                iv_points=iv_points,
+            )
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"游戏常数配置格式错误: {e}")
+        if constants.level <= 0 or constants.personality_multiplier <= 0:
+            raise ValueError("游戏常数配置错误：等级和性格倍率必须为正数。")
+        if not constants.iv_points or min(constants.iv_points) <= 0:
+            raise ValueError("游戏常数配置错误：合法个体点数至少一项且必须为正数。")
+        if constants.full_iv not in constants.iv_totals:
+            raise ValueError(f"游戏常数配置错误：满个体值 {constants.full_iv} 不是合法的个体总值 "
+                             f"({','.join(map(str, constants.iv_totals[1:]))})。")
+        return constants
+
+
+class GameTables(NamedTuple):
+    """一组游戏常数及由它推导出的全部查找表，整体替换"""
+    constants: GameConstants
+    stat_table: StatTable
+    speed_index: SpeedTierIndex
+
+
+def build_tables(constants: GameConstants, previous: GameTables | None = None,
+                 table_dir: Path | None = None) -> GameTables:
+    """
+    按常数构建查找表；与 previous 的查找表参数相同时直接沿用，不重复计算。
+    给出 table_dir 时能力值查找表从该目录的共享文件映射，多个进程共用一份。
+    """
+    if previous is not None and previous.constants.table_key == constants.table_key:
+        return GameTables(constants, previous.stat_table, previous.speed_index)
+    if table_dir is not None:
+        stat_table = load_stat_table(table_dir, constants.level, constants.effort_value,
+                                     constants.personality_multiplier, constants.iv_totals)
+    else:
+        stat_table = StatTable(constants.level, constants.effort_value, constants.personality_multiplier,
+                               iv_totals=constants.iv_totals)
+    return GameTables(constants, stat_table, SpeedTierIndex(stat_table))
@@ -0,0 +1,610 @@
+# 洛克王国数值计算器 —— 输入解析
+# 所有指令共用的预编译分词器：一次扫描把消息切成带类型的记号，再组装成参数结构体。
+# 解析结果按规范化后的输入做 LRU 缓存，重复的查询不再重复解析。
+
+import re
+from fractions import Fraction
+from functools import lru_cache
+from typing import NamedTuple
+
+# 合法个体：点数 7-10 或对应的总值 (每点 6)
+IV_POINTS = (7, 8, 9, 10)
+
+# 全角符号统一成半角，空白统一成单个空格
+_NORMALIZE_TABLE = str.maketrans({"＋": "+", "％": "%", "，": ",", "　": " "})
+_FULLWIDTH_RE = re.compile("[＋％，　]")
+
+# 智能模式记号，按优先级排列，一次 finditer 扫完整条消息
+_SMART_TOKEN_RE = re.compile(
+    r"(?P<key>威力|伤害)\s*(?P<key_value>\d+)"
+    # 数字在前的写法: "130伤害" 要求关键字后不紧跟数字；"130 伤害" 要求关键字后不再跟数字，
+    # 以免把 "对方80 威力75" 误读成威力 80
+    r"|(?P<value>\d+)(?P<gap>\s+)?(?P<value_key>威力|伤害)(?(gap)(?!\s*\d)|(?!\d))"
+    r"|(?P<stat>(?:(?:我方|对方)\s*)?\d+(?:\s*\+\s*(?:性格|个体\d*))*)"
+    r"|(?P<append>追加)"
+)
+_STAT_SPEC_RE = re.compile(r"(?:我方|对方)?\s*(?P<base>\d+)(?P<rest>.*)", re.S)
+_IV_RE = re.compile(r"个体(\d+)")
+_QUICK_RE = re.compile(r"(?P<base>\d+)(?P<suffix>.*)", re.S)
+_QUICK_G_RE = re.compile(r"g(\d+)?")
+_NUMBER_RE = re.compile(r"\d+")
+_DECIMAL_RE = re.compile(r"\d+\.?\d*")
+_HP_PERCENT_RE = re.compile(r"掉血\s*(\d+\.?\d*)\s*%?")
+_HP_DAMAGE_RE = re.compile(r"伤害\s*(\d+)")
+_SMART_MARKERS_RE = re.compile(r"[+]|我方|对方|威力|伤害|性格|个体")
+_BATCH_LINE_SPLIT_RE = re.compile(r"[\n;；]")
+_BATCH_FIELD_SPLIT_RE = re.compile(r"[,，\t]")
+_BATCH_DAMAGE_RE = re.compile(r"(?:伤害\s*)?(\d+)\s+(\d+)\s+(\d+)")
+_SPEED_RANGE_RE = re.compile(r"(?:速度\s*)?(\d+)\s*[-~到]\s*(\d+)")
+_SPEED_OPPONENT_RE = re.compile(r"对方\s*(\d+)")
+# "我方速度130"、"对方速度120" 里的 "速度" 只是标注，去掉后按数字解析
+_SPEED_LABEL_RE = re.compile(r"(?:(我方|对方)\s*)?速度\s*(?=\d)")
+_KO_KEY_RE = re.compile(r"(?:对方\s*)?(?P<key>威力|精力|防御)\s*(?P<value>\d+)")
+_OPTIMIZE_KEY_RE = re.compile(r"(?:(?:我方|对方)\s*)?(?P<key>速度|攻击|威力|精力|防御)\s*(?P<value>\d+)")
+_OPTIMIZE_TARGET_RE = re.compile(r"(?:超过|先手)\s*(?:对方\s*)?(?P<target>\S+)")
+_OPTIMIZE_HITS_RE = re.compile(r"(\d+)\s*次")
+_MATCHUP_TEAM_RE = re.compile(r"(?P<side>我方|对方)\s*[:：]?\s*(?P<members>.*)")
+_MATCHUP_POWER_RE = re.compile(r"威力\s*(?P<powers>\d+(?:\s*[/、,\s]\s*\d+)*)")
+_MATCHUP_MEMBER_SPLIT_RE = re.compile(r"[,，、]")
+_MATCHUP_MEMBER_RE = re.compile(r"(?P<base>[^+]+?)\s*(?P<rest>\+.*)?")
+_MATCHUP_STATS_RE = re.compile(r"\d+(?:\s*/\s*\d+){5}")
+_MATCHUP_PERSONALITY_RE = re.compile(r"性格(?P<field>精力|物攻|魔攻|物防|魔防|速度)?")
+_MODIFIER_RE = re.compile(
+    r"(?P<effectiveness>克制|抵抗|微弱)|(?P<same_type>本系)|(?P<crit>暴击)"
+    r"|(?P<stage_key>攻击|防御)等级\s*(?P<stage>[+-]\d+)"
+    r"|(?:[×*]|倍率)\s*(?P<extra>\d+(?:\.\d+)?)"
+)
+
+
+class StatSpec(NamedTuple):
+    """一只宠物某项能力的养成：种族值、是否有性格加成、个体总值"""
+    base: int
+    personality: bool
+    iv: int
+
+
+class ReverseQuery(NamedTuple):
+    """/反推防御 与 /反推攻击 的参数"""
+    player: StatSpec
+    player_text: str
+    opponent_race: int
+    observations: tuple[tuple[int, int], ...]  # (威力, 伤害)
+    append: bool
+
+
+class HpReverseQuery(NamedTuple):
+    """/精力反推 的参数"""
+    opponent_race: int
+    lost_hp_percent: float
+    damage: int
+
+
+class JointQuery(NamedTuple):
+    """/联合反推 的参数；lost_hp_percent 为显示的掉血百分比，percent_step 为其显示精度"""
+    player: StatSpec
+    player_text: str
+    skill_power: int
+    hp_race: int
+    defense_race: int
+    lost_hp_percent: Fraction
+    percent_step: Fraction
+    damage: int | None = None
+
+
+class MatchupMember(NamedTuple):
+    """
+    对阵表中的一只宠物：name 为图鉴名称，或 stats 直接给出六项种族值 (精力/物攻/魔攻/物防/魔防/速度)。
+    personality 为性格加成的能力项，"" 表示加在出手用的攻击项上，None 表示无性格。
+    """
+    label: str
+    name: str | None
+    stats: tuple[int, ...] | None
+    personality: str | None
+    iv: int
+
+
+class MatchupQuery(NamedTuple):
+    """/计算器 对阵 的参数"""
+    powers: tuple[int, ...]
+    magic: bool
+    export: bool
+    mine: tuple[MatchupMember, ...]
+    theirs: tuple[MatchupMember, ...]
+
+
+class BatchLine(NamedTuple):
+    """批量计算中的一行：养成 (spec) 或伤害参数 (damage_args)，无法解析时带 error"""
+    index: int
+    label: str
+    text: str
+    spec: StatSpec | None = None
+    damage_args: tuple[int, int, int] | None = None
+    error: str = ""
+
+
+class SpeedQuery(NamedTuple):
+    """/计算器 速度线 的参数：我方养成 (可带对方种族值)，或一个速度区间"""
+    player: StatSpec | None = None
+    player_text: str = ""
+    opponent_race: int | None = None
+    speed_range: tuple[int, int] | None = None
+
+
+class KoQuery(NamedTuple):
+    """/计算器 斩杀 的参数"""
+    player: StatSpec
+    player_text: str
+    skill_power: int
+    hp_race: int
+    defense_race: int
+
+
+class OptimizeQuery(NamedTuple):
+    """/计算器 最低养成 的参数：goal 为 speed (先手目标速度) 或 ko (保证 N 次击倒)"""
+    goal: str
+    base: int
+    target_speed: int | None = None
+    target_spec: StatSpec | None = None
+    target_text: str = ""
+    skill_power: int = 0
+    hp_race: int = 0
+    defense_race: int = 0
+    hits: int = 2
+
+
+class DamageModifiers(NamedTuple):
+    """伤害修正条件：克制 / 抵抗、本系、暴击、能力等级和额外倍率 (天气、场地等)"""
+    effectiveness: str | None = None  # "克制" / "抵抗"
+    same_type: bool = False
+    crit: bool = False
+    attack_stage: int = 0
+    defense_stage: int = 0
+    extra: tuple[float, ...] = ()
+
+    @property
+    def empty(self) -> bool:
+        return self == NO_MODIFIERS
+
+
+NO_MODIFIERS = DamageModifiers()
+
+
+def normalize(text: str) -> str:
+    """规范化输入，作为解析缓存的键"""
+    if _FULLWIDTH_RE.search(text):
+        text = text.translate(_NORMALIZE_TABLE)
+    return " ".join(text.split())
+
+
+def _iv_total(iv_num: int, iv_points: tuple[int, ...]) -> int:
+    if iv_num in iv_points:
+        return iv_num * 6
+    if iv_num % 6 == 0 and iv_num // 6 in iv_points:
+        return iv_num
+    raise ValueError(f"个体值不合法：'{iv_num}'。请输入点数({iv_points[0]}-{iv_points[-1]})"
+                     f"或总值({','.join(str(p * 6) for p in iv_points)})。")
+
+
+@lru_cache(maxsize=1024)
+def _parse_stat_spec(text: str, full_iv: int, iv_points: tuple[int, ...]) -> StatSpec:
+    match = _STAT_SPEC_RE.match(text)
+    if not match:
+        raise ValueError("格式错误，必须以种族值数字开头。")
+    rest = match.group("rest")
+    final_iv = 0
+    iv_match = _IV_RE.search(rest)
+    if iv_match:
+        final_iv = _iv_total(int(iv_match.group(1)), iv_points)
+    elif "个体" in rest:
+        final_iv = full_iv
+    return StatSpec(int(match.group("base")), "性格" in rest, final_iv)
+
+
+def parse_stat_spec(text: str, full_iv: int, iv_points: tuple[int, ...] = IV_POINTS) -> StatSpec:
+    """解析智能模式的养成描述，例如 "我方186+性格+个体10" """
+    return _parse_stat_spec(normalize(text), full_iv, iv_points)
+
+
+@lru_cache(maxsize=1024)
+def _parse_quick_spec(text: str, full_iv: int, iv_points: tuple[int, ...]) -> StatSpec:
+    match = _QUICK_RE.fullmatch(text)
+    if not match:
+        raise ValueError(f"快速模式格式错误: '{text}' 必须以数字开头。")
+    suffixes = match.group("suffix")
+    if suffixes.count("g") > 1 or suffixes.count("x") > 1:
+        raise ValueError(f"快速模式格式错误: '{text}' 包含重复的 'g' 或 'x' 后缀。")
+
+    temp_suffixes = suffixes.replace("x", "")
+    g_match = _QUICK_G_RE.search(temp_suffixes)
+    if g_match:
+        temp_suffixes = temp_suffixes.replace(g_match.group(0), "", 1)
+    if temp_suffixes:
+        raise ValueError(f"快速模式格式错误: '{text}' 包含无法识别的后缀 '{temp_suffixes}'。")
+
+    final_iv = full_iv
+    g_match = _QUICK_G_RE.search(suffixes)
+    if g_match:
+        if g_match.group(1):
+            iv_points_value = int(g_match.group(1))
+            if iv_points_value not in iv_points:
+                raise ValueError(f"快速模式个体值点数 '{iv_points_value}' 不合法，"
+                                 f"必须为 {iv_points[0]}-{iv_points[-1]}。")
+            final_iv = iv_points_value * 6
+        else:
+            final_iv = 0
+    return StatSpec(int(match.group("base")), "x" not in suffixes, final_iv)
+
+
+def parse_quick_spec(text: str, full_iv: int, iv_points: tuple[int, ...] = IV_POINTS) -> StatSpec:
+    """解析快速模式的养成代码，例如 "186xg8" (默认有性格满个体，x 去掉性格，g 指定个体)"""
+    return _parse_quick_spec(normalize(text), full_iv, iv_points)
+
+
+def is_quick_spec(text: str) -> bool:
+    """是否为快速模式养成代码 (数字后带 x / g 后缀)"""
+    match = _QUICK_RE.fullmatch(text)
+    return bool(match and match.group("suffix") and set(match.group("suffix")) <= set("xg0123456789"))
+
+
+def _block_type(block: str) -> str:
+    if "我方" in block or "性格" in block or "个体" in block:
+        return "player"
+    if "对方" in block:
+        return "opponent"
+    return "neutral"
+
+
+@lru_cache(maxsize=1024)
+def _parse_reverse(text: str, full_iv: int, iv_points: tuple[int, ...]) -> ReverseQuery:
+    append = "追加" in text
+    if append:
+        text = normalize(text.replace("追加", ""))
+
+    parts = text.split()
+    if len(parts) >= 4 and len(parts) % 2 == 0 and not _SMART_MARKERS_RE.search(text):
+        # 快速模式: [我方信息] [对方种族] [威力 伤害]...
+        if not all(p.isdigit() for p in parts[1:]):
+            raise ValueError("快速模式中对方种族值、威力和伤害都必须是数字。")
+        observations = tuple((int(parts[i]), int(parts[i + 1])) for i in range(2, len(parts), 2))
+        return ReverseQuery(_parse_quick_spec(parts[0], full_iv, iv_points), parts[0],
+                            int(parts[1]), observations, append)
+
+    # 智能模式: 一次扫描同时取出威力 / 伤害和两段种族值描述
+    values = {"威力": [], "伤害": []}
+    stat_blocks = []
+    for token in _SMART_TOKEN_RE.finditer(text):
+        if token.group("key"):
+            values[token.group("key")].append(int(token.group("key_value")))
+        elif token.group("value_key"):
+            values[token.group("value_key")].append(int(token.group("value")))
+        elif token.group("stat"):
+            stat_blocks.append(token.group("stat").strip())
+
+    if not values["威力"] or not values["伤害"]:
+        raise ValueError("缺少【威力】或【伤害】参数。")
+    if len(values["威力"]) != len(values["伤害"]):
+        raise ValueError("【威力】和【伤害】的数量不一致，多次观测请成对输入，例如 '威力75 伤害130 威力90 伤害156'。")
+    if len(stat_blocks) != 2:
+        raise ValueError("未能识别出我方和对方的种族值信息。请确保提供了两个数值（例如 '我方186+性格' 和 '对方80'，或 '186 80'）。")
+
+    b1, b2 = stat_blocks
+    type1, type2 = _block_type(b1), _block_type(b2)
+    if (type1, type2) in (("player", "opponent"), ("player", "neutral"), ("neutral", "opponent"), ("neutral", "neutral")):
+        # 两段都没有标记时按出现顺序，先我方后对方
+        player_text, opponent_text = b1, b2
+    elif (type1, type2) in (("opponent", "player"), ("neutral", "player"), ("opponent", "neutral")):
+        player_text, opponent_text = b2, b1
+    else:
+        raise ValueError("输入冲突：无法明确区分我方和对方。请检查您的输入，例如 '我方186+性格' 和 '对方80'。")
+
+    opponent_race = int(_NUMBER_RE.search(opponent_text).group(0))
+    return ReverseQuery(_parse_stat_spec(player_text, full_iv, iv_points), player_text, opponent_race,
+                        tuple(zip(values["威力"], values["伤害"])), append)
+
+
+def parse_reverse(text: str, full_iv: int, iv_points: tuple[int, ...] = IV_POINTS) -> ReverseQuery:
+    """解析 /反推防御、/反推攻击 的参数，自动区分快速模式和智能模式"""
+    return _parse_reverse(normalize(text), full_iv, iv_points)
+
+
+@lru_cache(maxsize=1024)
+def _parse_hp_reverse(text: str) -> HpReverseQuery:
+    opponent_race, lost_hp_percent, damage = None, None, None
+    remaining = text
+    percent_match = _HP_PERCENT_RE.search(remaining)
+    if percent_match:
+        lost_hp_percent = float(percent_match.group(1))
+        remaining = remaining.replace(percent_match.group(0), "", 1)
+    damage_match = _HP_DAMAGE_RE.search(remaining)
+    if damage_match:
+        damage = int(damage_match.group(1))
+        remaining = remaining.replace(damage_match.group(0), "", 1)
+    race_match = _NUMBER_RE.search(remaining)
+    if race_match:
+        opponent_race = int(race_match.group(0))
+
+    # 快速模式 (智能模式没解析全时): 按顺序的 3 个数字
+    if None in (opponent_race, lost_hp_percent, damage):
+        parts = _DECIMAL_RE.findall(text)
+        if len(parts) != 3:
+            raise ValueError("参数不足或格式错误，需要3个数值：种族值、掉血百分比、伤害值。")
+        opponent_race, lost_hp_percent, damage = int(float(parts[0])), float(parts[1]), int(float(parts[2]))
+
+    if lost_hp_percent <= 0:
+        raise ValueError("掉血百分比必须大于0。")
+    return HpReverseQuery(opponent_race, lost_hp_percent, damage)
+
+
+def parse_hp_reverse(text: str) -> HpReverseQuery:
+    """解析 /精力反推 的参数"""
+    return _parse_hp_reverse(normalize(text))
+
+
+def _percent(text: str) -> tuple[Fraction, Fraction]:
+    """"20" -> (20, 1)，"20.5" -> (20.5, 0.1)：按写出的小数位数确定显示精度"""
+    text = text.rstrip("%")
+    decimals = len(text.partition(".")[2])
+    return Fraction(text), Fraction(1, 10 ** decimals)
+
+
+@lru_cache(maxsize=1024)
+def _parse_joint(text: str, full_iv: int, iv_points: tuple[int, ...]) -> JointQuery:
+    parts = text.split()
+    if len(parts) in (5, 6) and not _SMART_MARKERS_RE.search(text) and not _KO_KEY_RE.search(text):
+        # 快速模式: [我方攻击信息] [威力] [对方精力种族] [对方防御种族] [掉血%] [伤害 (可选)]
+        numbers = parts[1:4] + parts[5:]
+        if not all(p.isdigit() for p in numbers) or not _DECIMAL_RE.fullmatch(parts[4].rstrip("%")):
+            raise ValueError("快速模式中威力、对方精力种族、防御种族、掉血百分比和伤害都必须是数字。")
+        player = _parse_quick_spec(parts[0], full_iv, iv_points)
+        skill_power, hp_race, defense_race = (int(p) for p in parts[1:4])
+        lost, step = _percent(parts[4])
+        damage = int(parts[5]) if len(parts) == 6 else None
+        player_text = parts[0]
+    else:
+        percent_match = _HP_PERCENT_RE.search(text)
+        if not percent_match:
+            raise ValueError("缺少【掉血】参数，例如 掉血35%。")
+        lost, step = _percent(percent_match.group(1))
+        text = text.replace(percent_match.group(0), " ", 1)
+        damage_match = _HP_DAMAGE_RE.search(text)
+        damage = int(damage_match.group(1)) if damage_match else None
+        if damage_match:
+            text = text.replace(damage_match.group(0), " ", 1)
+        values = {match.group("key"): int(match.group("value")) for match in _KO_KEY_RE.finditer(text)}
+        missing = [key for key in ("威力", "精力", "防御") if key not in values]
+        if missing:
+            raise ValueError(f"缺少【{'】【'.join(missing)}】参数。")
+        player_text = _KO_KEY_RE.sub(" ", text).strip()
+        if not player_text:
+            raise ValueError("缺少我方攻击养成，例如 我方186+性格+个体10 或 186xg8。")
+        if is_quick_spec(player_text):
+            player = _parse_quick_spec(player_text, full_iv, iv_points)
+        else:
+            player = _parse_stat_spec(player_text, full_iv, iv_points)
+        skill_power, hp_race, defense_race = values["威力"], values["精力"], values["防御"]
+
+    if not 0 < lost <= 100:
+        raise ValueError("掉血百分比必须大于 0 且不超过 100。")
+    return JointQuery(player, player_text, skill_power, hp_race, defense_race, lost, step, damage)
+
+
+def parse_joint(text: str, full_iv: int, iv_points: tuple[int, ...] = IV_POINTS) -> JointQuery:
+    """解析 /联合反推 的参数："186xg8 75 100 80 35% 130" 或 "我方186+性格 威力75 精力100 防御80 掉血35% 伤害130" """
+    return _parse_joint(normalize(text), full_iv, iv_points)
+
+
+@lru_cache(maxsize=1024)
+def _parse_ko(text: str, full_iv: int, iv_points: tuple[int, ...]) -> KoQuery:
+    parts = text.split()
+    if len(parts) == 4 and not _SMART_MARKERS_RE.search(text) and not _KO_KEY_RE.search(text):
+        # 快速模式: [我方攻击信息] [威力] [对方精力种族] [对方防御种族]
+        if not all(p.isdigit() for p in parts[1:]):
+            raise ValueError("快速模式中威力、对方精力种族和防御种族都必须是数字。")
+        return KoQuery(_parse_quick_spec(parts[0], full_iv, iv_points), parts[0], *(int(p) for p in parts[1:]))
+
+    values = {}
+    for match in _KO_KEY_RE.finditer(text):
+        values[match.group("key")] = int(match.group("value"))
+    missing = [key for key in ("威力", "精力", "防御") if key not in values]
+    if missing:
+        raise ValueError(f"缺少【{'】【'.join(missing)}】参数。")
+    player_text = _KO_KEY_RE.sub(" ", text).strip()
+    if not player_text:
+        raise ValueError("缺少我方攻击养成，例如 我方186+性格+个体10 或 186xg8。")
+    if is_quick_spec(player_text):
+        player = _parse_quick_spec(player_text, full_iv, iv_points)
+    else:
+        player = _parse_stat_spec(player_text, full_iv, iv_points)
+    return KoQuery(player, player_text, values["威力"], values["精力"], values["防御"])
+
+
+def parse_ko(text: str, full_iv: int, iv_points: tuple[int, ...] = IV_POINTS) -> KoQuery:
+    """解析斩杀分析的参数："186xg8 75 100 80" 或 "我方186+性格 威力75 对方精力100 防御80" """
+    return _parse_ko(normalize(text), full_iv, iv_points)
+
+
+@lru_cache(maxsize=1024)
+def _parse_optimize(text: str, full_iv: int, iv_points: tuple[int, ...]) -> OptimizeQuery:
+    target_match = _OPTIMIZE_TARGET_RE.search(text)
+    if target_match:
+        text = text[:target_match.start()] + text[target_match.end():]
+    values = {m.group("key"): int(m.group("value")) for m in _OPTIMIZE_KEY_RE.finditer(text)}
+
+    if "速度" in values:
+        if not target_match:
+            raise ValueError("缺少先手目标，例如 '超过260' (目标速度) 或 '超过120+性格+个体10' (对方速度养成)。")
+        target = target_match.group("target")
+        if target.isdigit():
+            return OptimizeQuery("speed", values["速度"], target_speed=int(target), target_text=target)
+        if is_quick_spec(target):
+            spec = _parse_quick_spec(target, full_iv, iv_points)
+        else:
+            spec = _parse_stat_spec(target, full_iv, iv_points)
+        return OptimizeQuery("speed", values["速度"], target_spec=spec, target_text=target)
+
+    missing = [key for key in ("攻击", "威力", "精力", "防御") if key not in values]
+    if missing:
+        raise ValueError(f"缺少【{'】【'.join(missing)}】参数。速度目标请写 '速度130 超过260'。")
+    hits_match = _OPTIMIZE_HITS_RE.search(text)
+    hits = int(hits_match.group(1)) if hits_match else 2
+    if hits <= 0:
+        raise ValueError("击倒次数必须大于 0。")
+    return OptimizeQuery("ko", values["攻击"], skill_power=values["威力"], hp_race=values["精力"],
+                         defense_race=values["防御"], hits=hits)
+
+
+def parse_optimize(text: str, full_iv: int, iv_points: tuple[int, ...] = IV_POINTS) -> OptimizeQuery:
+    """解析最低养成的目标："速度130 超过260"、"速度130 超过120+性格"，或 "攻击186 威力75 精力100 防御80 2次" """
+    return _parse_optimize(normalize(text), full_iv, iv_points)
+
+
+@lru_cache(maxsize=1024)
+def _parse_speed_query(text: str, full_iv: int, iv_points: tuple[int, ...]) -> SpeedQuery:
+    text = _SPEED_LABEL_RE.sub(r"\1", text)
+    range_match = _SPEED_RANGE_RE.fullmatch(text)
+    if range_match:
+        low, high = sorted(int(n) for n in range_match.groups())
+        return SpeedQuery(speed_range=(low, high))
+
+    opponent_race = None
+    opponent_match = _SPEED_OPPONENT_RE.search(text)
+    if opponent_match:
+        opponent_race = int(opponent_match.group(1))
+        text = (text[:opponent_match.start()] + text[opponent_match.end():]).strip()
+    if not text:
+        raise ValueError("缺少我方速度养成，例如 130+性格+个体10 或 130xg8。")
+    if is_quick_spec(text):
+        player = _parse_quick_spec(text, full_iv, iv_points)
+    else:
+        player = _parse_stat_spec(text, full_iv, iv_points)
+    return SpeedQuery(player, text, opponent_race)
+
+
+def parse_speed_query(text: str, full_iv: int, iv_points: tuple[int, ...] = IV_POINTS) -> SpeedQuery:
+    """解析速度线查询："我方130+性格 对方120"、"130xg8"，或速度区间 "250-260" """
+    return _parse_speed_query(normalize(text), full_iv, iv_points)
+
+
+def split_batch_lines(body: str) -> tuple[str, ...]:
+    """按换行和分号拆出批量输入的非空行"""
+    return tuple(line.strip() for line in _BATCH_LINE_SPLIT_RE.split(body) if line.strip())
+
+
+def parse_batch(body: str, full_iv: int, iv_points: tuple[int, ...] = IV_POINTS) -> list[BatchLine]:
+    """解析批量计算的多行输入，每行可带 "名称," 标签，单行出错不影响其他行"""
+    lines = split_batch_lines(body)
+    parsed = []
+    for index, line in enumerate(lines, 1):
+        fields = [f.strip() for f in _BATCH_FIELD_SPLIT_RE.split(line) if f.strip()]
+        label = ""
+        if len(fields) > 1 and not fields[0][0].isdigit() and not fields[0].startswith("伤害"):
+            label, fields = fields[0], fields[1:]
+        text = normalize(" ".join(fields))
+        try:
+            if text.startswith("伤害") or _BATCH_DAMAGE_RE.fullmatch(text):
+                damage_match = _BATCH_DAMAGE_RE.fullmatch(text)
+                if not damage_match:
+                    raise ValueError("伤害需要 3 个数值：攻击 防御 威力。")
+                parsed.append(BatchLine(index, label, text, damage_args=tuple(int(n) for n in damage_match.groups())))
+            elif is_quick_spec(text):
+                parsed.append(BatchLine(index, label, text, spec=_parse_quick_spec(text, full_iv, iv_points)))
+            else:
+                parsed.append(BatchLine(index, label, text, spec=_parse_stat_spec(text, full_iv, iv_points)))
+        except ValueError as ve:
+            parsed.append(BatchLine(index, label, text, error=str(ve)))
+    return parsed
+
+
+def _parse_matchup_member(text: str, full_iv: int, iv_points: tuple[int, ...]) -> MatchupMember:
+    match = _MATCHUP_MEMBER_RE.fullmatch(text)
+    if not match:
+        raise ValueError(f"无法识别队员 '{text}'。")
+    base, rest = match.group("base").strip(), match.group("rest") or ""
+    personality_match = _MATCHUP_PERSONALITY_RE.search(rest)
+    personality = (personality_match.group("field") or "") if personality_match else None
+    iv_match = _IV_RE.search(rest)
+    iv = _iv_total(int(iv_match.group(1)), iv_points) if iv_match else full_iv if "个体" in rest else 0
+    if _MATCHUP_STATS_RE.fullmatch(base):
+        stats = tuple(int(v) for v in base.split("/"))
+        return MatchupMember(base, None, stats, personality, iv)
+    if base[0].isdigit():
+        raise ValueError(f"队员 '{text}' 需要写宠物名，或完整的六项种族值 精力/物攻/魔攻/物防/魔防/速度。")
+    return MatchupMember(base, base, None, personality, iv)
+
+
+def parse_matchup(body: str, full_iv: int, iv_points: tuple[int, ...] = IV_POINTS,
+                  max_team: int = 6, max_powers: int = 4) -> MatchupQuery:
+    """
+    解析对阵表的多行输入：以 "我方" / "对方" 开头的行列出队员 (逗号或顿号分隔)，
+    其余内容为选项：威力 (可写多个)、魔法、导出。
+    """
+    teams = {"我方": [], "对方": []}
+    options = []
+    for line in body.splitlines():
+        line = normalize(line)
+        if not line:
+            continue
+        team_match = _MATCHUP_TEAM_RE.fullmatch(line)
+        if not team_match:
+            options.append(line)
+            continue
+        for member in _MATCHUP_MEMBER_SPLIT_RE.split(team_match.group("members")):
+            if member.strip():
+                teams[team_match.group("side")].append(_parse_matchup_member(member.strip(), full_iv, iv_points))
+
+    header = " ".join(options)
+    power_match = _MATCHUP_POWER_RE.search(header)
+    if not power_match:
+        raise ValueError("缺少【威力】参数，例如 威力75 120。")
+    powers = tuple(int(p) for p in _NUMBER_RE.findall(power_match.group("powers")))
+    if len(powers) > max_powers:
+        raise ValueError(f"最多比较 {max_powers} 个技能威力。")
+    for side, members in teams.items():
+        if not members:
+            raise ValueError(f"缺少{side}队员，请另起一行写 “{side} 宠物1, 宠物2”。")
+        if len(members) > max_team:
+            raise ValueError(f"{side}最多 {max_team} 只宠物。")
+    return MatchupQuery(powers, "魔法" in header, "导出" in header, tuple(teams["我方"]), tuple(teams["对方"]))
+
+
+@lru_cache(maxsize=1024)
+def _extract_damage_modifiers(text: str) -> tuple[str, DamageModifiers]:
+    fields = {"effectiveness": None, "same_type": False, "crit": False, "attack_stage": 0, "defense_stage": 0}
+    extra = []
+    for match in _MODIFIER_RE.finditer(text):
+        if match.group("effectiveness"):
+            if fields["effectiveness"]:
+                raise ValueError("克制和抵抗只能写一个。")
+            fields["effectiveness"] = "抵抗" if match.group("effectiveness") == "微弱" else match.group("effectiveness")
+        elif match.group("same_type"):
+            fields["same_type"] = True
+        elif match.group("crit"):
+            fields["crit"] = True
+        elif match.group("stage_key"):
+            key = "attack_stage" if match.group("stage_key") == "攻击" else "defense_stage"
+            fields[key] = int(match.group("stage"))
+        else:
+            multiplier = float(match.group("extra"))
+            if multiplier <= 0:
+                raise ValueError("额外倍率必须大于 0。")
+            extra.append(multiplier)
+    modifiers = DamageModifiers(**fields, extra=tuple(extra))
+    return normalize(_MODIFIER_RE.sub(" ", text)), modifiers
+
+
+def extract_damage_modifiers(text: str) -> tuple[str, DamageModifiers]:
+    """
+    取出输入中的伤害修正关键字，例如 "克制 本系 暴击 攻击等级+1 ×1.3"，
+    返回 (去掉修正后的文本, 修正条件)。没有修正时原样返回文本。
+    """
+    text = normalize(text)
+    if not _MODIFIER_RE.search(text):
+        return text, NO_MODIFIERS
+    return _extract_damage_modifiers(text)
+
+
+def cache_info() -> dict[str, object]:
+    """各解析函数的 LRU 缓存命中情况"""
+    return {fn.__name__.lstrip("_"): fn.cache_info()
+            for fn in (_parse_stat_spec, _parse_quick_spec, _parse_reverse, _parse_hp_reverse,
+                       _parse_speed_query, _parse_ko, _parse_optimize, _parse_joint, _extract_damage_modifiers)}
@@ -0,0 +1,87 @@
+# 洛克王国数值计算器 —— 精力 × 防御联合反推
+# 游戏只显示取整后的掉血百分比，它同时受对方精力和防御影响。
+# 对方每档防御对应一个伤害，伤害与显示百分比一起给出精力的区间，再在排好序的精力列上二分；
+# 伤害随防御单调，所以不可能有解的防御档位也先用二分整段剪掉，不需要枚举精力 × 防御的全部组合。
+
+from bisect import bisect_left, bisect_right
+from fractions import Fraction
+from typing import Callable, NamedTuple
+
+from .solver import UNBOUNDED, defense_range, monotone_range
+from .stat_engine import StatTable
+
+
+class JointResult(NamedTuple):
+    """
+    联合反推结果。defense_* / hp_* 为按数值排序的两列养成，
+    rows 为每档可行防御 (防御列下标, 伤害, 精力列下标起, 止)，对应精力列的 [起, 止) 一段。
+    """
+    lost_range: tuple[Fraction, Fraction | None]  # 实际掉血百分比区间 [下限, 上限)，上限为 None 表示不设上限
+    stat_range: tuple[int, int] | None  # 给出伤害时能打出该伤害的防御区间
+    defense_values: list[int]
+    defense_builds: list[tuple[bool, int]]
+    hp_values: list[int]
+    hp_builds: list[tuple[bool, int]]
+    rows: list[tuple[int, int, int, int]]
+
+    @property
+    def pairs(self) -> int:
+        return sum(end - start for _, _, start, end in self.rows)
+
+    @property
+    def combinations(self) -> int:
+        return len(self.defense_values) * len(self.hp_values)
+
+
+def lost_percent_range(percent: Fraction, step: Fraction) -> tuple[Fraction, Fraction | None]:
+    """显示值按四舍五入保留到 step，实际掉血落在 [percent - step/2, percent + step/2)；显示 100% 时不设上限"""
+    low = max(percent - step / 2, Fraction(0))
+    return low, None if percent >= 100 else percent + step / 2
+
+
+def hp_bounds(damage: int, lost_range: tuple[Fraction, Fraction | None]) -> tuple[int, int]:
+    """掉血 damage 且百分比落在 lost_range 内的精力闭区间：damage*100/上限 < 精力 <= damage*100/下限"""
+    low, high = lost_range
+    hp_min = 1 if high is None else damage * 100 // high + 1
+    hp_max = UNBOUNDED if low <= 0 else damage * 100 // low
+    return int(hp_min), int(hp_max)
+
+
+def joint_reverse(table: StatTable, attack: int, skill_power: int, hp_race: int, defense_race: int,
+                  lost_range: tuple[Fraction, Fraction | None], damage: int | None,
+                  damage_fn: Callable[[int, int, int], int], closed_form: bool = True) -> JointResult:
+    """对方 (精力养成, 防御养成) 中与显示掉血百分比 (以及可选的伤害数字) 一致的全部组合"""
+    defense_values, defense_builds = table.sorted_column(defense_race)
+    hp_values, hp_builds = table.sorted_column(hp_race, kind="hp")
+    damage_of = lambda i: damage_fn(attack, defense_values[i], skill_power)
+
+    # 给出伤害数字时，防御只能落在能打出该伤害的区间内
+    stat_range = None
+    first, last = 0, len(defense_values)
+    if damage is not None:
+        if closed_form:
+            stat_range = defense_range(attack, skill_power, damage, damage_fn)
+        else:
+            stat_range = monotone_range(lambda v: damage_fn(attack, v, skill_power), damage, 1, decreasing=True)
+        if stat_range is None:
+            first = last = 0
+        else:
+            first = bisect_left(defense_values, stat_range[0])
+            last = bisect_right(defense_values, stat_range[1])
+
+    # 伤害随防御不增，精力区间的两端随伤害不减：伤害太高 (精力下限超过满养成) 或
+    # 太低 (精力上限不到无养成) 的防御档位各是一段前缀 / 后缀，二分剪掉
+    indices = range(len(defense_values))
+    first = bisect_left(indices, True, lo=first, hi=last,
+                        key=lambda i: hp_bounds(damage_of(i), lost_range)[0] <= hp_values[-1])
+    last = bisect_left(indices, True, lo=first, hi=last,
+                       key=lambda i: hp_bounds(damage_of(i), lost_range)[1] < hp_values[0])
+
+    rows = []
+    for i in range(first, last):
+        dealt = damage_of(i)
+        hp_min, hp_max = hp_bounds(dealt, lost_range)
+        start, end = bisect_left(hp_values, hp_min), bisect_right(hp_values, hp_max)
+        if start < end:
+            rows.append((i, dealt, start, end))
+    return JointResult(lost_range, stat_range, defense_values, defense_builds, hp_values, hp_builds, rows)
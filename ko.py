@@ -0,0 +1,37 @@
+# 洛克王国数值计算器 —— 斩杀线分析
+# 对方 "精力养成 × 防御养成" 的全部组合一次算完：伤害只随防御养成变化，
+# 先按防御列算出一列伤害，再与精力列做整数向上取整除法，得到每个组合的击倒次数。
+
+from collections import Counter
+from typing import NamedTuple
+
+from .damage import DamagePipeline
+from .stat_engine import StatTable
+
+
+class KoAnalysis(NamedTuple):
+    """斩杀分析结果；hits[i][j] 为第 i 档防御、第 j 档精力下的击倒次数，伤害为 0 时为 None"""
+    defense_values: list[int]
+    defense_builds: list[tuple[bool, int]]
+    hp_values: list[int]
+    hp_builds: list[tuple[bool, int]]
+    damages: list[int]
+    hits: list[list[int | None]]
+    distribution: dict[int | None, int]  # 击倒次数 -> 组合数
+
+    @property
+    def combinations(self) -> int:
+        return len(self.defense_values) * len(self.hp_values)
+
+
+def ko_analysis(table: StatTable, attack: int, skill_power: int, hp_race: int, defense_race: int,
+                pipeline: DamagePipeline) -> KoAnalysis:
+    """对方所有精力 / 防御养成组合下，用同一技能击倒所需的次数及其分布"""
+    defense_values, defense_builds = table.sorted_column(defense_race)
+    hp_values, hp_builds = table.sorted_column(hp_race, kind="hp")
+    # 攻击方的修正只算一次，防御列整列计算
+    damages = pipeline.many(attack, defense_values, skill_power)
+    hits = [[-(-hp // damage) for hp in hp_values] if damage > 0 else [None] * len(hp_values)
+            for damage in damages]
+    distribution = Counter(n for row in hits for n in row)
+    return KoAnalysis(defense_values, defense_builds, hp_values, hp_builds, damages, hits, dict(distribution))
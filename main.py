@@ -1,77 +1,287 @@
 # 引入 AstrBot 插件开发所需的核心库
 from astrbot.api.event import filter, AstrMessageEvent
-from astrbot.api.star import Context, Star, register
-from astrbot.api import logger
+from astrbot.api.star import Context, Star, StarTools, register
+from astrbot.api import logger, AstrBotConfig
+import astrbot.api.message_components as Comp
 
 # 引入 Python 内置的数学计算和正则表达式库
+import asyncio
+import json
 import math
-import re
+import os
+import time
+import uuid
+from bisect import bisect_right
+
+from .stat_engine import build_name
+from .solver import UNBOUNDED, observation_matches
+from .session import ReverseSession, SessionStore, intersect_range
+from .cache import ReportCache
+from .species import STAT_FIELDS, SpeciesDB
+from .game_config import GameConstants, GameTables, build_tables
+from .damage import DEFAULT_MULTIPLIERS, IDENTITY_PIPELINE, ROUNDING, DamagePipeline, build_pipeline
+from .joint import joint_reverse, lost_percent_range
+from .ko import ko_analysis
+from .matchup import Matchup, build_combatant, matchup, percent, to_csv
+from .optimizer import cheapest_builds, min_attack_for_damage
+from .executor import BoundedExecutor, JobRejected
+from .singleflight import SingleFlight
+from .observation_log import Observation, ObservationLog
+from .paging import Pager, Report
+from .metrics import MetricsRegistry, instrumented, mark_error, mark_parse_error
+from .input_parser import DamageModifiers, HpReverseQuery, NO_MODIFIERS, cache_info as parser_cache_info, extract_damage_modifiers, JointQuery, MatchupQuery, normalize, parse_batch, parse_hp_reverse, parse_joint, parse_ko, parse_matchup, parse_optimize, parse_reverse, parse_speed_query, parse_stat_spec, split_batch_lines
+
+PLUGIN_NAME = "astrbot_plugin_hapemxg_roco_world"
 
 # @register 装饰器用于注册插件信息
 # 分别是：插件ID, 作者, 插件描述, 插件版本号
 @register("calculator", "hapemxg", "洛克王国数值计算器", "1.4.2")
 class CalculatorPlugin(Star):
-    def __init__(self, context: Context):
+    def __init__(self, context: Context, config: AstrBotConfig = None):
         super().__init__(context)
-        # --- 将固定的游戏参数作为类属性，方便管理 ---
-        self.LEVEL = 60
-        self.EFFORT_VALUE = 50
-        self.INDIVIDUAL_VALUE = 60 # 满个体值
-        self.PERSONALITY_MULTIPLIER = 1.2
+        self.config = config if config is not None else {}
+        # --- 游戏常数来自插件配置 (game 段)，修改后在后台重建查找表并整体替换，无需重启 ---
+        # 加载时预先算好全部能力值 / 精力和速度线索引，之后的计算都是查表
+        # 能力值查找表默认写成数据目录下的共享文件，同一台机器上的多个实例只读映射同一份
+        self._table_dir = None
+        if self.config.get("shared_tables", True):
+            try:
+                self._table_dir = StarTools.get_data_dir(PLUGIN_NAME) / "tables"
+            except Exception as e:
+                logger.warning(f"无法确定插件数据目录，查找表不使用共享文件: {e}")
+        self._tables: GameTables = build_tables(self._load_game_constants(GameConstants()), table_dir=self._table_dir)
+        self.CONFIG_CHECK_INTERVAL = 30 # 检查游戏常数配置变化的间隔 (秒)
+        self._config_task: asyncio.Task | None = None
+        self._reload_lock = asyncio.Lock()
+        self.BATCH_MAX_LINES = 60 # 批量计算单次最多行数
+        self.SPEED_RANGE_MAX_LINES = 40 # 速度区间查询最多列出的条数
+        self.MATCHUP_MAX_TEAM = 6 # 对阵表每队最多宠物数
+        self.MATCHUP_MAX_POWERS = 4 # 对阵表最多比较的技能威力数
+        self.EXPORT_TTL = 3600 # 导出的 CSV 文件保留时间 (秒)
+        # 反推会话：同一场战斗的多次伤害观测逐步缩小候选养成
+        self._sessions = SessionStore(ttl=600, max_sessions=1024)
+        # 反推报告缓存：按解析后的规范参数缓存最终报告
+        self._report_cache = ReportCache(max_entries=512, ttl=300)
+        # 长报告分页：先发结论摘要，详细内容按页发送，没发完的部分用 "更多" 继续
+        output_conf = self.config.get("output", {})
+        self._pager = Pager(
+            page_chars=output_conf.get("page_chars", 1500),
+            pages_per_reply=output_conf.get("pages_per_reply", 3),
+            ttl=output_conf.get("ttl_seconds", 600),
+        )
+        # 宠物图鉴：首次用到名称时才加载
+        self._species = SpeciesDB()
+        # 指令统计：调用次数、参数错误率和延迟分布，定期写入日志
+        self.METRICS_EXPORT_INTERVAL = 600 # 秒
+        self._metrics = MetricsRegistry(ring_size=512, enabled=self.config.get("metrics", {}).get("enabled", True))
+        self._metrics_task: asyncio.Task | None = None
+        # 重请求 (批量、斩杀网格、对阵表、多次观测反推) 超过开销阈值时放进线程池，不阻塞事件循环
+        executor_conf = self.config.get("executor", {})
+        self._executor = BoundedExecutor(
+            cost_threshold=executor_conf.get("cost_threshold", 100),
+            max_workers=executor_conf.get("max_workers", 2),
+            max_concurrent=executor_conf.get("max_concurrent_jobs", 2),
+            max_queue_per_user=executor_conf.get("max_queue_per_user", 3),
+            timeout=executor_conf.get("timeout_seconds", 5.0),
+        )
+        # 同时到达的相同重请求只计算一次
+        self._singleflight = SingleFlight()
+        # 反推观测记录：后台线程批量写入 SQLite，用于统计常见养成
+        log_conf = self.config.get("observation_log", {})
+        self._observation_log: ObservationLog | None = None
+        if log_conf.get("enabled", True):
+            try:
+                self._observation_log = ObservationLog(
+                    StarTools.get_data_dir(PLUGIN_NAME) / "observations.db",
+                    batch_size=log_conf.get("batch_size", 200),
+                    flush_interval=log_conf.get("flush_interval_seconds", 2.0),
+                )
+            except Exception as e:
+                logger.error(f"反推观测记录初始化失败，本次运行不记录观测: {e}", exc_info=True)
+
+    # --- 游戏常数：请求开始时读取的是当时的查找表，替换只影响之后的请求 ---
+
+    @property
+    def LEVEL(self) -> int:
+        return self._tables.constants.level
+
+    @property
+    def EFFORT_VALUE(self) -> int:
+        return self._tables.constants.effort_value
+
+    @property
+    def INDIVIDUAL_VALUE(self) -> int:
+        """满个体值"""
+        return self._tables.constants.full_iv
+
+    @property
+    def PERSONALITY_MULTIPLIER(self) -> float:
+        return self._tables.constants.personality_multiplier
+
+    @property
+    def IV_POINTS(self) -> tuple[int, ...]:
+        """合法个体点数"""
+        return self._tables.constants.iv_points
+
+    @property
+    def _stat_table(self):
+        return self._tables.stat_table
+
+    @property
+    def _speed_index(self):
+        return self._tables.speed_index
+
+    async def initialize(self):
+        """插件激活时启动统计的定期导出任务和游戏常数配置检查"""
+        self._metrics_task = asyncio.create_task(self._export_metrics_loop())
+        self._config_task = asyncio.create_task(self._watch_game_config_loop())
+
+    async def terminate(self):
+        """插件停用时取消后台任务并关闭线程池"""
+        for task in (self._metrics_task, self._config_task):
+            if task is not None:
+                task.cancel()
+        self._metrics_task = self._config_task = None
+        self._executor.shutdown()
+        if self._observation_log is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._observation_log.close)
+            self._observation_log = None
+
+    def _read_game_config(self) -> dict:
+        """读取配置的 game 段；配置文件存在时直接读文件，拿到 WebUI 中保存的最新值"""
+        path = getattr(self.config, "config_path", None)
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8-sig") as f:
+                return json.load(f).get("game", {})
+        return self.config.get("game", {})
+
+    def _load_game_constants(self, fallback: GameConstants) -> GameConstants:
+        try:
+            return GameConstants.from_config(self._read_game_config())
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取计算器游戏常数失败，继续使用当前值: {e}")
+            return fallback
+
+    async def reload_game_constants(self) -> bool:
+        """
+        重新读取游戏常数。查找表在线程池中重建，完成后一次性替换；
+        重建期间的请求继续使用旧表。只改了满个体值时沿用旧表，只清空报告缓存。返回常数是否有变化。
+        """
+        async with self._reload_lock:
+            current = self._tables
+            constants = self._load_game_constants(current.constants)
+            if constants == current.constants:
+                return False
+            tables = await asyncio.get_running_loop().run_in_executor(None, build_tables, constants, current, self._table_dir)
+            self._tables = tables
+            if tables.stat_table is not current.stat_table:
+                # 会话里的候选养成和观测都基于旧表
+                self._sessions.clear()
+            self._on_game_constants_changed()
+            return True
+
+    async def _watch_game_config_loop(self):
+        while True:
+            await asyncio.sleep(self.CONFIG_CHECK_INTERVAL)
+            try:
+                await self.reload_game_constants()
+            except Exception as e:
+                logger.error(f"重载计算器游戏常数出错: {e}", exc_info=True)
+
+    async def _export_metrics_loop(self):
+        while True:
+            await asyncio.sleep(self.METRICS_EXPORT_INTERVAL)
+            if self._metrics.snapshot():
+                logger.info(self._metrics.format_report())
 
     # --- 内部核心计算方法 ---
     
-    def _parse_stat_input(self, input_str: str) -> tuple[int, bool, int]:
-        clean_str = input_str.replace("我方", "").replace("对方", "").strip()
-        base_race_match = re.match(r"^\s*(\d+)", clean_str)
-        if not base_race_match: raise ValueError("格式错误，必须以种族值数字开头。")
-        base_race_value = int(base_race_match.group(1))
-        has_personality = "性格" in clean_str
-        final_iv = 0
-        iv_match = re.search(r"个体(\d+)", clean_str)
-        if iv_match:
-            iv_num = int(iv_match.group(1))
-            allowed_points = {7, 8, 9, 10}
-            allowed_totals = {42, 48, 54, 60}
-            if iv_num not in allowed_points and iv_num not in allowed_totals:
-                raise ValueError(f"个体值不合法：'{iv_num}'。请输入点数(7-10)或总值(42,48,54,60)。")
-            final_iv = iv_num * 6 if iv_num in allowed_points else iv_num
-        elif "个体" in clean_str:
-            final_iv = self.INDIVIDUAL_VALUE
-        return (base_race_value, has_personality, final_iv)
-
-    def _parse_quick_mode_attacker(self, input_str: str) -> tuple[int, bool, int]:
-        base_race_match = re.match(r'^(\d+)', input_str)
-        if not base_race_match:
-            raise ValueError(f"快速模式格式错误: '{input_str}' 必须以数字开头。")
-        
-        base_race = int(base_race_match.group(1))
-        suffixes = input_str[len(base_race_match.group(1)):]
-
-        if suffixes.count('g') > 1 or suffixes.count('x') > 1:
-            raise ValueError(f"快速模式格式错误: '{input_str}' 包含重复的 'g' 或 'x' 后缀。")
-        
-        temp_suffixes = suffixes.replace('x', '')
-        g_match_validation = re.search(r'g(\d+)?', temp_suffixes)
-        if g_match_validation:
-            temp_suffixes = temp_suffixes.replace(g_match_validation.group(0), '')
-        if temp_suffixes:
-            raise ValueError(f"快速模式格式错误: '{input_str}' 包含无法识别的后缀 '{temp_suffixes}'。")
-
-        has_pers = 'x' not in suffixes
-        final_iv = self.INDIVIDUAL_VALUE
-        g_match = re.search(r'g(\d+)?', suffixes)
-        if g_match:
-            iv_num_str = g_match.group(1)
-            if iv_num_str:
-                iv_points = int(iv_num_str)
-                if not (7 <= iv_points <= 10):
-                    raise ValueError(f"快速模式个体值点数 '{iv_points}' 不合法，必须为 7-10。")
-                final_iv = iv_points * 6
-            else:
-                final_iv = 0
-        return base_race, has_pers, final_iv
-    
+    def _get_batch_help_text(self) -> str:
+        """批量计算指令的帮助文本"""
+        return (
+            "--- 批量计算帮助 ---\n\n"
+            "一条消息里每行一条输入 (也可用 ; 分隔)，一次算出全部结果。\n\n"
+            "能力值 / 精力: 直接写养成，例如 186+性格+个体10 或 186xg8\n"
+            "伤害: 伤害 攻击 防御 威力，例如 伤害 300 200 75\n"
+            "可选标签: 行首写 名称, 再接输入，例如 迪莫, 186+性格\n\n"
+            "示例:\n"
+            "/计算器 批量\n"
+            "迪莫, 186+性格+个体10\n"
+            "150+个体\n"
+            "伤害 300 200 75"
+        )
+
+    def _get_speed_help_text(self) -> str:
+        """速度线指令的帮助文本"""
+        return (
+            "--- 速度线帮助 ---\n\n"
+            "> 我方养成: 列出对方每种养成下，种族值多少以内你先手、同速、后手。\n"
+            "示例: /计算器 速度线 130+性格+个体10 或 /计算器 速度线 130xg8\n\n"
+            "> 加上对方种族值: 逐个养成比较双方速度。\n"
+            "示例: /计算器 速度线 130+性格 对方120\n\n"
+            "> 速度区间: 列出最终速度落在区间内的全部种族值和养成。\n"
+            "示例: /计算器 速度线 250-260\n\n"
+            "在图鉴中补充宠物数据后 (见 /计算器 图鉴 帮助)，“我方”“对方”后面也可以直接写宠物名代替种族值。"
+        )
+
+    def _get_ko_help_text(self) -> str:
+        """斩杀分析指令的帮助文本"""
+        return (
+            "--- 斩杀分析帮助 ---\n\n"
+            "给出我方攻击养成、技能威力和对方的精力、防御种族值，\n"
+            "统计对方全部精力养成 × 防御养成组合下，需要几次击倒以及各占多少比例。\n\n"
+            "--- 快速模式 ---\n"
+            "格式: /计算器 斩杀 [我方攻击信息] [威力] [对方精力种族] [对方防御种族]\n"
+            "示例: /计算器 斩杀 186xg8 75 100 80\n\n"
+            "--- 智能模式 ---\n"
+            "示例: /计算器 斩杀 我方186+性格 威力75 对方精力100 防御80\n"
+            "在图鉴中补充宠物数据后 (见 /计算器 图鉴 帮助)，“我方”“对方”后面也可以直接写宠物名代替种族值 (加“魔法”则按魔攻计算)。\n\n"
+            "--- 伤害修正 ---\n"
+            "可追加 克制/抵抗、本系、暴击、攻击等级+N、防御等级-N、×倍率 (天气、场地等)。\n"
+            "示例: /计算器 斩杀 186xg8 75 100 80 克制 本系"
+        )
+
+    def _get_matchup_help_text(self) -> str:
+        """对阵表指令的帮助文本"""
+        return (
+            "--- 对阵表帮助 ---\n\n"
+            "一次算出两队之间每一对宠物的先后手，以及各技能威力下的伤害占对方精力的百分比。\n\n"
+            "第一行写技能威力 (最多 4 个)，加“魔法”按魔攻 / 魔防计算，加“导出”附带 CSV 文件。\n"
+            "之后用“我方”“对方”开头的两行列出队员 (每队最多 6 只)，用逗号或顿号分隔。\n"
+            "队员写六项种族值 精力/物攻/魔攻/物防/魔防/速度，图鉴中已补充的宠物也可以直接写宠物名，\n"
+            "养成写法: +个体10 (全部能力)、+性格速度 (性格加成的能力项；只写 +性格 则加在攻击上)。\n\n"
+            "示例:\n"
+            "/计算器 对阵 威力75 120 导出\n"
+            "我方 95/110/70/85/80/130+性格速度+个体10, 120/90/125/80/95/85+个体\n"
+            "对方 100/120/80/90/85/110+性格+个体"
+        )
+
+    def _get_species_help_text(self) -> str:
+        """图鉴指令的帮助文本"""
+        return (
+            "--- 图鉴帮助 ---\n\n"
+            "按名称、名称前缀或拼音首字母查询宠物种族值。\n"
+            "示例: /计算器 图鉴 [宠物名]\n\n"
+            "--- 补充图鉴数据 ---\n"
+            "插件不附带宠物数据，请在插件目录的 data/species.json 的 species 列表中逐只添加：\n"
+            '{"name": "宠物名", "abbr": "拼音首字母", "stats": [精力, 物攻, 魔攻, 物防, 魔防, 速度]}\n'
+            "abbr 可省略，省略的宠物只能按名称和名称前缀查找。修改后重载插件生效。\n"
+            "补充后，反推、斩杀、速度线、对阵等指令中“我方”“对方”后面可以直接写宠物名。"
+        )
+
+    def _get_optimize_help_text(self) -> str:
+        """最低养成指令的帮助文本"""
+        return (
+            "--- 最低养成帮助 ---\n\n"
+            "找出达成目标所需的最低养成，按成本从低到高：先看无性格，再看有性格。\n\n"
+            "> 先手: 速度[我方速度种族] 超过[目标速度或对方速度养成]\n"
+            "示例: /计算器 最低养成 速度130 超过260\n"
+            "示例: /计算器 最低养成 速度130 超过120+性格+个体10\n\n"
+            "> 击倒: 攻击[我方攻击种族] 威力[技能威力] 精力[对方精力种族] 防御[对方防御种族] [N]次\n"
+            "按对方精力、防御都是性格+满个体计算，保证 N 次内击倒 (不写次数默认 2 次)。\n"
+            "示例: /计算器 最低养成 攻击186 威力75 精力100 防御80 2次"
+        )
+
     def _get_main_reverse_help_text(self) -> str:
         """/反推 指令的帮助文本"""
         return (
@@ -79,9 +289,11 @@ class CalculatorPlugin(Star):
             "本插件提供三种反推计算功能：\n\n"
             "> /反推防御 : 根据你造成的伤害，反推对方的防御能力。\n"
             "> /反推攻击 : 根据你受到的伤害，反推对方的攻击能力。\n"
-            "> /精力反推 : 根据伤害和掉血百分比，反推对方的精力。\n\n"
+            "> /精力反推 : 根据伤害和掉血百分比，反推对方的精力。\n"
+            "> /联合反推 : 根据我方攻击和掉血百分比，同时反推对方的精力和防御。\n\n"
             "要查看具体指令的详细用法，请在指令后加上“帮助”，例如：\n"
-            "/反推防御 帮助"
+            "/反推防御 帮助\n\n"
+            "报告较长时先发送结论，模拟明细分页发送，其余内容可用 /计算器 更多 继续查看。"
         )
 
     def _get_reverse_help_text(self) -> str:
@@ -95,7 +307,16 @@ class CalculatorPlugin(Star):
             "示例: /反推防御 186xg8 80 75 130\n\n"
             "--- 智能模式 ----\n"
             "说明: 参数顺序随意，通过关键字自动识别。\n"
-            "示例: /反推防御 我方186+性格 对方80 威力75 130伤害"
+            "示例: /反推防御 我方186+性格 对方80 威力75 130伤害\n"
+            "在图鉴中补充宠物数据后 (见 /计算器 图鉴 帮助)，“我方”“对方”后面也可以直接写宠物名代替种族值 (加“魔法”则按魔攻/魔防计算)。\n\n"
+            "--- 多次观测 ---\n"
+            "一条消息可成对输入多组威力和伤害，候选养成会逐次缩小。\n"
+            "示例: /反推防御 186xg8 80 75 130 90 156\n"
+            "加上“追加”可接着本场之前的观测继续缩小 (10分钟内有效)。\n"
+            "示例: /反推防御 追加 我方186+性格 对方80 威力120 伤害210\n\n"
+            "--- 伤害修正 ---\n"
+            "可追加 克制/抵抗、本系、暴击、攻击等级+N、防御等级-N、×倍率 (天气、场地等)。\n"
+            "示例: /反推防御 186xg8 80 75 260 克制"
         )
 
     def _get_reverse_attack_help_text(self) -> str:
@@ -107,7 +328,32 @@ class CalculatorPlugin(Star):
             "示例: /反推攻击 100xg8 186 75 130\n\n"
             "--- 智能模式 ----\n"
             "说明: 参数顺序随意，通过关键字自动识别。\n"
-            "示例: /反推攻击 我方100+性格 对方186 威力75 130伤害"
+            "示例: /反推攻击 我方100+性格 对方186 威力75 130伤害\n"
+            "在图鉴中补充宠物数据后 (见 /计算器 图鉴 帮助)，“我方”“对方”后面也可以直接写宠物名代替种族值 (加“魔法”则按魔攻/魔防计算)。\n\n"
+            "--- 多次观测 ---\n"
+            "一条消息可成对输入多组威力和伤害，候选养成会逐次缩小。\n"
+            "示例: /反推攻击 100xg8 186 75 130 90 156\n"
+            "加上“追加”可接着本场之前的观测继续缩小 (10分钟内有效)。\n"
+            "示例: /反推攻击 追加 我方100+性格 对方186 威力120 伤害210\n\n"
+            "--- 伤害修正 ---\n"
+            "可追加 克制/抵抗、本系、暴击、攻击等级+N、防御等级-N、×倍率 (天气、场地等)。\n"
+            "示例: /反推攻击 100xg8 186 75 195 本系 暴击"
+        )
+
+    def _get_joint_reverse_help_text(self) -> str:
+        """精力 × 防御联合反推指令的帮助文本"""
+        return (
+            "--- 联合反推指令帮助 ---\n\n"
+            "掉血百分比同时取决于对方的精力和防御。给出我方攻击养成、技能威力、对方精力和防御种族值，\n"
+            "以及显示的掉血百分比，列出全部吻合的 (防御养成, 精力养成) 组合。\n"
+            "显示值按四舍五入处理：写 35 视为实际掉血 34.5%~35.5%，写 35.2 视为 35.15%~35.25%。\n"
+            "伤害数字可选，写了可以大幅缩小范围，并会记入本场防御反推。\n\n"
+            "--- 快速模式 ---\n"
+            "格式: /联合反推 [我方攻击信息] [威力] [对方精力种族] [对方防御种族] [掉血%] [伤害(可选)]\n"
+            "示例: /联合反推 186xg8 75 100 80 33% 112\n\n"
+            "--- 智能模式 ---\n"
+            "示例: /联合反推 我方186+性格 威力75 精力100 防御80 掉血35%\n"
+            "在图鉴中补充宠物数据后 (见 /计算器 图鉴 帮助)，“我方”“对方”后面也可以直接写宠物名代替种族值 (加“魔法”则按魔攻计算)；也可追加 克制、本系、暴击 等伤害修正。"
         )
 
     def _get_reverse_hp_help_text(self) -> str:
@@ -127,30 +373,567 @@ class CalculatorPlugin(Star):
             "示例:\n"
 
             "  /精力反推 对方128 掉血20% 伤害102\n"
-            "  /精力反推 伤害102 对方128 掉血20"
+            "  /精力反推 伤害102 对方128 掉血20\n"
+            "在图鉴中补充宠物数据后 (见 /计算器 图鉴 帮助)，“对方”后面也可以直接写宠物名代替种族值 (按图鉴精力种族值)。"
         )
 
     def _calculate_stat(self, base_race_value: int, personality: bool, individual_value: int) -> int:
         """计算除精力外的五维属性（物攻、魔攻、物防、魔防、速度）"""
-        personality_to_use = self.PERSONALITY_MULTIPLIER if personality else 1.0
-        l_coefficient = (base_race_value + individual_value / 2) / 100
-        initial_stat = l_coefficient * (self.LEVEL + 50) + 10
-        final_stat = initial_stat * personality_to_use + self.EFFORT_VALUE
-        return math.ceil(final_stat)
+        return self._stat_table.stat(base_race_value, personality, individual_value)
 
     def _calculate_hp(self, base_race_value: int, personality: bool, individual_value: int) -> int:
         """根据特殊公式计算精力（HP）属性"""
-        personality_to_use = self.PERSONALITY_MULTIPLIER if personality else 1.0
-        l_coefficient = (base_race_value + individual_value / 2) / 100
-        initial_hp = (2 * l_coefficient + 1) * self.LEVEL + 50 * l_coefficient + 10
-        final_hp = initial_hp * personality_to_use + self.EFFORT_VALUE
-        return math.ceil(final_hp)
+        return self._stat_table.hp(base_race_value, personality, individual_value)
 
     def _calculate_damage(self, attack: int, defense: int, skill_power: int) -> int:
         if defense <= 0: return 9999
         damage = (attack / defense) * 0.9 * skill_power
         return math.floor(damage)
 
+    def _damage_fn(self, pipeline: DamagePipeline):
+        """没有修正阶段时直接用基础公式，反推和斩杀不必经过逐阶段的循环"""
+        return self._calculate_damage if pipeline.identity else pipeline
+
+    def _damage_pipeline(self, modifiers: DamageModifiers) -> DamagePipeline:
+        """按配置的 damage 段倍率组装伤害修正；配置缺项或不合法时使用默认倍率"""
+        if modifiers == NO_MODIFIERS:
+            return IDENTITY_PIPELINE
+        conf = self.config.get("damage", {})
+        multipliers = {}
+        for name, default in DEFAULT_MULTIPLIERS.items():
+            try:
+                multipliers[name] = float(conf.get(name, default))
+            except (TypeError, ValueError):
+                logger.warning(f"伤害修正配置 {name} 不是数字，使用默认值 {default}")
+                multipliers[name] = default
+        rounding = conf.get("rounding", "none")
+        if rounding not in ROUNDING:
+            logger.warning(f"伤害修正配置 rounding 不支持 {rounding}，改为逐阶段保留小数")
+            rounding = "none"
+        return build_pipeline(modifiers, multipliers, rounding)
+
+    def _resolve_species(self, text: str, role: str) -> str:
+        """
+        把输入中的 "我方迪莫"、"对方火神" 换成对应的种族值。
+        role 为 defense / attack / hp / speed / ko / joint；带 "魔法" 时取魔攻、魔防，否则取物攻、物防。
+        """
+        magic = "魔法" in text
+        text = text.replace("魔法", "").replace("物理", "")
+        attack_field, defense_field = ("魔攻", "魔防") if magic else ("物攻", "物防")
+        player_field, opponent_field = {
+            "defense": (attack_field, defense_field),
+            "attack": (defense_field, attack_field),
+            "hp": (None, "精力"),
+            "speed": ("速度", "速度"),
+            "ko": (attack_field, None),
+            "joint": (attack_field, None),
+        }[role]
+        return self._species.substitute_names(text, player_field, opponent_field)
+
+    def _on_game_constants_changed(self):
+        """游戏常数变化后的失效钩子：清空依赖旧常数的报告缓存"""
+        self._report_cache.invalidate()
+        logger.info(f"计算器游戏常数已变更为 {self._tables.constants}，报告缓存已清空。")
+
+    def _log_reverse(self, role: str, opponent_race: int, my_stat: int, observations: list[tuple[int, int]],
+                     candidates, stat_range: tuple[int, int] | None, append: bool):
+        """记录反推观测；"追加" 的结果与本场之前的记录重叠，不再计入常见养成"""
+        if self._observation_log is None:
+            return
+        builds = tuple(sorted(candidates))
+        for i, (skill_power, damage) in enumerate(observations):
+            self._observation_log.record(Observation(
+                role, opponent_race, damage, builds, my_stat, skill_power, stat_range=stat_range,
+                counted=not append and i == len(observations) - 1))
+
+    def _log_hp_reverse(self, query: HpReverseQuery, hps: list[int], builds: list, position: int, estimated_total_hp: int):
+        """记录精力反推观测，推断养成取模拟精力最接近估算值的一档"""
+        if self._observation_log is None:
+            return
+        opponent_race, lost_hp_percent, damage = query
+        nearest = min((i for i in (position - 1, position) if 0 <= i < len(hps)),
+                      key=lambda i: abs(hps[i] - estimated_total_hp))
+        self._observation_log.record(Observation(
+            "hp", opponent_race, damage, (builds[nearest],), lost_hp_percent=lost_hp_percent))
+
+    def _common_builds_report(self, text: str) -> str:
+        """某个种族值被反推出的常见养成"""
+        if self._observation_log is None:
+            return "反推观测记录未开启，可在插件配置的 observation_log 中开启。"
+        parts = text.split()
+        if not parts or not parts[0].isdigit():
+            raise ValueError("请先写对方种族值，例如 /计算器 常见养成 80 防御")
+        base = int(parts[0])
+        kinds = {"防御": "defense", "攻击": "attack", "精力": "hp"}
+        selected = [k for k in kinds if k in text] or list(kinds)
+        lines = [f"--- 种族值 {base} 的常见养成 ---"]
+        for label in selected:
+            top = self._observation_log.top_builds(kinds[label], base)
+            lines.append(f"\n[{label}]")
+            if not top:
+                lines.append("暂无记录。")
+            for build, count in top:
+                lines.append(f"> {build_name(*build):<16} {count} 次")
+        return "\n".join(lines)
+
+    def _hp_reverse_report(self, query: HpReverseQuery) -> Report:
+        """根据伤害和掉血百分比生成精力反推报告，精力模拟表放在详细内容里"""
+        tables = self._tables
+        cache_key = ("hp", tables.constants, query)
+        cached = self._report_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        opponent_race, lost_hp_percent, actual_damage = query
+        estimated_total_hp = math.ceil(actual_damage / (lost_hp_percent / 100))
+        hps, builds = tables.stat_table.sorted_column(opponent_race, kind="hp")
+
+        # 找到满足 hps[i-1] <= 估算精力 < hps[i] 的位置
+        position = bisect_right(hps, estimated_total_hp)
+        if position == 0:
+            analysis = f"对方养成水平极低，估算精力({estimated_total_hp})低于最低模拟值({hps[0]})。"
+        elif position == len(hps):
+            analysis = f"对方养成水平极高，估算精力({estimated_total_hp})高于或等于满养成模拟值({hps[-1]})。"
+        else:
+            analysis = f"对方的精力养成情况最可能介于 [{build_name(*builds[position - 1])}] 和 [{build_name(*builds[position])}] 之间。"
+
+        summary = (f"--- 精力反推分析 ---\n\n"
+                   f"对方精力种族: {opponent_race}\n"
+                   f"掉血百分比: {lost_hp_percent}%\n"
+                   f"实际伤害: {actual_damage}\n\n"
+                   f"==> 估算总精力: {estimated_total_hp}\n\n"
+                   f"--- 结论 ---\n您的估算总精力为 {estimated_total_hp}。\n{analysis}")
+        details = ["--- 精力模拟 (按从低到高) ---"]
+        for hp, build in zip(hps, builds):
+            details.append(f"> {build_name(*build):<16} -> 模拟精力: {hp}")
+
+        report = Report(summary, tuple(details))
+        self._report_cache.put(cache_key, report)
+        # 只在真正计算时记录，缓存命中和合并到的重复请求不再计入
+        self._log_hp_reverse(query, hps, builds, position, estimated_total_hp)
+        return report
+
+    def _reverse_report(self, role: str, my_stat: int, player_input_str: str, opponent_race: int,
+                        observations: list[tuple[int, int]], session_key: tuple, append: bool,
+                        modifiers: DamageModifiers = NO_MODIFIERS, replayed: bool = False) -> Report:
+        """
+        根据一条或多条 (威力, 伤害) 观测生成防御 / 攻击反推报告。
+        每条观测的吻合养成都与已有候选集合求交集，append 为真时接着上一次的会话继续缩小范围。
+        modifiers 为这几次观测共同的伤害修正条件；replayed 为真时不记录观测 (发起计算的请求已记录)。
+        """
+        # 整个报告使用同一组查找表，计算途中游戏常数被替换也不会混用新旧数值
+        tables = self._tables
+        pipeline = self._damage_pipeline(modifiers)
+        damage_fn = self._damage_fn(pipeline)
+        title, my_label, opp_label, verb = (
+            ("防御", "我方攻击", "对方防御种族", "造成") if role == "defense"
+            else ("攻击", "我方防御", "对方攻击种族", "受到"))
+
+        # 不带 "追加" 的查询只取决于参数本身，可以直接走缓存；命中时仍要登记本场会话，
+        # 观测只在真正计算时记录一次，重复查询不会重复计入常见养成
+        cache_key = None if append else ("reverse", tables.constants, pipeline.stages, role, my_stat, player_input_str, opponent_race, tuple(observations))
+        if cache_key is not None:
+            cached = self._report_cache.get(cache_key)
+            if cached is not None:
+                report, candidates, stat_range = cached
+                self._sessions.put(session_key, ReverseSession(
+                    candidates=set(candidates), stat_range=stat_range,
+                    observations=[(my_stat, power, damage) for power, damage in observations]))
+                return report
+
+        previous = self._sessions.get(session_key) if append else None
+        if previous is None:
+            session = ReverseSession(candidates=set(tables.stat_table.builds), stat_range=(0, UNBOUNDED))
+        else:
+            # 复制后再修改，线程池中的计算不会改动其他请求正在读取的会话
+            session = ReverseSession(set(previous.candidates), previous.stat_range, list(previous.observations))
+
+        single_result = None
+        for skill_power, actual_damage in observations:
+            stat_range, matches, position = observation_matches(
+                tables.stat_table, opponent_race, my_stat, skill_power, actual_damage, damage_fn, role,
+                closed_form=pipeline.identity)
+            session.candidates &= {build for _, build in matches}
+            session.stat_range = intersect_range(session.stat_range, stat_range)
+            session.observations.append((my_stat, skill_power, actual_damage))
+            single_result = (matches, position)
+        self._sessions.put(session_key, session)
+
+        values, builds = tables.stat_table.sorted_column(opponent_race)
+        if len(session.observations) == 1:
+            # 单次观测：没有完全吻合时给出最接近的两档养成
+            matches, position = single_result
+            if matches:
+                names = "、".join(f"[{build_name(*build)}]" for _, build in matches)
+                analysis = f"完全吻合的养成: {names}。"
+            elif position == 0: analysis = "对方可能完全没有养成，或养成水平极低。"
+            elif position == len(builds):
+                analysis = f"对方养成水平极高，伤害已{'低' if role == 'defense' else '高'}于满养成模拟值。"
+            else:
+                analysis = f"没有完全吻合的养成，对方最可能介于 [{build_name(*builds[position - 1])}] 和 [{build_name(*builds[position])}] 之间。"
+        else:
+            count = len(session.observations)
+            if session.candidates:
+                names = "、".join(f"[{build_name(*build)}]" for build in builds if build in session.candidates)
+                analysis = f"综合 {count} 次观测，完全吻合的养成: {names}。"
+            else:
+                analysis = f"{count} 次观测没有共同吻合的养成，请检查伤害是否准确，或不带“追加”重新开始一场反推。"
+        if session.stat_range:
+            upper = "以上" if session.stat_range[1] >= UNBOUNDED else f"~{session.stat_range[1]}"
+            analysis = f"能造成该伤害的{title}区间: {session.stat_range[0]}{upper}\n{analysis}"
+
+        powers = [power for power, _ in observations]
+        damages = [damage for _, damage in observations]
+        lines = [f"--- 伤害反推({title})分析 ---\n\n"
+                 f"{my_label}: {my_stat} (基于 {player_input_str.strip()})\n"
+                 f"{opp_label}: {opponent_race}\n"
+                 f"技能威力: {' / '.join(map(str, powers))}\n"
+                 f"实际{verb}伤害: {' / '.join(map(str, damages))}"]
+        if not pipeline.identity:
+            lines.append(f"伤害修正: {pipeline.describe()}")
+        if len(session.observations) > len(observations):
+            lines.append(f"(本场已累计 {len(session.observations)} 次观测)")
+        lines.append(f"\n--- 结论 ---\n您{verb}的实际伤害为 {' / '.join(map(str, damages))}。\n{analysis}")
+
+        # 养成 × 威力的伤害网格：每个威力整列计算一次，再按养成逐行输出
+        if role == "defense":
+            grid = [pipeline.many(my_stat, values, power) for power in powers]
+        else:
+            grid = [pipeline.many(values, my_stat, power) for power in powers]
+        details = [f"--- 伤害模拟 (按对方{title}从低到高) ---"]
+        for value, build, predicted in zip(values, builds, zip(*grid)):
+            details.append(f"> {build_name(*build):<16} ({title}: {value}) -> 预计伤害: {' / '.join(map(str, predicted))}")
+
+        report = Report("\n".join(lines), tuple(details))
+        if cache_key is not None:
+            self._report_cache.put(cache_key, (report, frozenset(session.candidates), session.stat_range))
+        if not replayed:
+            self._log_reverse(role, opponent_race, my_stat, observations, session.candidates, session.stat_range, append)
+        return report
+
+    def _joint_report(self, query: JointQuery, modifiers: DamageModifiers, session_key: tuple) -> Report:
+        """
+        精力 × 防御联合反推：列出与显示掉血百分比 (及可选的伤害数字) 一致的全部 (精力养成, 防御养成) 组合。
+        给出伤害数字时，可行的防御养成同时记为一场防御反推会话，之后可用 /反推防御 追加 继续缩小。
+        """
+        tables = self._tables
+        pipeline = self._damage_pipeline(modifiers)
+        damage_fn = self._damage_fn(pipeline)
+        player = query.player
+        my_attack = tables.stat_table.stat(player.base, player.personality, player.iv)
+
+        cache_key = ("joint", tables.constants, pipeline.stages, query)
+        cached = self._report_cache.get(cache_key)
+        if cached is None:
+            lost_range = lost_percent_range(query.lost_hp_percent, query.percent_step)
+            result = joint_reverse(tables.stat_table, my_attack, query.skill_power, query.hp_race, query.defense_race,
+                                   lost_range, query.damage, damage_fn, closed_form=pipeline.identity)
+            candidates = frozenset(result.defense_builds[i] for i, _, _, _ in result.rows)
+
+            low, high = lost_range
+            shown = f"{float(query.lost_hp_percent):g}%"
+            actual = f"{float(low):g}% 以上" if high is None else f"{float(low):g}%~{float(high):g}%"
+            lines = [f"--- 精力 × 防御联合反推 ---\n\n"
+                     f"我方攻击: {my_attack} (基于 {query.player_text})\n"
+                     f"技能威力: {query.skill_power}\n"
+                     f"对方精力种族: {query.hp_race}, 防御种族: {query.defense_race}\n"
+                     f"显示掉血: {shown} (实际掉血 {actual})\n"
+                     f"实际伤害: {query.damage if query.damage is not None else '未提供'}"]
+            if not pipeline.identity:
+                lines.append(f"伤害修正: {pipeline.describe()}")
+
+            details = [f"--- 可行组合 ({result.pairs} / {result.combinations} 种，按对方防御从低到高) ---"]
+            for i, dealt, start, end in result.rows:
+                hp_names = "、".join(f"[{build_name(*build)}]" for build in result.hp_builds[start:end])
+                details.append(f"> {build_name(*result.defense_builds[i]):<16} (防御: {result.defense_values[i]}) "
+                               f"-> 伤害 {dealt}, 精力 {result.hp_values[start]}~{result.hp_values[end - 1]}: {hp_names}")
+
+            if result.rows:
+                hp_candidates = {build for _, _, start, end in result.rows for build in result.hp_builds[start:end]}
+                defense_names = "、".join(f"[{build_name(*b)}]" for b in result.defense_builds if b in candidates)
+                hp_names = "、".join(f"[{build_name(*b)}]" for b in result.hp_builds if b in hp_candidates)
+                analysis = f"可能的防御养成: {defense_names}\n可能的精力养成: {hp_names}"
+                if query.damage is not None:
+                    analysis += f"\n可行的防御养成已记入本场防御反推，可用 /反推防御 追加 继续缩小 (10分钟内有效)。"
+            else:
+                analysis = "没有吻合的组合，请检查掉血百分比和伤害是否准确，或确认伤害修正条件。"
+            lines.append(f"\n--- 结论 ---\n{analysis}")
+            cached = (Report("\n".join(lines), tuple(details)), candidates, result.stat_range)
+            self._report_cache.put(cache_key, cached)
+
+        report, candidates, stat_range = cached
+        if query.damage is not None:
+            # 与本场已有的防御反推求交集，而不是覆盖掉之前的观测
+            observation = (my_attack, query.skill_power, query.damage)
+            previous = self._sessions.get(session_key)
+            if previous is None:
+                self._sessions.put(session_key, ReverseSession(set(candidates), stat_range, [observation]))
+            elif observation not in previous.observations:
+                session = ReverseSession(previous.candidates & candidates, intersect_range(previous.stat_range, stat_range),
+                                         previous.observations + [observation])
+                self._sessions.put(session_key, session)
+                names = "、".join(f"[{build_name(*b)}]" for b in tables.stat_table.sorted_column(query.defense_race)[1]
+                                 if b in session.candidates)
+                merged = (f"\n\n与本场之前的 {len(previous.observations)} 次防御反推观测合并后，"
+                          + (f"可能的防御养成: {names}" if names else "没有共同吻合的防御养成，可不带“追加”重新开始一场反推。"))
+                report = report._replace(summary=report.summary + merged)
+        return report
+
+    def _speed_report(self, text: str) -> str:
+        """速度线查询：与对方各养成的先后手分界、指定对方种族值的逐项比较，或速度区间内的全部养成"""
+        tables = self._tables
+        query = parse_speed_query(self._resolve_species(text, "speed"), tables.constants.full_iv, tables.constants.iv_points)
+        if query.speed_range:
+            low, high = query.speed_range
+            found = tables.speed_index.in_range(low, high)
+            lines = [f"--- 速度 {low}~{high} 的养成 (共 {len(found)} 种) ---"]
+            for speed, base, build in found[:self.SPEED_RANGE_MAX_LINES]:
+                lines.append(f"> 速度 {speed}: 种族 {base} [{build_name(*build)}]")
+            if len(found) > self.SPEED_RANGE_MAX_LINES:
+                lines.append(f"... 还有 {len(found) - self.SPEED_RANGE_MAX_LINES} 种，请缩小区间。")
+            return "\n".join(lines)
+
+        player = query.player
+        my_speed = tables.stat_table.stat(player.base, player.personality, player.iv)
+        lines = [f"--- 速度线: {query.player_text} -> 速度 {my_speed} ---"]
+        if query.opponent_race is not None:
+            lines.append(f"对方速度种族: {query.opponent_race}\n")
+            for pers, iv in tables.stat_table.builds:
+                speed = tables.stat_table.stat(query.opponent_race, pers, iv)
+                verdict = "我方先手" if my_speed > speed else "同速" if my_speed == speed else "对方先手"
+                lines.append(f"> {build_name(pers, iv):<16} (速度: {speed}) -> {verdict}")
+            return "\n".join(lines)
+
+        lines.append("按对方养成列出种族值分界:\n")
+        for tier in tables.speed_index.compare(my_speed):
+            parts = []
+            if tier.outspeed_max is not None:
+                parts.append(f"种族≤{tier.outspeed_max} 我方先手")
+            if tier.tie:
+                low, high = tier.tie
+                parts.append(f"种族{low if low == high else f'{low}~{high}'} 同速")
+            if tier.lose_min is not None:
+                parts.append(f"种族≥{tier.lose_min} 对方先手")
+            lines.append(f"> {build_name(*tier.build):<16} {', '.join(parts)}")
+        return "\n".join(lines)
+
+    def _ko_report(self, text: str) -> Report:
+        """斩杀分析：对方全部精力 × 防御养成组合的击倒次数分布，逐个防御养成的明细放在详细内容里"""
+        tables = self._tables
+        text, modifiers = extract_damage_modifiers(text)
+        pipeline = self._damage_pipeline(modifiers)
+        query = parse_ko(self._resolve_species(text, "ko"), tables.constants.full_iv, tables.constants.iv_points)
+        cache_key = ("ko", tables.constants, pipeline.stages, query)
+        cached = self._report_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        player = query.player
+        my_attack = tables.stat_table.stat(player.base, player.personality, player.iv)
+        result = ko_analysis(tables.stat_table, my_attack, query.skill_power, query.hp_race, query.defense_race, pipeline)
+
+        def hits_label(hits: int | None) -> str:
+            return "无法击倒" if hits is None else f"{hits} 次"
+
+        lines = [f"--- 斩杀分析 ---\n\n"
+                 f"我方攻击: {my_attack} (基于 {query.player_text})\n"
+                 f"技能威力: {query.skill_power}\n"
+                 f"对方精力种族: {query.hp_race}, 防御种族: {query.defense_race}\n"
+                 f"伤害修正: {pipeline.describe() or '无'}\n"
+                 f"单次伤害: {min(result.damages)}~{max(result.damages)}\n\n"
+                 f"--- 击倒次数分布 (共 {result.combinations} 种养成组合) ---"]
+        for hits, count in sorted(result.distribution.items(), key=lambda x: (x[0] is None, x[0] or 0)):
+            lines.append(f"> {hits_label(hits):<6}: {count} 种 ({count / result.combinations:.0%})")
+
+        details = [f"--- 按对方防御养成 (精力 {result.hp_values[0]}~{result.hp_values[-1]}) ---"]
+        for build, defense, damage, row in zip(result.defense_builds, result.defense_values, result.damages, result.hits):
+            fewest, most = row[0], row[-1]
+            shown = hits_label(fewest) if fewest == most else f"{fewest}~{most} 次"
+            details.append(f"> {build_name(*build):<16} (防御: {defense}) -> 伤害 {damage}, 击倒需 {shown}")
+
+        report = Report("\n".join(lines), tuple(details))
+        self._report_cache.put(cache_key, report)
+        return report
+
+    async def _compute(self, user: str, key: tuple, cost: int, fn, *args, replay: bool = False):
+        """
+        执行一次报告计算。轻请求直接在事件循环内计算 (期间不会有其他请求插入，重复请求随后命中报告缓存)；
+        重请求按规范化参数 key 合并同时进行的相同请求，再交给线程池。
+        replay 为真时，合并到别人计算的请求方会带 replayed=True 再调用一次 fn (此时命中报告缓存)，
+        以完成与请求方相关的副作用，例如登记自己的反推会话；观测记录等只该发生一次的副作用由 fn 跳过。
+        """
+        if cost < self._executor.cost_threshold:
+            return fn(*args)
+        result, shared = await self._singleflight.do(key, self._executor.run, user, cost, fn, *args)
+        return fn(*args, replayed=True) if shared and replay else result
+
+    def _matchup_report(self, query: MatchupQuery) -> tuple[Report, Matchup]:
+        """两队对阵表，返回 (报告, 对阵结果)；对阵结果用于按需导出 CSV"""
+        table = self._tables.stat_table
+        attack_field, defense_field = ("魔攻", "魔防") if query.magic else ("物攻", "物防")
+        index = self._species.index if any(m.name for m in query.mine + query.theirs) else None
+
+        def combatants(members, labels):
+            result = []
+            for label, member in zip(labels, members):
+                stats = member.stats if member.stats is not None else index.resolve(member.name).stats
+                result.append(build_combatant(table, f"{label}.{member.label}", stats, member.personality, member.iv,
+                                              attack_field, defense_field))
+            return result
+
+        mine = combatants(query.mine, (str(i) for i in range(1, len(query.mine) + 1)))
+        theirs = combatants(query.theirs, "ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+        result = matchup(mine, theirs, query.powers, self._calculate_damage)
+
+        def grid(title: str, cell) -> list[str]:
+            rows = [[cell(i, j) for j in range(len(theirs))] for i in range(len(mine))]
+            width = max(len(c) for row in rows for c in row) + 2
+            lines = ["", f"--- {title} ---", "    " + "".join(d.label.split(".")[0].ljust(width) for d in theirs)]
+            for a, row in zip(mine, rows):
+                lines.append(a.label.split(".")[0].ljust(4) + "".join(c.ljust(width) for c in row))
+            return lines
+
+        # 摘要为先后手表，双方能力值和掉血百分比表作为详细内容分页
+        order_names = {1: "先", 0: "同", -1: "后"}
+        lines = [f"--- 对阵表 ({'魔法' if query.magic else '物理'}, 威力 {'/'.join(map(str, query.powers))}) ---"]
+        lines += grid("先后手 (行: 我方, 列: 对方; 先 = 我方先手)", lambda i, j: order_names[result.order[i][j]])
+        details = []
+        for side, team in (("我方", mine), ("对方", theirs)):
+            details.append(f"{side}:")
+            for c in team:
+                details.append(f"> {c.label}: 精力 {c.hp} 攻击 {c.attack} 防御 {c.defense} 速度 {c.speed}")
+        details += grid("我方出手: 对方掉血%", lambda i, j: "/".join(
+            str(percent(d, theirs[j].hp)) for d in result.dealt[i][j]))
+        details += grid("对方出手: 我方掉血% (行: 被打的我方)", lambda i, j: "/".join(
+            str(percent(d, mine[i].hp)) for d in result.taken[i][j]))
+        return Report("\n".join(lines), tuple(details)), result
+
+    def _write_export(self, filename: str, content: str) -> str:
+        """把导出内容写进插件数据目录，顺带清理过期的导出文件，返回文件路径"""
+        directory = StarTools.get_data_dir(PLUGIN_NAME) / "exports"
+        directory.mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        for old in directory.iterdir():
+            if now - old.stat().st_mtime > self.EXPORT_TTL:
+                old.unlink(missing_ok=True)
+        path = directory / f"{uuid.uuid4().hex}-{filename}"
+        # 带 BOM，表格软件打开时能正确识别中文
+        path.write_text(content, encoding="utf-8-sig")
+        return str(path)
+
+    def _optimize_report(self, text: str) -> str:
+        """最低养成：把目标换算成所需的最低能力值，再在每种性格下二分出最低个体"""
+        tables = self._tables
+        table = tables.stat_table
+        query = parse_optimize(text, tables.constants.full_iv, tables.constants.iv_points)
+
+        if query.goal == "speed":
+            if query.target_spec is not None:
+                spec = query.target_spec
+                target_speed = table.stat(spec.base, spec.personality, spec.iv)
+                target_desc = f"对方 {query.target_text} (速度 {target_speed})"
+            else:
+                target_speed = query.target_speed
+                target_desc = f"速度 {target_speed}"
+            threshold = target_speed + 1
+            lines = [f"--- 最低养成: 先手 ---\n\n"
+                     f"我方速度种族: {query.base}\n"
+                     f"目标: 超过{target_desc}，需要速度 ≥ {threshold}\n"]
+            stat_label = "速度"
+        else:
+            worst = (True, max(table.iv_totals))  # 对方精力、防御均为性格+满个体
+            hp = table.hp(query.hp_race, *worst)
+            defense = table.stat(query.defense_race, *worst)
+            needed_damage = -(-hp // query.hits)
+            threshold = min_attack_for_damage(defense, query.skill_power, needed_damage, self._calculate_damage)
+            lines = [f"--- 最低养成: {query.hits} 次击倒 ---\n\n"
+                     f"我方攻击种族: {query.base}, 技能威力: {query.skill_power}\n"
+                     f"对方 (精力种族 {query.hp_race}, 防御种族 {query.defense_race}) 按 [{build_name(*worst)}] 计算: "
+                     f"精力 {hp}, 防御 {defense}\n"
+                     f"目标: 单次伤害 ≥ {needed_damage}"]
+            if threshold is None:
+                lines.append("\n该威力无法达到所需伤害。")
+                return "\n".join(lines)
+            lines[-1] += f"，需要攻击 ≥ {threshold}\n"
+            stat_label = "攻击"
+
+        options = cheapest_builds(table, query.base, threshold)
+        for option in options:
+            label = "有性格" if option.personality else "无性格"
+            if option.iv is None:
+                lines.append(f"> {label}: 无法达到 (满个体{stat_label} {option.value})")
+            else:
+                lines.append(f"> {label}: [{build_name(option.personality, option.iv)}] ({stat_label} {option.value})")
+        cheapest = next((option for option in options if option.iv is not None), None)
+        if cheapest is None:
+            lines.append(f"\n==> 满养成也无法达到目标。")
+        else:
+            lines.append(f"\n==> 最低养成: [{build_name(cheapest.personality, cheapest.iv)}]")
+        return "\n".join(lines)
+
+    def _stats_report(self) -> str:
+        """指令统计 + 报告缓存和解析缓存的命中情况"""
+        cache = self._report_cache.stats()
+        pool = self._executor.stats()
+        flight = self._singleflight.stats()
+        log = self._observation_log
+        log_line = f"> 已写入 {log.written} 条, 丢弃 {log.dropped} 条" if log else "> 未开启"
+        mapped = self._stat_table.mapped_from
+        table_line = f"> 共享文件 {mapped.name} (只读映射)" if mapped else "> 进程内计算"
+        parser_lines = [f"> {name}: 命中 {info.hits} / 未命中 {info.misses}, 条目 {info.currsize}"
+                        for name, info in parser_cache_info().items()]
+        return (
+            f"{self._metrics.format_report()}\n\n"
+            f"--- 报告缓存 ---\n"
+            f"> 条目 {cache['entries']}, 命中率 {cache['hit_rate']:.1%} "
+            f"(命中 {cache['hits']} / 未命中 {cache['misses']}), 淘汰 {cache['evictions']}\n"
+            f"> 反推会话 {len(self._sessions)} 个\n"
+            f"> 分页待续 {len(self._pager)} 份, 继续查看 {self._pager.continued} 次\n\n"
+            f"--- 线程池 ---\n"
+            f"> 卸载 {pool['offloaded']} 次, 超时 {pool['timeouts']} 次, 排队拒绝 {pool['rejected']} 次, "
+            f"排队用户 {pool['queued_users']} 个\n"
+            f"> 相同请求合并 {flight['coalesced']} 次 (独立计算 {flight['leaders']} 次；只统计线程池中的请求，轻请求的重复查询计入报告缓存命中)\n\n"
+            f"--- 反推观测记录 ---\n{log_line}\n\n"
+            f"--- 能力值查找表 ---\n{table_line}\n\n"
+            f"--- 解析缓存 ---\n" + "\n".join(parser_lines)
+        )
+
+    def _run_batch(self, body: str) -> Report:
+        """解析批量输入的每一行，再整列查表得到全部能力值和精力 (伤害逐行按公式计算)；无法识别的行放在摘要里，对齐的表格作为详细内容"""
+        tables = self._tables
+        lines = parse_batch(body, tables.constants.full_iv, tables.constants.iv_points)
+        if len(lines) > self.BATCH_MAX_LINES:
+            raise ValueError(f"单次最多 {self.BATCH_MAX_LINES} 行，当前 {len(lines)} 行。")
+        stat_rows = [line for line in lines if line.spec]
+        damage_rows = [line for line in lines if line.damage_args]
+        errors = [f"第{line.index}行: {line.error}" for line in lines if line.error]
+
+        # 所有行解析完后一次换算查表下标，能力值和精力两列共用，再整列取值
+        specs = [(line.spec.base, line.spec.personality, line.spec.iv) for line in stat_rows]
+        slots = tables.stat_table.slots_many(specs)
+        stats = tables.stat_table.lookup_many(specs, slots=slots)
+        hps = tables.stat_table.lookup_many(specs, kind="hp", slots=slots)
+        damages = [self._calculate_damage(*line.damage_args) for line in damage_rows]
+
+        summary = [f"--- 批量计算结果 (共 {len(lines)} 行) ---"]
+        if errors:
+            summary.append("\n--- 无法识别的行 ---")
+            summary.extend(errors)
+        report = []
+        if stat_rows:
+            report.append(f"{'#':<3}{'输入':<18}{'能力值':>6}{'精力':>6}")
+            for line, stat, hp in zip(stat_rows, stats, hps):
+                shown = f"{line.label}({line.text})" if line.label else line.text
+                report.append(f"{line.index:<3}{shown:<18}{stat:>6}{hp:>6}")
+        if damage_rows:
+            if report:
+                report.append("")
+            report.append(f"{'#':<3}{'攻击/防御/威力':<18}{'伤害':>6}")
+            for line, damage in zip(damage_rows, damages):
+                shown = "/".join(map(str, line.damage_args))
+                report.append(f"{line.index:<3}{(line.label + ' ' + shown).strip():<18}{damage:>6}")
+        return Report("\n".join(summary), tuple(report))
+
     # --- 指令组：计算器 ---
 
     @filter.command_group("计算器")
@@ -159,6 +942,7 @@ class CalculatorPlugin(Star):
         pass
 
     @calculator.command("精力计算")
+    @instrumented
     async def hp_calculator(self, event: AstrMessageEvent):
         """计算最终的精力（HP）值"""
         try:
@@ -168,17 +952,20 @@ class CalculatorPlugin(Star):
                  return
             params = " ".join(command_parts[2:])
 
-            base_race, has_pers, final_iv = self._parse_stat_input(params)
-            result = self._calculate_hp(base_race, has_pers, final_iv)
+            spec = parse_stat_spec(params, self.INDIVIDUAL_VALUE, self.IV_POINTS)
+            result = self._calculate_hp(spec.base, spec.personality, spec.iv)
             yield event.plain_result(f"基于 '{params}' 计算出的最终精力值为: {result}")
         except ValueError as ve:
+            mark_parse_error()
             logger.warning(f"精力计算格式错误: {ve}")
             yield event.plain_result(f"输入错误: {ve}")
         except Exception as e:
+            mark_error()
             logger.error(f"精力计算出错: {e}")
             yield event.plain_result(f"计算出错，请检查输入格式。")
 
     @calculator.command("能力值计算")
+    @instrumented
     async def stat_calculator(self, event: AstrMessageEvent):
         """计算除精力外的其他五维能力值"""
         try:
@@ -188,25 +975,245 @@ class CalculatorPlugin(Star):
                 return
             params = " ".join(command_parts[2:])
 
-            base_race, has_pers, final_iv = self._parse_stat_input(params)
-            result = self._calculate_stat(base_race, has_pers, final_iv)
+            spec = parse_stat_spec(params, self.INDIVIDUAL_VALUE, self.IV_POINTS)
+            result = self._calculate_stat(spec.base, spec.personality, spec.iv)
             yield event.plain_result(f"基于 '{params}' 计算出的最终能力值为: {result}")
         except ValueError as ve:
+            mark_parse_error()
             logger.warning(f"能力值计算格式错误: {ve}")
             yield event.plain_result(f"输入错误: {ve}")
         except Exception as e:
+            mark_error()
             logger.error(f"能力值计算出错: {e}")
             yield event.plain_result(f"计算出错，请检查输入格式。")
 
     @calculator.command("伤害计算")
+    @instrumented
     async def damage_calculator(self, event: AstrMessageEvent, attack: int, defense: int, skill_power: int):
         try:
             result = self._calculate_damage(attack, defense, skill_power)
             yield event.plain_result(f"攻击 {attack}, 防御 {defense}, 威力 {skill_power} 的最终伤害为: {result}")
         except Exception as e:
+            mark_error()
             logger.error(f"伤害计算出错: {e}")
             yield event.plain_result(f"计算出错，请检查输入。")
 
+    @calculator.command("批量")
+    @instrumented
+    async def batch_calculator(self, event: AstrMessageEvent):
+        """一次计算多行能力值 / 精力 / 伤害"""
+        try:
+            body = event.message_str.split("批量", 1)[1] if "批量" in event.message_str else ""
+            if not body.strip() or body.strip() == "帮助":
+                yield event.plain_result(self._get_batch_help_text())
+                return
+            lines = split_batch_lines(body)
+            cost = 8 * len(lines)  # 每行解析一次、查能力值和精力两次
+            # 合并键逐行规范化，保留分行：同样的内容分行不同就是不同的批量
+            key = ("batch", tuple(normalize(line) for line in lines))
+            report = await self._compute(event.get_sender_id(), key, cost, self._run_batch, body)
+            for page in self._pager.reply(event.get_sender_id(), report):
+                yield event.plain_result(page)
+        except JobRejected as jr:
+            yield event.plain_result(str(jr))
+        except ValueError as ve:
+            mark_parse_error()
+            logger.warning(f"批量计算格式错误: {ve}")
+            yield event.plain_result(f"输入错误: {ve}")
+        except Exception as e:
+            mark_error()
+            logger.error(f"批量计算出错: {e}", exc_info=True)
+            yield event.plain_result(f"计算出错，请检查输入格式。\n\n输入 /计算器 批量 帮助 可查看详细帮助。")
+
+    @calculator.command("速度线")
+    @instrumented
+    async def speed_tiers(self, event: AstrMessageEvent):
+        """比较速度先后手，或查询速度区间内的全部养成"""
+        try:
+            params = event.message_str.split("速度线", 1)[1].strip() if "速度线" in event.message_str else ""
+            if not params or params == "帮助":
+                yield event.plain_result(self._get_speed_help_text())
+                return
+            yield event.plain_result(self._speed_report(params))
+        except ValueError as ve:
+            mark_parse_error()
+            logger.warning(f"速度线参数解析出错: {ve}")
+            yield event.plain_result(f"参数错误: {ve}\n\n输入 /计算器 速度线 帮助 可查看详细帮助。")
+        except Exception as e:
+            mark_error()
+            logger.error(f"速度线计算出错: {e}", exc_info=True)
+            yield event.plain_result(f"计算出错，请检查输入格式。\n\n输入 /计算器 速度线 帮助 可查看详细帮助。")
+
+    @calculator.command("斩杀")
+    @instrumented
+    async def ko_calculator(self, event: AstrMessageEvent):
+        """统计对方全部养成组合下击倒所需的次数"""
+        try:
+            params = event.message_str.split("斩杀", 1)[1].strip() if "斩杀" in event.message_str else ""
+            if not params or params == "帮助":
+                yield event.plain_result(self._get_ko_help_text())
+                return
+            cost = len(self._stat_table.builds) ** 2  # 精力 × 防御的全部养成组合
+            report = await self._compute(event.get_sender_id(), ("ko", normalize(params)), cost, self._ko_report, params)
+            for page in self._pager.reply(event.get_sender_id(), report):
+                yield event.plain_result(page)
+        except JobRejected as jr:
+            yield event.plain_result(str(jr))
+        except ValueError as ve:
+            mark_parse_error()
+            logger.warning(f"斩杀分析参数解析出错: {ve}")
+            yield event.plain_result(f"参数错误: {ve}\n\n输入 /计算器 斩杀 帮助 可查看详细帮助。")
+        except Exception as e:
+            mark_error()
+            logger.error(f"斩杀分析计算出错: {e}", exc_info=True)
+            yield event.plain_result(f"计算出错，请检查输入格式。\n\n输入 /计算器 斩杀 帮助 可查看详细帮助。")
+
+    @calculator.command("对阵")
+    @instrumented
+    async def matchup_table(self, event: AstrMessageEvent):
+        """两队之间的先后手和伤害百分比对阵表，可导出 CSV"""
+        try:
+            body = event.message_str.split("对阵", 1)[1] if "对阵" in event.message_str else ""
+            if not body.strip() or body.strip() == "帮助":
+                yield event.plain_result(self._get_matchup_help_text())
+                return
+            query = parse_matchup(body, self.INDIVIDUAL_VALUE, self.IV_POINTS,
+                                  max_team=self.MATCHUP_MAX_TEAM, max_powers=self.MATCHUP_MAX_POWERS)
+            # 每对宠物、每个威力双向各算一次伤害，每只宠物查四项能力值
+            cost = 2 * len(query.mine) * len(query.theirs) * len(query.powers) + 5 * (len(query.mine) + len(query.theirs))
+            key = ("matchup", query._replace(export=False))
+            report, result = await self._compute(event.get_sender_id(), key, cost, self._matchup_report, query)
+            pages = self._pager.reply(event.get_sender_id(), report)
+            if query.export:
+                # CSV 附在第一页后面，其余页照常发送；生成和写文件都放到线程里，不占用事件循环
+                path = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: self._write_export("对阵表.csv", to_csv(result)))
+                yield event.chain_result([Comp.Plain(next(pages)), Comp.File(name="对阵表.csv", file=path)])
+            for page in pages:
+                yield event.plain_result(page)
+        except JobRejected as jr:
+            yield event.plain_result(str(jr))
+        except ValueError as ve:
+            mark_parse_error()
+            logger.warning(f"对阵表参数解析出错: {ve}")
+            yield event.plain_result(f"参数错误: {ve}\n\n输入 /计算器 对阵 帮助 可查看详细帮助。")
+        except Exception as e:
+            mark_error()
+            logger.error(f"对阵表计算出错: {e}", exc_info=True)
+            yield event.plain_result(f"计算出错，请检查输入格式。\n\n输入 /计算器 对阵 帮助 可查看详细帮助。")
+
+    @calculator.command("最低养成")
+    @instrumented
+    async def build_optimizer(self, event: AstrMessageEvent):
+        """达成先手或击倒目标所需的最低养成"""
+        try:
+            params = event.message_str.split("最低养成", 1)[1].strip() if "最低养成" in event.message_str else ""
+            if not params or params == "帮助":
+                yield event.plain_result(self._get_optimize_help_text())
+                return
+            yield event.plain_result(self._optimize_report(params))
+        except ValueError as ve:
+            mark_parse_error()
+            logger.warning(f"最低养成参数解析出错: {ve}")
+            yield event.plain_result(f"参数错误: {ve}\n\n输入 /计算器 最低养成 帮助 可查看详细帮助。")
+        except Exception as e:
+            mark_error()
+            logger.error(f"最低养成计算出错: {e}", exc_info=True)
+            yield event.plain_result(f"计算出错，请检查输入格式。\n\n输入 /计算器 最低养成 帮助 可查看详细帮助。")
+
+    @calculator.command("常见养成")
+    @instrumented
+    async def common_builds(self, event: AstrMessageEvent):
+        """统计反推记录中某个种族值最常见的养成"""
+        try:
+            params = event.message_str.split("常见养成", 1)[1].strip() if "常见养成" in event.message_str else ""
+            if not params or params == "帮助":
+                yield event.plain_result("用法: /计算器 常见养成 [对方种族值] [防御/攻击/精力]，例如 /计算器 常见养成 80 防御\n"
+                                         "统计的是本机器人在所有群聊和私聊中历次反推推断出的养成 (短时间内重复的相同查询只计一次)，不写类型则三种都列出。")
+                return
+            # 汇总表查询是同步的 SQLite 读取，放到线程里执行
+            yield event.plain_result(await asyncio.get_running_loop().run_in_executor(
+                None, self._common_builds_report, params))
+        except ValueError as ve:
+            mark_parse_error()
+            logger.warning(f"常见养成参数解析出错: {ve}")
+            yield event.plain_result(f"参数错误: {ve}")
+        except Exception as e:
+            mark_error()
+            logger.error(f"常见养成查询出错: {e}", exc_info=True)
+            yield event.plain_result(f"查询出错，请稍后再试。")
+
+    @calculator.command("图鉴")
+    @instrumented
+    async def species_lookup(self, event: AstrMessageEvent):
+        """按名称、前缀或拼音首字母查询宠物种族值"""
+        try:
+            command_parts = event.message_str.split()
+            if len(command_parts) < 3 or command_parts[2] == "帮助":
+                yield event.plain_result(self._get_species_help_text())
+                return
+            index = self._species.index
+            if not len(index):
+                yield event.plain_result("图鉴暂无数据。\n\n" + self._get_species_help_text())
+                return
+            found = index.search(command_parts[2])
+            if not found:
+                yield event.plain_result(f"图鉴中没有找到宠物 '{command_parts[2]}'。")
+                return
+            lines = [f"--- 图鉴查询: {command_parts[2]} ---"]
+            for species in found:
+                stats = " ".join(f"{field}{value}" for field, value in zip(STAT_FIELDS, species.stats))
+                lines.append(f"> {species.name}: {stats} (总和 {sum(species.stats)})")
+            yield event.plain_result("\n".join(lines))
+        except ValueError as ve:
+            mark_parse_error()
+            logger.warning(f"图鉴数据错误: {ve}")
+            yield event.plain_result(f"图鉴数据错误: {ve}")
+        except Exception as e:
+            mark_error()
+            logger.error(f"图鉴查询出错: {e}", exc_info=True)
+            yield event.plain_result(f"查询出错，请稍后再试。")
+
+    @calculator.command("更多")
+    @instrumented
+    async def more_pages(self, event: AstrMessageEvent):
+        """继续发送上一份较长报告中没发完的部分"""
+        try:
+            pages = self._pager.more(event.get_sender_id())
+            if pages is None:
+                yield event.plain_result("没有待继续查看的内容，报告可能已全部发送或已过期。")
+                return
+            for page in pages:
+                yield event.plain_result(page)
+        except Exception as e:
+            mark_error()
+            logger.error(f"继续发送报告出错: {e}", exc_info=True)
+            yield event.plain_result(f"发送出错，请重新查询。")
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @calculator.command("统计")
+    async def metrics_report(self, event: AstrMessageEvent):
+        """(管理员) 查看各指令的调用次数、错误率和延迟"""
+        try:
+            yield event.plain_result(self._stats_report())
+        except Exception as e:
+            logger.error(f"统计报告生成出错: {e}", exc_info=True)
+            yield event.plain_result(f"统计报告生成出错，请查看日志。")
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @calculator.command("重载常数")
+    async def reload_constants(self, event: AstrMessageEvent):
+        """(管理员) 立即重新读取配置中的游戏常数"""
+        try:
+            changed = await self.reload_game_constants()
+            c = self._tables.constants
+            summary = (f"等级 {c.level}, 努力值 {c.effort_value}, 性格倍率 {c.personality_multiplier}, "
+                       f"满个体 {c.full_iv}, 合法个体点数 {','.join(map(str, c.iv_points))}")
+            yield event.plain_result(f"游戏常数已更新: {summary}" if changed else f"游戏常数没有变化: {summary}")
+        except Exception as e:
+            logger.error(f"重载计算器游戏常数出错: {e}", exc_info=True)
+            yield event.plain_result(f"重载出错，请查看日志。")
+
     # --- 指令：反推系列 ---
     
     @filter.command("反推")
@@ -215,6 +1222,7 @@ class CalculatorPlugin(Star):
         yield event.plain_result(self._get_main_reverse_help_text())
 
     @filter.command("精力反推")
+    @instrumented
     async def reverse_hp_analysis(self, event: AstrMessageEvent):
         """根据伤害和掉血百分比反推对方精力养成"""
         try:
@@ -224,92 +1232,52 @@ class CalculatorPlugin(Star):
                 yield event.plain_result(self._get_reverse_hp_help_text())
                 return
 
-            # 解析参数
-            opponent_race, lost_hp_percent, actual_damage = None, None, None
-            
-            # 智能模式解析
-            percent_match = re.search(r'掉血\s*(\d+\.?\d*)\s*%?', params_str)
-            if percent_match:
-                lost_hp_percent = float(percent_match.group(1))
-                params_str = params_str.replace(percent_match.group(0), "", 1)
-            
-            damage_match = re.search(r'伤害\s*(\d+)', params_str)
-            if damage_match:
-                actual_damage = int(damage_match.group(1))
-                params_str = params_str.replace(damage_match.group(0), "", 1)
-            
-            race_match = re.search(r'\d+', params_str)
-            if race_match:
-                opponent_race = int(race_match.group(0))
-
-            # 快速模式解析 (如果智能模式没解析全)
-            if None in [opponent_race, lost_hp_percent, actual_damage]:
-                parts = re.findall(r'\d+\.?\d*', event.message_str.replace("精力反推", "", 1).strip())
-                if len(parts) == 3:
-                    opponent_race = int(parts[0])
-                    lost_hp_percent = float(parts[1])
-                    actual_damage = int(parts[2])
-                else:
-                    raise ValueError("参数不足或格式错误，需要3个数值：种族值、掉血百分比、伤害值。")
-            
-            if lost_hp_percent <= 0:
-                raise ValueError("掉血百分比必须大于0。")
-
-            # --- 核心计算与报告生成 ---
-            estimated_total_hp = math.ceil(actual_damage / (lost_hp_percent / 100))
-            
-            scenarios = [
-                {"name": "完全无养成", "pers": False, "iv": 0},
-                {"name": "无性格+7点个体", "pers": False, "iv": 42},
-                {"name": "无性格+8点个体", "pers": False, "iv": 48},
-                {"name": "无性格+9点个体", "pers": False, "iv": 54},
-                {"name": "无性格+满个体(10点)", "pers": False, "iv": 60},
-                {"name": "仅性格", "pers": True, "iv": 0},
-                {"name": "性格+7点个体", "pers": True, "iv": 42},
-                {"name": "性格+8点个体", "pers": True, "iv": 48},
-                {"name": "性格+9点个体", "pers": True, "iv": 54},
-                {"name": "性格+满个体(10点)", "pers": True, "iv": 60},
-            ]
-            results = []
-            for scenario in scenarios:
-                hp = self._calculate_hp(opponent_race, scenario["pers"], scenario["iv"])
-                results.append({"desc": scenario["name"], "hp": hp})
-            
-            sorted_by_hp = sorted(results, key=lambda x: x['hp'])
-            
-            analysis = "无法准确定位，请检查输入数值是否准确。"
-            if estimated_total_hp < sorted_by_hp[0]['hp']:
-                analysis = f"对方养成水平极低，估算精力({estimated_total_hp})低于最低模拟值({sorted_by_hp[0]['hp']})。"
-            elif estimated_total_hp >= sorted_by_hp[-1]['hp']:
-                analysis = f"对方养成水平极高，估算精力({estimated_total_hp})高于或等于满养成模拟值({sorted_by_hp[-1]['hp']})。"
-            else:
-                for i in range(len(sorted_by_hp) - 1):
-                    if sorted_by_hp[i]['hp'] <= estimated_total_hp < sorted_by_hp[i+1]['hp']:
-                        analysis = f"对方的精力养成情况最可能介于 [{sorted_by_hp[i]['desc']}] 和 [{sorted_by_hp[i+1]['desc']}] 之间。"
-                        break
-            
-            report = (f"--- 精力反推分析 ---\n\n"
-                      f"对方精力种族: {opponent_race}\n"
-                      f"掉血百分比: {lost_hp_percent}%\n"
-                      f"实际伤害: {actual_damage}\n\n"
-                      f"==> 估算总精力: {estimated_total_hp}\n\n"
-                      f"--- 精力模拟 (按从低到高) ---\n")
-            
-            for res in sorted_by_hp:
-                report += f"> {res['desc']:<16} -> 模拟精力: {res['hp']}\n"
-            
-            report += f"\n--- 结论 ---\n您的估算总精力为 {estimated_total_hp}。\n{analysis}"
-            yield event.plain_result(report)
+            query = parse_hp_reverse(self._resolve_species(params_str, "hp"))
+            cost = len(self._stat_table.builds)  # 模拟全部精力养成
+            report = await self._compute(event.get_sender_id(), ("hp", query), cost, self._hp_reverse_report, query)
+            for page in self._pager.reply(event.get_sender_id(), report):
+                yield event.plain_result(page)
 
+        except JobRejected as jr:
+            yield event.plain_result(str(jr))
         except ValueError as ve:
+            mark_parse_error()
             logger.warning(f"精力反推参数解析出错: {ve}")
             yield event.plain_result(f"参数错误: {ve}\n\n输入 /精力反推 帮助 可查看详细帮助。")
         except Exception as e:
+            mark_error()
             logger.error(f"精力反推计算出错: {e}", exc_info=True)
             yield event.plain_result(f"计算出错，请检查您的输入格式是否正确。\n\n输入 /精力反推 帮助 可查看详细帮助。")
 
 
+    @filter.command("联合反推")
+    @instrumented
+    async def reverse_joint_analysis(self, event: AstrMessageEvent):
+        """根据掉血百分比同时反推对方的精力和防御养成"""
+        try:
+            params_str = event.message_str.replace("联合反推", "", 1).strip()
+
+            if not params_str or params_str.lower() == "帮助":
+                yield event.plain_result(self._get_joint_reverse_help_text())
+                return
+
+            params_str, modifiers = extract_damage_modifiers(params_str)
+            query = parse_joint(self._resolve_species(params_str, "joint"), self.INDIVIDUAL_VALUE, self.IV_POINTS)
+            session_key = (event.get_sender_id(), "defense", query.defense_race)
+            for page in self._pager.reply(event.get_sender_id(), self._joint_report(query, modifiers, session_key)):
+                yield event.plain_result(page)
+
+        except ValueError as ve:
+            mark_parse_error()
+            logger.warning(f"联合反推参数解析出错: {ve}")
+            yield event.plain_result(f"参数错误: {ve}\n\n输入 /联合反推 帮助 可查看详细帮助。")
+        except Exception as e:
+            mark_error()
+            logger.error(f"联合反推计算出错: {e}", exc_info=True)
+            yield event.plain_result(f"计算出错，请检查您的输入格式是否正确。\n\n输入 /联合反推 帮助 可查看详细帮助。")
+
     @filter.command("反推防御")
+    @instrumented
     async def reverse_analysis(self, event: AstrMessageEvent):
         """
         根据战斗伤害反推对方的防御养成情况。支持智能模式和快速模式。
@@ -321,119 +1289,35 @@ class CalculatorPlugin(Star):
                 yield event.plain_result(self._get_reverse_help_text())
                 return
 
-            parts = params_str_full.split()
-            intelligent_mode_markers = ['+', '我方', '对方', '威力', '伤害', '性格', '个体']
-            contains_markers = any(marker in params_str_full for marker in intelligent_mode_markers)
-            is_quick_mode = len(parts) == 4 and not contains_markers
-
-            player_input_str, opponent_race_str, skill_power, actual_damage = "", "", 0, 0
-            my_base_race, my_has_pers, my_final_iv, opponent_race = 0, False, 0, 0
-            
-            if is_quick_mode:
-                player_input_str, opponent_race_str, skill_power, actual_damage = parts[0], parts[1], int(parts[2]), int(parts[3])
-                my_base_race, my_has_pers, my_final_iv = self._parse_quick_mode_attacker(player_input_str)
-                opponent_race = int(opponent_race_str)
-            else: # 智能模式
-                fixed_pattern = r"(威力|伤害)\s*(\d+)|(\d+)\s*(威力|伤害)"
-                fixed_matches = re.findall(fixed_pattern, params_str_full)
-                
-                params = {}
-                remaining_str = params_str_full
-                for key1, val1, val2, key2 in fixed_matches:
-                    key = key1 or key2
-                    val = int(val1 or val2)
-                    params[key] = val
-                    remaining_str = re.sub(fr"{key}\s*{val}|{val}\s*{key}", "", remaining_str, 1)
-
-                if "威力" not in params or "伤害" not in params:
-                    yield event.plain_result("缺少【威力】或【伤害】参数。\n\n输入 /反推防御 帮助 可查看详细帮助。")
-                    return
-                skill_power, actual_damage = params["威力"], params["伤害"]
-
-                stat_pattern = r"((?:我方|对方)?\s*\d+(?:\s*\+\s*性格|\s*\+\s*个体(?:\d+)?)?)"
-                stat_blocks = [s.strip() for s in re.findall(stat_pattern, remaining_str) if s.strip()]
-                
-                if len(stat_blocks) != 2:
-                    yield event.plain_result("输入错误：未能识别出我方和对方的种族值信息。请确保提供了两个数值（例如 '我方186+性格' 和 '对方80'，或 '186 80'）。\n\n输入 /反推防御 帮助 可查看详细帮助。")
-                    return
-                
-                b1, b2 = stat_blocks[0], stat_blocks[1]
-                
-                def get_block_type(block_str):
-                    if any(kw in block_str for kw in ['我方', '性格', '个体']): return 'player'
-                    if '对方' in block_str: return 'opponent'
-                    return 'neutral'
-
-                type1, type2 = get_block_type(b1), get_block_type(b2)
-
-                if type1 == 'player' and type2 == 'opponent': player_input_str, opponent_race_str = b1, b2
-                elif type1 == 'opponent' and type2 == 'player': player_input_str, opponent_race_str = b2, b1
-                elif type1 == 'player' and type2 == 'neutral': player_input_str, opponent_race_str = b1, b2
-                elif type1 == 'neutral' and type2 == 'player': player_input_str, opponent_race_str = b2, b1
-                elif type1 == 'opponent' and type2 == 'neutral': player_input_str, opponent_race_str = b2, b1
-                elif type1 == 'neutral' and type2 == 'opponent': player_input_str, opponent_race_str = b1, b2
-                elif type1 == 'neutral' and type2 == 'neutral':
-                    if params_str_full.find(b1) < params_str_full.find(b2): player_input_str, opponent_race_str = b1, b2
-                    else: player_input_str, opponent_race_str = b2, b1
-                else:
-                    yield event.plain_result("输入冲突：无法明确区分我方和对方。请检查您的输入，例如 '我方186+性格' 和 '对方80'。")
-                    return
-                
-                opponent_race = int(re.search(r"\d+", opponent_race_str).group(0))
-                my_base_race, my_has_pers, my_final_iv = self._parse_stat_input(player_input_str)
-
-            my_attack = self._calculate_stat(my_base_race, my_has_pers, my_final_iv)
-            
-            scenarios = [
-                {"name": "完全无养成", "pers": False, "iv": 0},
-                {"name": "无性格+7点个体", "pers": False, "iv": 42},
-                {"name": "无性格+8点个体", "pers": False, "iv": 48},
-                {"name": "无性格+9点个体", "pers": False, "iv": 54},
-                {"name": "无性格+满个体(10点)", "pers": False, "iv": 60},
-                {"name": "仅性格", "pers": True, "iv": 0},
-                {"name": "性格+7点个体", "pers": True, "iv": 42},
-                {"name": "性格+8点个体", "pers": True, "iv": 48},
-                {"name": "性格+9点个体", "pers": True, "iv": 54},
-                {"name": "性格+满个体(10点)", "pers": True, "iv": 60},
-            ]
-            results = []
-            for scenario in scenarios:
-                defense = self._calculate_stat(opponent_race, scenario["pers"], scenario["iv"])
-                damage = self._calculate_damage(my_attack, defense, skill_power)
-                results.append({"desc": scenario["name"], "def": defense, "dmg": damage})
-            
-            sorted_by_dmg = sorted(results, key=lambda x: x['dmg'], reverse=True)
-            
-            analysis = "无法准确定位，请检查伤害值是否准确。"
-            if actual_damage > sorted_by_dmg[0]['dmg']: analysis = "对方可能完全没有养成，或养成水平极低。"
-            elif actual_damage <= sorted_by_dmg[-1]['dmg']: analysis = "对方养成水平极高，伤害已低于或等于满养成模拟值。"
-            else:
-                for i in range(len(sorted_by_dmg) - 1):
-                    if sorted_by_dmg[i]['dmg'] >= actual_damage > sorted_by_dmg[i+1]['dmg']:
-                        analysis = f"对方的养成情况最可能介于 [{sorted_by_dmg[i]['desc']}] 和 [{sorted_by_dmg[i+1]['desc']}] 之间。"
-                        break
-            
-            report = (f"--- 伤害反推(防御)分析 ---\n\n"
-                      f"我方攻击: {my_attack} (基于 {player_input_str.strip()})\n"
-                      f"对方防御种族: {opponent_race}\n"
-                      f"技能威力: {skill_power}\n"
-                      f"实际造成伤害: {actual_damage}\n\n"
-                      f"--- 伤害模拟 (按对方防御从低到高) ---\n")
-            
-            for res in sorted(results, key=lambda x: x['def']):
-                report += f"> {res['desc']:<16} (防御: {res['def']}) -> 预计伤害: {res['dmg']}\n"
-            
-            report += f"\n--- 结论 ---\n您造成的实际伤害为 {actual_damage}。\n{analysis}"
-            yield event.plain_result(report)
+            params_str, modifiers = extract_damage_modifiers(params_str_full)
+            query = parse_reverse(self._resolve_species(params_str, "defense"), self.INDIVIDUAL_VALUE, self.IV_POINTS)
+            player = query.player
+            my_attack = self._calculate_stat(player.base, player.personality, player.iv)
+            session_key = (event.get_sender_id(), "defense", query.opponent_race)
+            # 每次观测都要匹配并模拟全部养成，再生成对应的结论，默认 10 种养成时每次观测约 40
+            cost = 4 * len(query.observations) * len(self._stat_table.builds)
+            args = ("defense", my_attack, query.player_text, query.opponent_race, list(query.observations), session_key, query.append,
+                    modifiers)
+            # "追加" 依赖各自的会话，只与同一会话的相同请求合并，合并到的结果已经更新过这个会话，不用重放
+            key = ("reverse", *args[:4], query.observations, modifiers, session_key if query.append else None)
+            report = await self._compute(event.get_sender_id(), key, cost, self._reverse_report, *args,
+                                         replay=not query.append)
+            for page in self._pager.reply(event.get_sender_id(), report):
+                yield event.plain_result(page)
 
+        except JobRejected as jr:
+            yield event.plain_result(str(jr))
         except ValueError as ve:
+            mark_parse_error()
             logger.warning(f"反推防御参数解析出错: {ve}")
             yield event.plain_result(f"参数错误: {ve}\n\n输入 /反推防御 帮助 可查看详细帮助。")
         except Exception as e:
+            mark_error()
             logger.error(f"反推防御计算出错: {e}", exc_info=True)
             yield event.plain_result(f"计算出错，请检查您的输入格式是否正确。\n\n输入 /反推防御 帮助 可查看详细帮助。")
 
     @filter.command("反推攻击")
+    @instrumented
     async def reverse_attack_analysis(self, event: AstrMessageEvent):
         """
         根据受到的战斗伤害反推对方的攻击养成情况。支持智能模式和快速模式。
@@ -445,115 +1329,29 @@ class CalculatorPlugin(Star):
                 yield event.plain_result(self._get_reverse_attack_help_text())
                 return
 
-            parts = params_str_full.split()
-            intelligent_mode_markers = ['+', '我方', '对方', '威力', '伤害', '性格', '个体']
-            contains_markers = any(marker in params_str_full for marker in intelligent_mode_markers)
-            is_quick_mode = len(parts) == 4 and not contains_markers
-
-            player_input_str, opponent_race_str, skill_power, actual_damage = "", "", 0, 0
-            my_base_race, my_has_pers, my_final_iv, opponent_race = 0, False, 0, 0
-            
-            if is_quick_mode:
-                player_input_str, opponent_race_str, skill_power, actual_damage = parts[0], parts[1], int(parts[2]), int(parts[3])
-                my_base_race, my_has_pers, my_final_iv = self._parse_quick_mode_attacker(player_input_str)
-                opponent_race = int(opponent_race_str)
-            else: # 智能模式
-                fixed_pattern = r"(威力|伤害)\s*(\d+)|(\d+)\s*(威力|伤害)"
-                fixed_matches = re.findall(fixed_pattern, params_str_full)
-                
-                params = {}
-                remaining_str = params_str_full
-                for key1, val1, val2, key2 in fixed_matches:
-                    key = key1 or key2
-                    val = int(val1 or val2)
-                    params[key] = val
-                    remaining_str = re.sub(fr"{key}\s*{val}|{val}\s*{key}", "", remaining_str, 1)
-
-                if "威力" not in params or "伤害" not in params:
-                    yield event.plain_result("缺少【威力】或【伤害】参数。\n\n输入 /反推攻击 帮助 可查看详细帮助。")
-                    return
-                
-                skill_power, actual_damage = params["威力"], params["伤害"]
-
-                stat_pattern = r"((?:我方|对方)?\s*\d+(?:\s*\+\s*性格|\s*\+\s*个体(?:\d+)?)?)"
-                stat_blocks = [s.strip() for s in re.findall(stat_pattern, remaining_str) if s.strip()]
-                
-                if len(stat_blocks) != 2:
-                    yield event.plain_result("输入错误：未能识别出我方和对方的种族值信息。请确保提供了两个数值（例如 '我方100+性格' 和 '对方186'，或 '100 186'）。\n\n输入 /反推攻击 帮助 可查看详细帮助。")
-                    return
-
-                b1, b2 = stat_blocks[0], stat_blocks[1]
-
-                def get_block_type(block_str):
-                    if any(kw in block_str for kw in ['我方', '性格', '个体']): return 'player'
-                    if '对方' in block_str: return 'opponent'
-                    return 'neutral'
-
-                type1, type2 = get_block_type(b1), get_block_type(b2)
-
-                if type1 == 'player' and type2 == 'opponent': player_input_str, opponent_race_str = b1, b2
-                elif type1 == 'opponent' and type2 == 'player': player_input_str, opponent_race_str = b2, b1
-                elif type1 == 'player' and type2 == 'neutral': player_input_str, opponent_race_str = b1, b2
-                elif type1 == 'neutral' and type2 == 'player': player_input_str, opponent_race_str = b2, b1
-                elif type1 == 'opponent' and type2 == 'neutral': player_input_str, opponent_race_str = b2, b1
-                elif type1 == 'neutral' and type2 == 'opponent': player_input_str, opponent_race_str = b1, b2
-                elif type1 == 'neutral' and type2 == 'neutral':
-                    if params_str_full.find(b1) < params_str_full.find(b2): player_input_str, opponent_race_str = b1, b2
-                    else: player_input_str, opponent_race_str = b2, b1
-                else:
-                    yield event.plain_result("输入冲突：无法明确区分我方和对方。请检查您的输入，例如 '我方100+性格' 和 '对方186'。")
-                    return
-                
-                opponent_race = int(re.search(r"\d+", opponent_race_str).group(0))
-                my_base_race, my_has_pers, my_final_iv = self._parse_stat_input(player_input_str)
-
-            my_defense = self._calculate_stat(my_base_race, my_has_pers, my_final_iv)
-            
-            scenarios = [
-                {"name": "完全无养成", "pers": False, "iv": 0},
-                {"name": "无性格+7点个体", "pers": False, "iv": 42},
-                {"name": "无性格+8点个体", "pers": False, "iv": 48},
-                {"name": "无性格+9点个体", "pers": False, "iv": 54},
-                {"name": "无性格+满个体(10点)", "pers": False, "iv": 60},
-                {"name": "仅性格", "pers": True, "iv": 0},
-                {"name": "性格+7点个体", "pers": True, "iv": 42},
-                {"name": "性格+8点个体", "pers": True, "iv": 48},
-                {"name": "性格+9点个体", "pers": True, "iv": 54},
-                {"name": "性格+满个体(10点)", "pers": True, "iv": 60},
-            ]
-            results = []
-            for scenario in scenarios:
-                opponent_attack = self._calculate_stat(opponent_race, scenario["pers"], scenario["iv"])
-                damage = self._calculate_damage(opponent_attack, my_defense, skill_power)
-                results.append({"desc": scenario["name"], "atk": opponent_attack, "dmg": damage})
-            
-            sorted_by_dmg = sorted(results, key=lambda x: x['dmg'])
-            
-            analysis = "无法准确定位，请检查伤害值是否准确。"
-            if actual_damage < sorted_by_dmg[0]['dmg']: analysis = "对方可能完全没有养成，或养成水平极低。"
-            elif actual_damage >= sorted_by_dmg[-1]['dmg']: analysis = "对方养成水平极高，伤害已高于或等于满养成模拟值。"
-            else:
-                for i in range(len(sorted_by_dmg) - 1):
-                    if sorted_by_dmg[i]['dmg'] <= actual_damage < sorted_by_dmg[i+1]['dmg']:
-                        analysis = f"对方的养成情况最可能介于 [{sorted_by_dmg[i]['desc']}] 和 [{sorted_by_dmg[i+1]['desc']}] 之间。"
-                        break
-            
-            report = (f"--- 伤害反推(攻击)分析 ---\n\n"
-                      f"我方防御: {my_defense} (基于 {player_input_str.strip()})\n"
-                      f"对方攻击种族: {opponent_race}\n"
-                      f"技能威力: {skill_power}\n"
-                      f"实际受到伤害: {actual_damage}\n\n"
-                      f"--- 伤害模拟 (按对方攻击从低到高) ---\n")
-            
-            for res in sorted(results, key=lambda x: x['atk']):
-                report += f"> {res['desc']:<16} (攻击: {res['atk']}) -> 预计伤害: {res['dmg']}\n"
-            
-            report += f"\n--- 结论 ---\n您受到的实际伤害为 {actual_damage}。\n{analysis}"
-            yield event.plain_result(report)
+            params_str, modifiers = extract_damage_modifiers(params_str_full)
+            query = parse_reverse(self._resolve_species(params_str, "attack"), self.INDIVIDUAL_VALUE, self.IV_POINTS)
+            player = query.player
+            my_defense = self._calculate_stat(player.base, player.personality, player.iv)
+            session_key = (event.get_sender_id(), "attack", query.opponent_race)
+            # 每次观测都要匹配并模拟全部养成，再生成对应的结论，默认 10 种养成时每次观测约 40
+            cost = 4 * len(query.observations) * len(self._stat_table.builds)
+            args = ("attack", my_defense, query.player_text, query.opponent_race, list(query.observations), session_key, query.append,
+                    modifiers)
+            # "追加" 依赖各自的会话，只与同一会话的相同请求合并，合并到的结果已经更新过这个会话，不用重放
+            key = ("reverse", *args[:4], query.observations, modifiers, session_key if query.append else None)
+            report = await self._compute(event.get_sender_id(), key, cost, self._reverse_report, *args,
+                                         replay=not query.append)
+            for page in self._pager.reply(event.get_sender_id(), report):
+                yield event.plain_result(page)
 
+        except JobRejected as jr:
+            yield event.plain_result(str(jr))
         except ValueError as ve:
+            mark_parse_error()
             logger.warning(f"反推攻击参数解析出错: {ve}")
             yield event.plain_result(f"参数错误: {ve}\n\n输入 /反推攻击 帮助 可查看详细帮助。")
         except Exception as e:
+            mark_error()
             logger.error(f"反推攻击计算出错: {e}", exc_info=True)
             yield event.plain_result(f"计算出错，请检查您的输入格式是否正确。\n\n输入 /反推攻击 帮助 可查看详细帮助。")
\ No newline at end of file
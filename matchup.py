@@ -0,0 +1,80 @@
+# 洛克王国数值计算器 —— 对阵表
+# 两队宠物 × 技能威力的伤害、掉血百分比和先后手一次算完。
+# 每只宠物的能力值只查一次表；伤害只取决于 (攻击, 防御)，相同攻防组合的一整列威力只算一次。
+
+import csv
+import io
+from typing import Callable, NamedTuple, Sequence
+
+from .species import STAT_FIELDS
+from .stat_engine import StatTable
+
+
+class Combatant(NamedTuple):
+    """参与对阵的一只宠物的最终能力值"""
+    label: str
+    hp: int
+    attack: int
+    defense: int
+    speed: int
+
+
+class Matchup(NamedTuple):
+    """
+    对阵结果。dealt[i][j] 为我方 i 打对方 j、taken[i][j] 为对方 j 打我方 i 时各威力的伤害；
+    order[i][j] 为 1 表示我方 i 先手，0 同速，-1 对方 j 先手。
+    """
+    mine: list[Combatant]
+    theirs: list[Combatant]
+    powers: tuple[int, ...]
+    dealt: list[list[tuple[int, ...]]]
+    taken: list[list[tuple[int, ...]]]
+    order: list[list[int]]
+
+
+def build_combatant(table: StatTable, label: str, base_stats: Sequence[int], personality: str | None, iv: int,
+                    attack_field: str, defense_field: str) -> Combatant:
+    """personality 为性格加成的能力项，"" 表示加在 attack_field 上，None 表示无性格"""
+    def value(field: str) -> int:
+        pers = personality == field or (personality == "" and field == attack_field)
+        base = base_stats[STAT_FIELDS.index(field)]
+        return table.hp(base, pers, iv) if field == "精力" else table.stat(base, pers, iv)
+    return Combatant(label, value("精力"), value(attack_field), value(defense_field), value("速度"))
+
+
+def matchup(mine: list[Combatant], theirs: list[Combatant], powers: tuple[int, ...],
+            damage_fn: Callable[[int, int, int], int]) -> Matchup:
+    columns: dict[tuple[int, int], tuple[int, ...]] = {}
+
+    def damages(attack: int, defense: int) -> tuple[int, ...]:
+        column = columns.get((attack, defense))
+        if column is None:
+            column = columns[attack, defense] = tuple(damage_fn(attack, defense, power) for power in powers)
+        return column
+
+    dealt = [[damages(a.attack, d.defense) for d in theirs] for a in mine]
+    taken = [[damages(d.attack, a.defense) for d in theirs] for a in mine]
+    order = [[(a.speed > d.speed) - (a.speed < d.speed) for d in theirs] for a in mine]
+    return Matchup(mine, theirs, powers, dealt, taken, order)
+
+
+def percent(damage: int, hp: int) -> int:
+    """伤害占对方精力的百分比，四舍五入到整数"""
+    return round(damage * 100 / hp) if hp > 0 else 0
+
+
+def to_csv(result: Matchup) -> str:
+    """每行一个 (出手方, 被打方, 威力) 组合，便于在表格软件里筛选"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["出手方", "出手宠物", "被打宠物", "威力", "伤害", "掉血百分比", "先后手"])
+    order_names = {1: "我方先手", 0: "同速", -1: "对方先手"}
+    for i, mine in enumerate(result.mine):
+        for j, theirs in enumerate(result.theirs):
+            order = order_names[result.order[i][j]]
+            for k, power in enumerate(result.powers):
+                writer.writerow(["我方", mine.label, theirs.label, power, result.dealt[i][j][k],
+                                 percent(result.dealt[i][j][k], theirs.hp), order])
+                writer.writerow(["对方", theirs.label, mine.label, power, result.taken[i][j][k],
+                                 percent(result.taken[i][j][k], mine.hp), order])
+    return buffer.getvalue()
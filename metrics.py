@@ -0,0 +1,156 @@
+# 洛克王国数值计算器 —— 指令统计
+# 为每条指令记录调用次数、参数错误率和延迟分布。延迟与时间戳存放在定长环形缓冲区，
+# 直方图桶数固定，长时间运行也不会无限增长。
+
+import functools
+import time
+from array import array
+from bisect import bisect_right
+from contextvars import ContextVar
+
+# 延迟直方图的桶上界 (微秒)，最后一个桶收纳更慢的调用
+HISTOGRAM_BOUNDS_US = (10, 25, 50, 100, 250, 500, 1000, 2500, 10000, 100000)
+
+# 直方图各桶在报告中的名称
+_BUCKET_LABELS = tuple(f"≤{b / 1000:g}ms" if b >= 1000 else f"≤{b}us" for b in HISTOGRAM_BOUNDS_US) + (
+    f">{HISTOGRAM_BOUNDS_US[-1] / 1000:g}ms",)
+
+# 当前正在执行的指令的统计对象，供处理函数标记参数错误
+_current_call: ContextVar["CommandStats | None"] = ContextVar("calculator_current_call", default=None)
+
+
+class CommandStats:
+    """单条指令的统计：计数器 + 延迟 / 时间戳环形缓冲区 + 定长直方图"""
+
+    def __init__(self, ring_size: int):
+        self.calls = 0
+        self.parse_errors = 0
+        self.errors = 0
+        self.latencies = array("d", bytes(8 * ring_size))
+        self.timestamps = array("d", bytes(8 * ring_size))
+        self.histogram = array("q", bytes(8 * (len(HISTOGRAM_BOUNDS_US) + 1)))
+        self._ring_size = ring_size
+
+    def record(self, elapsed: float, now: float):
+        slot = self.calls % self._ring_size
+        self.latencies[slot] = elapsed
+        self.timestamps[slot] = now
+        self.histogram[bisect_right(HISTOGRAM_BOUNDS_US, elapsed * 1e6)] += 1
+        self.calls += 1
+
+    def format_histogram(self) -> str:
+        """自启动以来的延迟分布，省略没有调用的桶"""
+        return " | ".join(f"{label} {count}" for label, count in zip(_BUCKET_LABELS, self.histogram) if count)
+
+    def summary(self) -> dict[str, float]:
+        count = min(self.calls, self._ring_size)
+        recent = sorted(self.latencies[:count])
+        if count:
+            newest = self.timestamps[(self.calls - 1) % self._ring_size]
+            oldest = self.timestamps[self.calls % self._ring_size if self.calls > self._ring_size else 0]
+            span = newest - oldest
+        else:
+            span = 0.0
+        return {
+            "calls": self.calls,
+            "parse_errors": self.parse_errors,
+            "errors": self.errors,
+            "parse_error_rate": self.parse_errors / self.calls if self.calls else 0.0,
+            "p50_us": recent[count // 2] * 1e6 if count else 0.0,
+            "p99_us": recent[min(count - 1, int(count * 0.99))] * 1e6 if count else 0.0,
+            "max_us": recent[-1] * 1e6 if count else 0.0,
+            "recent_rate": (count - 1) / span if span > 0 else 0.0,
+        }
+
+
+class MetricsRegistry:
+    """全部指令的统计表"""
+
+    def __init__(self, ring_size: int = 512, enabled: bool = True):
+        self.ring_size = ring_size
+        self.enabled = enabled
+        self.started_at = time.monotonic()
+        self._commands: dict[str, CommandStats] = {}
+
+    def get(self, name: str) -> CommandStats:
+        stats = self._commands.get(name)
+        if stats is None:
+            stats = self._commands[name] = CommandStats(self.ring_size)
+        return stats
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {name: stats.summary() for name, stats in self._commands.items()}
+
+    def format_report(self) -> str:
+        uptime = time.monotonic() - self.started_at
+        lines = [f"--- 计算器指令统计 (运行 {uptime / 3600:.1f} 小时) ---"]
+        if not self.enabled:
+            lines.append("指令统计未开启。")
+        elif not self._commands:
+            lines.append("暂无调用记录。")
+        for name, s in sorted(self.snapshot().items(), key=lambda x: -x[1]["calls"]):
+            lines.append(f"> {name}: {s['calls']} 次, 参数错误 {s['parse_error_rate']:.1%}, 异常 {s['errors']}, "
+                         f"p50 {s['p50_us']:.0f}us, p99 {s['p99_us']:.0f}us, 最近 {s['recent_rate']:.2f} 次/秒")
+            lines.append(f"  延迟分布: {self._commands[name].format_histogram()}")
+        return "\n".join(lines)
+
+
+def mark_parse_error():
+    """在处理函数的参数错误分支里调用，计入当前指令的参数错误次数"""
+    stats = _current_call.get()
+    if stats is not None:
+        stats.parse_errors += 1
+
+
+def mark_error():
+    """在处理函数捕获意外异常的分支里调用，计入当前指令的异常次数"""
+    stats = _current_call.get()
+    if stats is not None:
+        stats.errors += 1
+
+
+def instrumented(handler):
+    """
+    包装异步生成器指令处理函数，只统计处理函数自身执行的时间
+    (每次 __anext__ 的耗时之和)，不包含框架发送消息的时间。统计关闭时只做转发。
+    """
+    name = handler.__name__
+
+    @functools.wraps(handler)
+    async def wrapper(self, *args, **kwargs):
+        metrics = self._metrics
+        generator = handler(self, *args, **kwargs)
+        if not metrics.enabled:
+            async for result in generator:
+                yield result
+            return
+        stats = metrics.get(name)
+        anext = generator.__anext__
+        clock = time.perf_counter
+        elapsed = 0.0
+        # 整次调用只设置一次 _current_call，结束时清空而不用 token 重置：
+        # 生成器被提前关闭时可能在另一个上下文中收尾，reset 会失败，set 不会
+        _current_call.set(stats)
+        try:
+            while True:
+                start = clock()
+                try:
+                    result = await anext()
+                except StopAsyncIteration:
+                    elapsed += clock() - start
+                    break
+                elapsed += clock() - start
+                try:
+                    yield result
+                except GeneratorExit:
+                    await generator.aclose()
+                    raise
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            _current_call.set(None)
+            # 时间戳只用于计算最近的调用频率，与计时共用一个时钟
+            stats.record(elapsed, clock())
+
+    return wrapper
@@ -0,0 +1,143 @@
+# 洛克王国数值计算器 —— 观测记录
+# 把每次反推的观测和推断出的养成写进 SQLite (WAL 模式)，用来统计某个种族值最常见的养成。
+# 请求线程只把记录追加到内存队列，不唤醒写入线程；后台线程按间隔 (或攒够一批时) 取走写入。
+# 常见养成从按 (类型, 种族值) 维护的汇总表读取，不扫描明细。
+
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import NamedTuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    base INTEGER NOT NULL,
+    my_stat INTEGER,
+    skill_power INTEGER,
+    damage INTEGER NOT NULL,
+    lost_hp_percent REAL,
+    stat_low INTEGER,
+    stat_high INTEGER,
+    builds TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_observations_kind_base ON observations (kind, base, created_at);
+CREATE TABLE IF NOT EXISTS build_rollup (
+    kind TEXT NOT NULL,
+    base INTEGER NOT NULL,
+    personality INTEGER NOT NULL,
+    iv INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (kind, base, personality, iv)
+) WITHOUT ROWID;
+"""
+
+_INSERT_OBSERVATION = """
+INSERT INTO observations (created_at, kind, base, my_stat, skill_power, damage, lost_hp_percent, stat_low, stat_high, builds)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_UPSERT_ROLLUP = """
+INSERT INTO build_rollup (kind, base, personality, iv, count) VALUES (?, ?, ?, ?, 1)
+ON CONFLICT (kind, base, personality, iv) DO UPDATE SET count = count + 1
+"""
+
+
+class Observation(NamedTuple):
+    """一次反推：kind 为 defense / attack / hp，builds 为推断出的养成，counted 为真时计入常见养成汇总"""
+    kind: str
+    base: int
+    damage: int
+    builds: tuple[tuple[bool, int], ...]
+    my_stat: int | None = None
+    skill_power: int | None = None
+    lost_hp_percent: float | None = None
+    stat_range: tuple[int, int] | None = None
+    counted: bool = True
+
+
+class ObservationLog:
+    """SQLite 观测记录，写入由后台线程批量完成"""
+
+    def __init__(self, path: Path, batch_size: int = 200, flush_interval: float = 2.0, max_pending: int = 10000):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.written = 0
+        self.dropped = 0
+        # deque 的 append / popleft 本身是线程安全的，请求路径上不需要加锁
+        self._pending: deque[tuple[float, Observation]] = deque()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._read_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self._reader = self._connect()
+        self._writer = threading.Thread(target=self._write_loop, name="roco-calculator-log", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def record(self, observation: Observation):
+        """追加到待写入队列后立即返回，只有攒够一批时才唤醒写入线程；积压过多时丢弃并计数，不阻塞请求"""
+        pending = self._pending
+        if len(pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        pending.append((time.time(), observation))
+        if len(pending) == self.batch_size:
+            self._wakeup.set()
+
+    def _write_loop(self):
+        conn = self._connect()
+        try:
+            while True:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                # 先读停止标志再写：close() 之前放进队列的记录都会被写完
+                stopping = self._stopping
+                pending = self._pending
+                while pending:
+                    batch = [pending.popleft() for _ in range(min(self.batch_size, len(pending)))]
+                    self._write_batch(conn, batch)
+                if stopping:
+                    return
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: list[tuple[float, Observation]]):
+        rows, rollup = [], []
+        for created_at, o in batch:
+            low, high = o.stat_range if o.stat_range else (None, None)
+            builds = ",".join(f"{int(pers)}:{iv}" for pers, iv in o.builds)
+            rows.append((created_at, o.kind, o.base, o.my_stat, o.skill_power, o.damage, o.lost_hp_percent, low, high, builds))
+            if o.counted:
+                rollup.extend((o.kind, o.base, int(pers), iv) for pers, iv in o.builds)
+        with conn:
+            conn.executemany(_INSERT_OBSERVATION, rows)
+            conn.executemany(_UPSERT_ROLLUP, rollup)
+        self.written += len(rows)
+
+    def top_builds(self, kind: str, base: int, limit: int = 5) -> list[tuple[tuple[bool, int], int]]:
+        """某个种族值最常见的养成 [((性格, 个体), 次数)]，走汇总表主键"""
+        with self._read_lock:
+            cursor = self._reader.execute(
+                "SELECT personality, iv, count FROM build_rollup WHERE kind = ? AND base = ? ORDER BY count DESC LIMIT ?",
+                (kind, base, limit))
+            return [((bool(pers), iv), count) for pers, iv, count in cursor.fetchall()]
+
+    def close(self):
+        """写完队列中剩余的记录后关闭"""
+        self._stopping = True
+        self._wakeup.set()
+        self._writer.join(timeout=10)
+        with self._read_lock:
+            self._reader.close()
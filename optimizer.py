@@ -0,0 +1,43 @@
+# 洛克王国数值计算器 —— 最低养成
+# 先把目标 (先手某个速度、保证 N 次击倒) 换算成所需的最低能力值，
+# 再在每种性格下对个体总值二分：能力值随个体单调不减，个体档位再细也只需 O(log n) 次查表。
+
+from bisect import bisect_left
+from typing import Callable, NamedTuple
+
+from .stat_engine import StatTable
+
+# 攻击值二分的上界，远高于游戏内可能出现的数值
+_ATTACK_SEARCH_MAX = 1 << 20
+
+
+class BuildOption(NamedTuple):
+    """某种性格下满足目标的最低个体；iv 为 None 表示该性格下满个体也达不到"""
+    personality: bool
+    iv: int | None
+    value: int  # 达到目标时的能力值；达不到时为满个体的能力值
+
+
+def min_attack_for_damage(defense: int, skill_power: int, damage: int,
+                          damage_fn: Callable[[int, int, int], int]) -> int | None:
+    """伤害随攻击单调不减，二分出 damage_fn(攻击, defense, skill_power) >= damage 的最低攻击"""
+    attack = bisect_left(range(_ATTACK_SEARCH_MAX), True, key=lambda a: damage_fn(a, defense, skill_power) >= damage)
+    return attack if attack < _ATTACK_SEARCH_MAX else None
+
+
+def cheapest_builds(table: StatTable, base_race_value: int, threshold: int, kind: str = "stat") -> list[BuildOption]:
+    """
+    按养成成本 (先无性格、后有性格) 列出每种性格下能力值 >= threshold 的最低个体。
+    个体总值取 table.iv_totals，按升序二分。
+    """
+    calc = table.hp if kind == "hp" else table.stat
+    iv_totals = sorted(table.iv_totals)
+    options = []
+    for personality in (False, True):
+        index = bisect_left(iv_totals, True, key=lambda iv: calc(base_race_value, personality, iv) >= threshold)
+        if index < len(iv_totals):
+            iv = iv_totals[index]
+            options.append(BuildOption(personality, iv, calc(base_race_value, personality, iv)))
+        else:
+            options.append(BuildOption(personality, None, calc(base_race_value, personality, iv_totals[-1])))
+    return options
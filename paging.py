@@ -0,0 +1,111 @@
+# 洛克王国数值计算器 —— 分页输出
+# 较长的报告拆成 "结论摘要 + 详细内容" 两部分：摘要先发，详细内容按长度切页后分条发送。
+# 切页由生成器逐行进行，单次回复只取前几页；剩下的部分连同生成器一起暂存，用户发送 "更多" 时继续往下取。
+
+import time
+from collections import OrderedDict
+from itertools import chain, islice
+from typing import Iterable, Iterator, NamedTuple
+
+
+class Report(NamedTuple):
+    """报告：summary 为先发送的结论摘要，details 为可以分页的详细内容 (逐行)"""
+    summary: str
+    details: tuple[str, ...] = ()
+
+
+def paginate(lines: Iterable[str], page_chars: int) -> Iterator[str]:
+    """按行拼页，每页不超过 page_chars 个字符；单行过长时硬切"""
+    if isinstance(lines, (list, tuple)) and sum(map(len, lines)) + len(lines) - 1 <= page_chars:
+        # 常见情况：全部内容一页就能放下，不必逐行累计
+        if lines:
+            yield "\n".join(lines)
+        return
+    page, size = [], 0
+    for line in lines:
+        while len(line) > page_chars:
+            if page:
+                yield "\n".join(page)
+                page, size = [], 0
+            yield line[:page_chars]
+            line = line[page_chars:]
+        if page and size + 1 + len(line) > page_chars:
+            yield "\n".join(page)
+            page, size = [], 0
+        page.append(line)
+        size += len(line) + (1 if size else 0)
+    if page:
+        yield "\n".join(page)
+
+
+class Pager:
+    """
+    分页发送报告。每位用户最多暂存一份未发完的报告，新报告会替换旧的；
+    暂存带 TTL 过期和容量上限，最久未使用的最先被淘汰。
+    """
+
+    def __init__(self, page_chars: int = 1500, pages_per_reply: int = 3, ttl: float = 600.0, max_pending: int = 256):
+        self.page_chars = page_chars
+        self.pages_per_reply = pages_per_reply
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self.continued = 0
+        self._hint = f"\n\n(内容较长，发送 /计算器 更多 继续查看，{ttl / 60:g}分钟内有效)"
+        # 末页要追加续页提示，切页时预留出它的长度
+        self._body_chars = max(page_chars - len(self._hint), 1)
+        self._pending: OrderedDict[str, tuple[float, Iterator[str]]] = OrderedDict()
+
+    def reply(self, user: str, report: Report | str) -> Iterator[str]:
+        """
+        先发摘要，再发详细内容，两者合计每次最多 pages_per_reply 页；
+        还有剩余时在最后一页末尾提示发送 /计算器 更多
+        """
+        if isinstance(report, str):
+            report = Report(report)
+        self._discard(user)
+        summary = report.summary
+        if len(summary) <= self._body_chars:
+            pages = iter((summary,))
+        else:
+            pages = paginate(summary.split("\n"), self._body_chars)
+        if report.details:
+            pages = chain(pages, paginate(report.details, self._body_chars))
+        return self._take(user, pages)
+
+    def more(self, user: str) -> Iterator[str] | None:
+        """继续发送上次没发完的报告，没有暂存内容 (或已过期) 时返回 None"""
+        self._evict_expired(time.monotonic())
+        entry = self._pending.pop(user, None)
+        if entry is None:
+            return None
+        self.continued += 1
+        return self._take(user, entry[1])
+
+    def _take(self, user: str, pages: Iterator[str]) -> Iterator[str]:
+        batch = list(islice(pages, self.pages_per_reply))
+        following = next(pages, None)
+        if following is not None:
+            self._store(user, chain([following], pages))
+            batch[-1] += self._hint
+        return iter(batch)
+
+    def _store(self, user: str, pages: Iterator[str]):
+        now = time.monotonic()
+        self._pending[user] = (now, pages)
+        self._pending.move_to_end(user)
+        self._evict_expired(now)
+        while len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+
+    def _discard(self, user: str):
+        self._pending.pop(user, None)
+
+    def _evict_expired(self, now: float):
+        while self._pending:
+            user, (stored_at, _) = next(iter(self._pending.items()))
+            if now - stored_at <= self.ttl:
+                break
+            del self._pending[user]
+
+    def __len__(self) -> int:
+        return len(self._pending)
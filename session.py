@@ -0,0 +1,69 @@
+# 洛克王国数值计算器 —— 反推会话
+# 按 (用户, 反推类型, 对方种族值) 记录一场战斗里已经观测到的伤害，
+# 每追加一次观测只需和现有的候选养成集合求交集。
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ReverseSession:
+    """一场战斗的反推状态"""
+    candidates: set[tuple[bool, int]]
+    stat_range: tuple[int, int] | None
+    observations: list[tuple[int, int, int]] = field(default_factory=list)  # (我方能力值, 威力, 伤害)
+    updated_at: float = field(default_factory=time.monotonic)
+
+
+def intersect_range(a: tuple[int, int] | None, b: tuple[int, int] | None) -> tuple[int, int] | None:
+    """两个能力值闭区间的交集，任一为 None 或不相交时为 None"""
+    if a is None or b is None:
+        return None
+    low, high = max(a[0], b[0]), min(a[1], b[1])
+    return (low, high) if low <= high else None
+
+
+class SessionStore:
+    """带 TTL 过期和容量上限的内存会话表，最久未使用的会话最先被淘汰"""
+
+    def __init__(self, ttl: float = 600.0, max_sessions: int = 1024):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[tuple, ReverseSession] = OrderedDict()
+        # 重请求会在线程池中读写会话
+        self._lock = threading.Lock()
+
+    def _evict_expired(self, now: float):
+        # 按最近使用排序，只需从头部开始清理
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.updated_at <= self.ttl:
+                break
+            del self._sessions[key]
+
+    def get(self, key: tuple) -> ReverseSession | None:
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+            return session
+
+    def put(self, key: tuple, session: ReverseSession):
+        with self._lock:
+            now = time.monotonic()
+            session.updated_at = now
+            self._sessions[key] = session
+            self._sessions.move_to_end(key)
+            self._evict_expired(now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,40 @@
+# 洛克王国数值计算器 —— 相同请求合并
+# 群里有人发截图后，往往好几个人在同一秒发出完全相同的反推。按规范化后的参数合并同时进行的相同请求：
+# 只计算一次，所有请求方拿到同一个结果。
+# 只有估算开销达到阈值、要交给线程池的请求才经过这里。/精力反推、一两次观测的反推这类轻请求在事件循环内一次算完，
+# 中途不会让出，同一秒内的相同请求只会依次到达，第一个算完写入报告缓存，其余直接命中缓存，效果相同且开销更低。
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """同一个键同时只有一个计算在进行，后到的请求等待并共享它的结果"""
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    def _finished(self, key: Hashable, task: asyncio.Future):
+        self._inflight.pop(key, None)
+        # 所有请求方都已取消时，取走异常以免事件循环报告 "exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args) -> tuple[Any, bool]:
+        """返回 (结果, 是否合并到了其他请求的计算)"""
+        task = self._inflight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+            self.leaders += 1
+        # shield: 某个请求方被取消时不影响其他仍在等待的请求方
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> dict[str, int]:
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "inflight": len(self._inflight)}
@@ -0,0 +1,116 @@
+# 洛克王国数值计算器 —— 伤害公式反解
+# 把 floor((攻击/防御) * 0.9 * 威力) 反解成能造成某个伤害值的精确防御 / 攻击区间，
+# 再在预排序的能力值列上二分，得到所有完全吻合的养成方案。
+
+import math
+from bisect import bisect_left, bisect_right
+from typing import Callable
+
+from .stat_engine import StatTable
+
+# 区间上界的哨兵值（伤害为 0 时防御可以无限大）
+UNBOUNDED = 1 << 30
+
+
+def _refine(fits: Callable[[int], bool], low: int, high: int, floor_value: int) -> tuple[int, int] | None:
+    """
+    用参考公式修正闭式解得到的区间边界，消除浮点误差。
+    闭式解与真实边界最多相差 1，因此两个循环都只会执行极少次数。
+    """
+    low = max(low, floor_value)
+    while low - 1 >= floor_value and fits(low - 1):
+        low -= 1
+    while low <= high and not fits(low):
+        low += 1
+    if high < UNBOUNDED:
+        while fits(high + 1):
+            high += 1
+        while high >= low and not fits(high):
+            high -= 1
+    return (low, high) if low <= high else None
+
+
+def defense_range(attack: int, skill_power: int, damage: int,
+                  damage_fn: Callable[[int, int, int], int]) -> tuple[int, int] | None:
+    """求出让 damage_fn(attack, 防御, skill_power) == damage 的防御闭区间，不存在时返回 None"""
+    if damage < 0:
+        return None
+    coefficient = attack * 0.9 * skill_power
+    if coefficient <= 0:
+        return (1, UNBOUNDED) if damage == 0 else None
+    # damage <= K / def < damage + 1  =>  K / (damage + 1) < def <= K / damage
+    low = math.floor(coefficient / (damage + 1)) + 1
+    high = math.floor(coefficient / damage) if damage > 0 else UNBOUNDED
+    return _refine(lambda d: damage_fn(attack, d, skill_power) == damage, low, high, 1)
+
+
+def attack_range(defense: int, skill_power: int, damage: int,
+                 damage_fn: Callable[[int, int, int], int]) -> tuple[int, int] | None:
+    """求出让 damage_fn(攻击, defense, skill_power) == damage 的攻击闭区间，不存在时返回 None"""
+    if damage < 0 or defense <= 0:
+        return None
+    per_attack = 0.9 * skill_power / defense
+    if per_attack <= 0:
+        return (0, UNBOUNDED) if damage == 0 else None
+    # damage <= atk * c < damage + 1  =>  damage / c <= atk < (damage + 1) / c
+    low = math.ceil(damage / per_attack)
+    high = math.ceil((damage + 1) / per_attack) - 1
+    return _refine(lambda a: damage_fn(a, defense, skill_power) == damage, low, high, 0)
+
+
+def monotone_range(damage_of: Callable[[int], int], damage: int, floor_value: int,
+                   decreasing: bool) -> tuple[int, int] | None:
+    """
+    不依赖公式形式的反解：伤害只需随能力值单调 (decreasing 为真时随防御不增，否则随攻击不减)，
+    在 [floor_value, UNBOUNDED) 上二分两次得到 damage_of(数值) == damage 的闭区间。
+    用于带修正阶段、没有闭式解的伤害函数。
+    """
+    values = range(floor_value, UNBOUNDED)
+    if decreasing:
+        low = bisect_left(values, True, key=lambda v: damage_of(v) <= damage)
+        end = bisect_left(values, True, lo=low, key=lambda v: damage_of(v) < damage)
+    else:
+        low = bisect_left(values, True, key=lambda v: damage_of(v) >= damage)
+        end = bisect_left(values, True, lo=low, key=lambda v: damage_of(v) > damage)
+    if low >= end:
+        return None
+    return floor_value + low, UNBOUNDED if end == len(values) else floor_value + end - 1
+
+
+def match_builds(table: StatTable, base_race_value: int, stat_range: tuple[int, int] | None,
+                 below: Callable[[int], bool], kind: str = "stat") -> tuple[list[tuple[int, tuple[bool, int]]], int]:
+    """
+    在某个种族值的预排序能力值列上二分查找落入 stat_range 的养成方案。
+    below(数值) 表示该数值低于吻合区间，需随数值单调 (先 True 后 False)。
+    返回 (吻合方案列表[(数值, (性格, 个体))], 插入位置)，插入位置即数值低于区间的方案个数。
+    """
+    values, builds = table.sorted_column(base_race_value, kind)
+    position = bisect_left(values, True, key=lambda v: not below(v))
+    if stat_range is None:
+        return [], position
+    end = bisect_right(values, stat_range[1], lo=position)
+    return [(values[i], builds[i]) for i in range(position, end)], position
+
+
+def observation_matches(table: StatTable, base_race_value: int, my_stat: int, skill_power: int, damage: int,
+                        damage_fn: Callable[[int, int, int], int], role: str, closed_form: bool = True):
+    """
+    单次伤害观测的反推。role 为 "defense" 时反推对方防御 (我方为攻击方)，
+    为 "attack" 时反推对方攻击 (我方为防御方)。
+    damage_fn 带修正阶段时传 closed_form=False，改用单调二分求区间。
+    返回 (能力值区间或 None, 吻合方案列表, 插入位置)。
+    """
+    if role == "defense":
+        if closed_form:
+            stat_range = defense_range(my_stat, skill_power, damage, damage_fn)
+        else:
+            stat_range = monotone_range(lambda v: damage_fn(my_stat, v, skill_power), damage, 1, decreasing=True)
+        below = lambda v: damage_fn(my_stat, v, skill_power) > damage
+    else:
+        if closed_form:
+            stat_range = attack_range(my_stat, skill_power, damage, damage_fn)
+        else:
+            stat_range = monotone_range(lambda v: damage_fn(v, my_stat, skill_power), damage, 0, decreasing=False)
+        below = lambda v: damage_fn(v, my_stat, skill_power) < damage
+    matches, position = match_builds(table, base_race_value, stat_range, below)
+    return stat_range, matches, position
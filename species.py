@@ -0,0 +1,140 @@
+# 洛克王国数值计算器 —— 宠物图鉴
+# 插件自带的宠物种族值数据 (data/species.json)，首次使用时才加载。
+# 内存索引支持精确名称、名称前缀和拼音首字母查找，均为哈希或二分，不做逐条扫描。
+
+import json
+import re
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import NamedTuple
+
+SPECIES_FILE = Path(__file__).resolve().parent / "data" / "species.json"
+
+# 六项种族值在数据文件中的顺序
+STAT_FIELDS = ("精力", "物攻", "魔攻", "物防", "魔防", "速度")
+
+# 反推时 "我方/对方" 后面紧跟的名称；遇到指令关键字或能力项名称 (如 "对方精力128") 则不视为名称
+_NAME_TOKEN_RE = re.compile(r"(我方|对方)\s*([^\s\d+%,，]+)")
+_KEYWORD_RE = re.compile(r"威力|伤害|掉血|性格|个体|追加|物理|魔法|精力|物攻|魔攻|物防|魔防|攻击|防御|速度")
+_MAX_SUGGESTIONS = 5
+
+
+class Species(NamedTuple):
+    name: str
+    abbr: str  # 拼音首字母，例如 迪莫 -> dm；数据中未填写时为空，只能按名称查找
+    stats: tuple[int, int, int, int, int, int]
+
+    def stat(self, field: str) -> int:
+        return self.stats[STAT_FIELDS.index(field)]
+
+
+class SpeciesIndex:
+    """名称 / 拼音首字母的内存索引"""
+
+    def __init__(self, species: list[Species]):
+        self._by_name = {s.name: s for s in species}
+        self._by_abbr: dict[str, list[Species]] = {}
+        for s in species:
+            if s.abbr:
+                self._by_abbr.setdefault(s.abbr, []).append(s)
+        self._names = sorted(self._by_name)
+        self._abbrs = sorted(self._by_abbr)
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    @staticmethod
+    def _prefixed(sorted_keys: list[str], prefix: str, limit: int) -> list[str]:
+        """二分定位到前缀的起点，只向后读取匹配的若干项"""
+        result = []
+        i = bisect_left(sorted_keys, prefix)
+        while i < len(sorted_keys) and sorted_keys[i].startswith(prefix) and len(result) < limit:
+            result.append(sorted_keys[i])
+            i += 1
+        return result
+
+    def search(self, token: str, limit: int = _MAX_SUGGESTIONS) -> list[Species]:
+        """按 精确名称 > 拼音首字母 > 名称前缀 > 首字母前缀 的优先级查找"""
+        token = token.strip()
+        if not token:
+            return []
+        exact = self._by_name.get(token)
+        if exact:
+            return [exact]
+        token = token.lower()
+        if token in self._by_abbr:
+            return self._by_abbr[token][:limit]
+        names = self._prefixed(self._names, token, limit)
+        if names:
+            return [self._by_name[n] for n in names]
+        found = []
+        for abbr in self._prefixed(self._abbrs, token, limit):
+            found.extend(self._by_abbr[abbr])
+        return found[:limit]
+
+    def resolve(self, token: str) -> Species:
+        """查找唯一的宠物，找不到或有歧义时抛出 ValueError"""
+        found = self.search(token)
+        if len(found) == 1:
+            return found[0]
+        if not self._by_name:
+            raise ValueError(f"图鉴暂无数据，无法按宠物名 '{token}' 查找，请直接输入种族值 (补充数据的方法见 /计算器 图鉴 帮助)。")
+        if not found:
+            raise ValueError(f"图鉴中没有找到宠物 '{token}'。")
+        raise ValueError(f"'{token}' 对应多只宠物: {'、'.join(s.name for s in found)}，请输入更完整的名称。")
+
+
+class SpeciesDB:
+    """延迟加载的图鉴：插件启动时不读文件，首次查询时才建立索引"""
+
+    def __init__(self, path: Path = SPECIES_FILE):
+        self.path = path
+        self._index: SpeciesIndex | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> SpeciesIndex:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._load()
+        return self._index
+
+    def _load(self) -> SpeciesIndex:
+        if not self.path.exists():
+            return SpeciesIndex([])
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        species = []
+        for entry in data.get("species", []):
+            stats = entry["stats"]
+            if len(stats) != len(STAT_FIELDS):
+                raise ValueError(f"图鉴数据错误：'{entry['name']}' 的种族值应为 {len(STAT_FIELDS)} 项。")
+            species.append(Species(entry["name"], entry.get("abbr", "").lower(), tuple(int(v) for v in stats)))
+        return SpeciesIndex(species)
+
+    def substitute_names(self, text: str, player_field: str | None, opponent_field: str | None) -> str:
+        """
+        把 "我方迪莫"、"对方火神" 这样的名称替换成对应项的种族值数字，交给数字解析器处理。
+        不包含名称的输入原样返回，此时不会触发图鉴加载。
+        """
+        def replace(match: re.Match) -> str:
+            side, token = match.group(1), match.group(2)
+            keyword = _KEYWORD_RE.search(token)
+            if keyword:
+                # "我方迪莫性格" 这类粘连写法，只取关键字之前的部分作为名称
+                if keyword.start() == 0:
+                    return match.group(0)
+                token, rest = token[:keyword.start()], token[keyword.start():]
+                if rest.startswith(("性格", "个体")):
+                    rest = "+" + rest
+            else:
+                rest = ""
+            field = player_field if side == "我方" else opponent_field
+            if field is None:
+                return match.group(0)
+            species = self.index.resolve(token)
+            return f"{side}{species.stat(field)}{rest}"
+
+        return _NAME_TOKEN_RE.sub(replace, text)
@@ -0,0 +1,54 @@
+# 洛克王国数值计算器 —— 速度线索引
+# 每种养成方案下，最终速度随种族值单调不减，因此按养成各存一列 "种族值 -> 速度"，
+# 比较先后手时在每列上二分即可；另存一份全部 (速度, 种族值, 养成) 的有序表供区间查询。
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import NamedTuple
+
+from .stat_engine import StatTable
+
+
+class SpeedTier(NamedTuple):
+    """我方速度与对方某一养成的比较：对方种族值在各区间内时的先后手关系"""
+    build: tuple[bool, int]
+    outspeed_max: int | None  # 对方种族值 <= 此值时我方先手
+    tie: tuple[int, int] | None  # 对方种族值在此区间内时同速
+    lose_min: int | None  # 对方种族值 >= 此值时对方先手
+
+
+class SpeedTierIndex:
+    """基于 StatTable 的速度索引，只覆盖表内的种族值范围"""
+
+    def __init__(self, table: StatTable):
+        self.table = table
+        self.base_min = table.base_min
+        self.base_max = table.base_max
+        self.builds = table.builds
+        bases = range(table.base_min, table.base_max + 1)
+        self._columns = [array("i", [table.stat(base, pers, iv) for base in bases]) for pers, iv in self.builds]
+        entries = sorted((speed, base, build_idx)
+                         for build_idx, column in enumerate(self._columns)
+                         for base, speed in zip(bases, column))
+        self._entries = entries
+        self._speeds = [speed for speed, _, _ in entries]
+
+    def compare(self, speed: int) -> list[SpeedTier]:
+        """对每种养成二分出 我方先手 / 同速 / 对方先手 的种族值分界"""
+        tiers = []
+        for build, column in zip(self.builds, self._columns):
+            slower = bisect_left(column, speed)
+            not_faster = bisect_right(column, speed)
+            tiers.append(SpeedTier(
+                build,
+                self.base_min + slower - 1 if slower else None,
+                (self.base_min + slower, self.base_min + not_faster - 1) if not_faster > slower else None,
+                self.base_min + not_faster if not_faster < len(column) else None,
+            ))
+        return tiers
+
+    def in_range(self, low: int, high: int) -> list[tuple[int, int, tuple[bool, int]]]:
+        """速度在 [low, high] 内的全部 (速度, 种族值, 养成)，按速度升序"""
+        start = bisect_left(self._speeds, low)
+        stop = bisect_right(self._speeds, high)
+        return [(speed, base, self.builds[build_idx]) for speed, base, build_idx in self._entries[start:stop]]
@@ -0,0 +1,159 @@
+# 洛克王国数值计算器 —— 能力值查表引擎
+# 插件加载时把 "种族值 × 性格有无 × 合法个体总值" 的全部结果预先算好，
+# 存进紧凑的 array 缓冲区，之后每次计算都只是一次下标查表。
+
+import math
+from array import array
+from typing import Sequence
+
+# 游戏内种族值的取值范围（超出范围的输入仍会回退到公式计算）
+BASE_RACE_MIN = 0
+BASE_RACE_MAX = 255
+
+# 合法的个体总值：0 (无个体) 以及 7-10 点 (每点 6)
+IV_TOTALS = (0, 42, 48, 54, 60)
+
+
+def build_name(personality: bool, individual_value: int) -> str:
+    """养成方案的展示名称，例如 性格+8点个体、完全无养成"""
+    points = individual_value // 6
+    if individual_value == 0:
+        return "仅性格" if personality else "完全无养成"
+    iv_desc = "满个体(10点)" if points == 10 else f"{points}点个体"
+    return f"{'性格' if personality else '无性格'}+{iv_desc}"
+
+
+def calculate_stat(base_race_value: int, personality: bool, individual_value: int,
+                   level: int, effort_value: int, personality_multiplier: float) -> int:
+    """计算除精力外的五维属性（物攻、魔攻、物防、魔防、速度）"""
+    personality_to_use = personality_multiplier if personality else 1.0
+    l_coefficient = (base_race_value + individual_value / 2) / 100
+    initial_stat = l_coefficient * (level + 50) + 10
+    final_stat = initial_stat * personality_to_use + effort_value
+    return math.ceil(final_stat)
+
+
+def calculate_hp(base_race_value: int, personality: bool, individual_value: int,
+                 level: int, effort_value: int, personality_multiplier: float) -> int:
+    """根据特殊公式计算精力（HP）属性"""
+    personality_to_use = personality_multiplier if personality else 1.0
+    l_coefficient = (base_race_value + individual_value / 2) / 100
+    initial_hp = (2 * l_coefficient + 1) * level + 50 * l_coefficient + 10
+    final_hp = initial_hp * personality_to_use + effort_value
+    return math.ceil(final_hp)
+
+
+class StatTable:
+    """预计算的能力值 / 精力查找表，表外的输入回退到公式计算。"""
+
+    def __init__(self, level: int, effort_value: int, personality_multiplier: float,
+                 iv_totals: tuple[int, ...] = IV_TOTALS,
+                 base_min: int = BASE_RACE_MIN, base_max: int = BASE_RACE_MAX,
+                 columns: tuple[Sequence[int], Sequence[int]] | None = None):
+        """columns 为已经算好的 (能力值列, 精力列)，例如 mmap 映射的共享文件，给出时不再重新计算"""
+        self.level = level
+        self.effort_value = effort_value
+        self.personality_multiplier = personality_multiplier
+        self.iv_totals = tuple(iv_totals)
+        self.base_min = base_min
+        self.base_max = base_max
+
+        self._iv_index = {iv: i for i, iv in enumerate(self.iv_totals)}
+        self._row = 2 * len(self.iv_totals)  # 每个种族值占用的槽位数
+        # 养成方案，顺序与每个种族值内的槽位顺序一致
+        self.builds = tuple((pers, iv) for pers in (False, True) for iv in self.iv_totals)
+        self._sorted_cache: dict[tuple[str, int], tuple[list[int], list[tuple[bool, int]]]] = {}
+        self.mapped_from = None  # 从共享文件映射时为文件路径
+
+        # 下标布局: (种族值 - base_min) * row + 性格 * len(iv) + 个体下标
+        if columns is not None:
+            self._stats, self._hps = columns
+            if not len(self._stats) == len(self._hps) == self.slots:
+                raise ValueError(f"查找表长度应为 {self.slots}，实际为 {len(self._stats)} / {len(self._hps)}")
+            return
+        self._stats = array("i")
+        self._hps = array("i")
+        for base in range(base_min, base_max + 1):
+            for pers in (False, True):
+                for iv in self.iv_totals:
+                    self._stats.append(self._formula_stat(base, pers, iv))
+                    self._hps.append(self._formula_hp(base, pers, iv))
+
+    @property
+    def slots(self) -> int:
+        """查找表的槽位数"""
+        return (self.base_max - self.base_min + 1) * self._row
+
+    @property
+    def columns(self) -> tuple[Sequence[int], Sequence[int]]:
+        """(能力值列, 精力列)，按下标布局排列的 int 数组"""
+        return self._stats, self._hps
+
+    def _formula_stat(self, base_race_value: int, personality: bool, individual_value: int) -> int:
+        return calculate_stat(base_race_value, personality, individual_value,
+                              self.level, self.effort_value, self.personality_multiplier)
+
+    def _formula_hp(self, base_race_value: int, personality: bool, individual_value: int) -> int:
+        return calculate_hp(base_race_value, personality, individual_value,
+                            self.level, self.effort_value, self.personality_multiplier)
+
+    def _slot(self, base_race_value: int, personality: bool, individual_value: int) -> int:
+        """返回查找表下标，不在表内时返回 -1"""
+        iv_idx = self._iv_index.get(individual_value)
+        if iv_idx is None or not (self.base_min <= base_race_value <= self.base_max):
+            return -1
+        offset = len(self.iv_totals) if personality else 0
+        return (base_race_value - self.base_min) * self._row + offset + iv_idx
+
+    def stat(self, base_race_value: int, personality: bool, individual_value: int) -> int:
+        slot = self._slot(base_race_value, personality, individual_value)
+        if slot < 0:
+            return self._formula_stat(base_race_value, personality, individual_value)
+        return self._stats[slot]
+
+    def hp(self, base_race_value: int, personality: bool, individual_value: int) -> int:
+        slot = self._slot(base_race_value, personality, individual_value)
+        if slot < 0:
+            return self._formula_hp(base_race_value, personality, individual_value)
+        return self._hps[slot]
+
+    def sorted_column(self, base_race_value: int, kind: str = "stat") -> tuple[list[int], list[tuple[bool, int]]]:
+        """某个种族值下全部养成方案的数值（升序）及对应的 (性格, 个体) 方案"""
+        key = (kind, base_race_value)
+        cached = self._sorted_cache.get(key)
+        if cached is not None:
+            return cached
+        calc = self.hp if kind == "hp" else self.stat
+        pairs = sorted(((calc(base_race_value, pers, iv), (pers, iv)) for pers, iv in self.builds),
+                       key=lambda x: x[0])
+        cached = ([v for v, _ in pairs], [b for _, b in pairs])
+        if self.base_min <= base_race_value <= self.base_max:
+            self._sorted_cache[key] = cached
+        return cached
+
+    def slots_many(self, specs: Sequence[tuple[int, bool, int]]) -> list[int]:
+        """批量换算查找表下标，不在表内的为 -1；能力值和精力可以共用同一组下标"""
+        iv_index, base_min, base_max = self._iv_index, self.base_min, self.base_max
+        row, personality_offset = self._row, len(self.iv_totals)
+        slots = []
+        for base, pers, iv in specs:
+            iv_idx = iv_index.get(iv)
+            if iv_idx is None or not base_min <= base <= base_max:
+                slots.append(-1)
+            else:
+                slots.append((base - base_min) * row + (personality_offset if pers else 0) + iv_idx)
+        return slots
+
+    def lookup_many(self, specs: Sequence[tuple[int, bool, int]], kind: str = "stat",
+                    slots: list[int] | None = None) -> array:
+        """
+        批量查表：specs 为 (种族值, 性格, 个体) 序列。先换算出全部下标 (或直接使用传入的 slots)，
+        再按下标从整列中一次取出；只有含表外输入时才逐项回退到公式。
+        """
+        column = self._hps if kind == "hp" else self._stats
+        if slots is None:
+            slots = self.slots_many(specs)
+        if min(slots, default=0) >= 0:
+            return array("i", map(column.__getitem__, slots))
+        formula = self._formula_hp if kind == "hp" else self._formula_stat
+        return array("i", [column[slot] if slot >= 0 else formula(*spec) for slot, spec in zip(slots, specs)])
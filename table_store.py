@@ -0,0 +1,104 @@
+# 洛克王国数值计算器 —— 共享查找表文件
+# 同一台机器上的多个 AstrBot 实例共用一份能力值 / 精力查找表：第一个进程按游戏常数生成带版本头的二进制文件，
+# 之后每个进程都只读 mmap 映射，直接在映射上查表，不再各自计算，内存由操作系统的页缓存共享。
+# 文件名带有常数的摘要，常数变化后自然换用另一个文件；写入先写临时文件再原子替换，读到的文件总是完整的。
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from pathlib import Path
+
+from .stat_engine import BASE_RACE_MAX, BASE_RACE_MIN, StatTable
+
+# 文件布局变化时递增，旧格式的文件不再被读取
+FORMAT_VERSION = 1
+
+_MAGIC = b"ROCOTBL\0"
+# 魔数、格式版本、常数摘要、字节序标记、每项字节数、种族值范围、槽位数；之后依次是能力值列和精力列
+_HEADER = struct.Struct("<8sI32s4sIiiI")
+# 按本机字节序写出的标记，读取时不一致说明文件来自字节序不同的机器
+_BYTE_ORDER_MARK = array("i", [0x01020304]).tobytes()
+
+
+def table_digest(level: int, effort_value: int, personality_multiplier: float, iv_totals: tuple[int, ...],
+                 base_min: int = BASE_RACE_MIN, base_max: int = BASE_RACE_MAX) -> bytes:
+    """决定查找表内容的全部参数的摘要，用作文件版本"""
+    key = repr((FORMAT_VERSION, level, effort_value, float(personality_multiplier), tuple(iv_totals), base_min, base_max))
+    return hashlib.sha256(key.encode()).digest()
+
+
+def table_path(directory: Path, digest: bytes) -> Path:
+    return Path(directory) / f"stat_table-v{FORMAT_VERSION}-{digest.hex()[:16]}.bin"
+
+
+def _map_table(path: Path, digest: bytes, level: int, effort_value: int, personality_multiplier: float,
+               iv_totals: tuple[int, ...]) -> StatTable:
+    """只读映射文件并校验文件头，校验失败抛出 ValueError"""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    try:
+        if len(view) < _HEADER.size:
+            raise ValueError("文件头不完整")
+        magic, version, file_digest, order_mark, itemsize, base_min, base_max, slots = _HEADER.unpack_from(view)
+        if (magic, version, file_digest) != (_MAGIC, FORMAT_VERSION, digest):
+            raise ValueError("文件版本与当前游戏常数不符")
+        if order_mark != _BYTE_ORDER_MARK or itemsize != array("i").itemsize:
+            raise ValueError("文件的字节序或整数宽度与本机不同")
+        column_bytes = slots * itemsize
+        if len(view) != _HEADER.size + 2 * column_bytes:
+            raise ValueError("文件长度与文件头不符")
+    except ValueError:
+        # 及时释放映射，之后才能用新文件替换它
+        view.release()
+        mapped.close()
+        raise
+    stats = view[_HEADER.size:_HEADER.size + column_bytes].cast("i")
+    hps = view[_HEADER.size + column_bytes:].cast("i")
+    table = StatTable(level, effort_value, personality_multiplier, iv_totals=iv_totals,
+                      base_min=base_min, base_max=base_max, columns=(stats, hps))
+    table.mapped_from = path
+    return table
+
+
+def _write_table(path: Path, digest: bytes, table: StatTable):
+    """写进同目录下的临时文件后原子替换，并发写入的进程互不影响"""
+    stats, hps = (array("i", column) for column in table.columns)
+    header = _HEADER.pack(_MAGIC, FORMAT_VERSION, digest, _BYTE_ORDER_MARK,
+                          stats.itemsize, table.base_min, table.base_max, table.slots)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=path.name, suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            stats.tofile(f)
+            hps.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_stat_table(directory: Path, level: int, effort_value: int, personality_multiplier: float,
+                    iv_totals: tuple[int, ...]) -> StatTable:
+    """
+    映射与这组常数对应的共享查找表；文件不存在、已损坏或版本不符时重新计算并写入，再映射新文件。
+    目录不可写时退回到进程内的查找表。
+    """
+    digest = table_digest(level, effort_value, personality_multiplier, iv_totals)
+    path = table_path(directory, digest)
+    try:
+        return _map_table(path, digest, level, effort_value, personality_multiplier, iv_totals)
+    except (OSError, ValueError):
+        pass
+    table = StatTable(level, effort_value, personality_multiplier, iv_totals=iv_totals)
+    try:
+        _write_table(path, digest, table)
+        return _map_table(path, digest, level, effort_value, personality_multiplier, iv_totals)
+    except (OSError, ValueError):
+        return table